@@ -0,0 +1,147 @@
+"""
+Browser Model Generator
+=======================
+
+Generates docs/geofence-model.js from the compiled radius table in
+geofence_model.py, so the static page can never drift from Python.
+
+The radius table ships as one Int16Array (1152 entries, 2304 bytes; ~3 KB
+as base64) decoded by index arithmetic - no per-cell string keys, no
+hand-ported lookup tables. With the enums and lookup code the generated
+file is about 5.5 KB.
+
+Usage:
+    python browser_model.py              # rewrite docs/geofence-model.js
+    python browser_model.py --check      # exit 1 if the file is stale
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import base64
+import json
+import sys
+from array import array
+from pathlib import Path
+
+from geofence_model import (
+    ADDRESS_SOURCES,
+    DENSITY_CATEGORIES,
+    PERCENTILES,
+    PROPERTY_TYPES,
+    RADIUS_TABLE,
+    TABLE_SHAPE,
+    table_to_bytes,
+    table_version,
+)
+
+OUTPUT_PATH = Path(__file__).parent / "docs" / "geofence-model.js"
+
+JS_TEMPLATE = """/**
+ * Geofence Radius Prediction Model (generated)
+ * ============================================
+ *
+ * GENERATED by browser_model.py from the compiled table in geofence_model.py.
+ * Do not edit by hand - run `python browser_model.py` instead.
+ *
+ * Every (kind, density, property, source, percentile, access) result is
+ * packed in one little-endian Int16Array, indexed by arithmetic.
+ */
+
+const MODEL_VERSION = '__VERSION__';
+
+const DENSITY_CATEGORIES = __DENSITIES__;
+const PROPERTY_TYPES = __PROPERTIES__;
+const ADDRESS_SOURCES = __SOURCES__;
+const PERCENTILES = __PERCENTILES__;
+
+// Axis sizes: kind, density, property, source, percentile, access
+const TABLE_SHAPE = __SHAPE__;
+
+const RADIUS_TABLE = (function (b64) {
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new Int16Array(bytes.buffer);
+})('__TABLE__');
+
+// Same normalization as geofence_model.normalize_input
+function axisCode(values, value, fallback) {
+    const normalized = value == null ? fallback : String(value).toUpperCase().trim();
+    const i = values.indexOf(normalized);
+    return i < 0 ? values.indexOf(fallback) : i;
+}
+
+function tableIndex(kind, propertyType, addressSource, densityCategory, percentile, accessRequired) {
+    const d = axisCode(DENSITY_CATEGORIES, densityCategory, 'SUBURBAN');
+    const p = axisCode(PROPERTY_TYPES, propertyType, 'HOUSE');
+    const s = axisCode(ADDRESS_SOURCES, addressSource, 'AMS');
+    const pct = percentile === 'P90' ? 0 : percentile === 'P99' ? 2 : 1;
+    const a = accessRequired ? 1 : 0;
+    return ((((kind * TABLE_SHAPE[1] + d) * TABLE_SHAPE[2] + p) * TABLE_SHAPE[3] + s)
+            * TABLE_SHAPE[4] + pct) * TABLE_SHAPE[5] + a;
+}
+
+/**
+ * Get the recommended delivery geofence radius in meters.
+ */
+function getGeofenceRadius(propertyType, addressSource, densityCategory, percentile = 'P95', accessRequired = false) {
+    return RADIUS_TABLE[tableIndex(0, propertyType, addressSource, densityCategory, percentile, accessRequired)];
+}
+
+/**
+ * Get the recommended arrival radius in meters (where driver parks).
+ */
+function getArrivalRadius(propertyType, addressSource, densityCategory, percentile = 'P95', accessRequired = false) {
+    return RADIUS_TABLE[tableIndex(1, propertyType, addressSource, densityCategory, percentile, accessRequired)];
+}
+"""
+
+
+def render_browser_model(table: array = RADIUS_TABLE) -> str:
+    """
+    Render the browser model JS for a compiled table.
+
+    Args:
+        table: Compiled int16 radius table (default: the current model)
+
+    Returns:
+        str: JavaScript source defining getGeofenceRadius / getArrivalRadius
+    """
+    replacements = {
+        "__VERSION__": table_version(table),
+        "__DENSITIES__": json.dumps(DENSITY_CATEGORIES),
+        "__PROPERTIES__": json.dumps(PROPERTY_TYPES),
+        "__SOURCES__": json.dumps(ADDRESS_SOURCES),
+        "__PERCENTILES__": json.dumps(PERCENTILES),
+        "__SHAPE__": json.dumps(list(TABLE_SHAPE)),
+        "__TABLE__": base64.b64encode(table_to_bytes(table)).decode("ascii"),
+    }
+    js = JS_TEMPLATE
+    for placeholder, value in replacements.items():
+        js = js.replace(placeholder, value)
+    return js
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate docs/geofence-model.js")
+    parser.add_argument("--check", action="store_true", help="Fail if the file is out of date")
+    parser.add_argument("--out", type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args(argv)
+
+    js = render_browser_model()
+    if args.check:
+        current = args.out.read_text(encoding="utf-8") if args.out.exists() else ""
+        if current != js:
+            print(f"❌ {args.out} is stale - run: python browser_model.py")
+            return 1
+        print(f"✅ {args.out} matches model {table_version(RADIUS_TABLE)}")
+        return 0
+
+    args.out.write_text(js, encoding="utf-8")
+    print(f"✅ Wrote {args.out} ({len(js.encode('utf-8')):,} bytes, model {table_version(RADIUS_TABLE)})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""
+Radius Table Backtest
+=====================
+
+Scores historical delivery-distance records against two or more radius
+table versions in one pass and writes a per-cell diff report, so a new
+GEOFENCE_LOOKUP / ARRIVAL_GEOFENCE_LOOKUP can be judged before it ships.
+
+Per cell (density, property, source, access) and version:
+    delivery_capture   share of deliveries with DLVRD_DISTANCE <= delivery radius
+    arrival_capture    share of arrivals with ARRVL_DIST_METER <= arrival radius
+    false_arrival      share where the arrival fence fired but the delivery
+                       landed outside the delivery fence
+    *_area_m2          total fence area (records x pi r^2) - the cost side
+
+Records are CSV with columns (case-insensitive, raw BigQuery names work too):
+    density_category, property_type, address_source, access_required,
+    dlvrd_distance, arrvl_dist_meter
+
+Files are split into byte-range shards and scored across cores; each shard
+parses in chunks and scores every version with vectorized numpy ops.
+
+Usage:
+    python geofence_backtest.py records/*.csv --table current --table candidate.json
+    python geofence_backtest.py big.csv --table current --table v2.json --workers 16 \
+        --out backtest_diff.csv
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from geofence_model import (
+    ACCESS_MULTIPLIERS,
+    ADDRESS_SOURCES,
+    ARRIVAL_GEOFENCE_LOOKUP,
+    DEFAULT_ARRIVAL_BY_PROPERTY,
+    DEFAULT_BY_PROPERTY,
+    DENSITY_CATEGORIES,
+    GEOFENCE_LOOKUP,
+    PROPERTY_TYPES,
+    load_config,
+    normalize_input,
+    resolve_base_radius,
+    tables_from_config,
+)
+
+# Sources seen in history; anything else scores as AMS like the live model
+BACKTEST_SOURCES = ADDRESS_SOURCES + ["MELISSA", "MANUAL_ADJ"]
+
+N_CELLS = len(DENSITY_CATEGORIES) * len(PROPERTY_TYPES) * len(BACKTEST_SOURCES) * 2
+
+CHUNK_ROWS = 250_000
+SHARD_BYTES = 64 * 1024 * 1024
+
+# Accepted header names per field (lowercased)
+COLUMN_ALIASES = {
+    "density": ("density_category", "density"),
+    "property": ("property_type", "addresstype", "prop_type"),
+    "source": ("address_source", "recommendedlatlongsource", "source"),
+    "access": ("access_required", "access_code_ind", "access"),
+    "delivery": ("dlvrd_distance", "delivery_distance_m"),
+    "arrival": ("arrvl_dist_meter", "arrival_distance_m"),
+    "date": ("delivery_date", "dlvrd_date", "dlvrd_dt", "date"),
+}
+
+TRUE_VALUES = {"YES", "Y", "TRUE", "T", "1"}
+
+
+# =============================================================================
+# Cells + Table Versions
+# =============================================================================
+
+def cell_index(density: int, prop: int, source: int, access: int) -> int:
+    return ((density * len(PROPERTY_TYPES) + prop) * len(BACKTEST_SOURCES) + source) * 2 + access
+
+
+def iter_cells():
+    """Yield (index, density, property, source, access) for every cell."""
+    for d, density in enumerate(DENSITY_CATEGORIES):
+        for p, prop in enumerate(PROPERTY_TYPES):
+            for s, source in enumerate(BACKTEST_SOURCES):
+                for access in (0, 1):
+                    yield cell_index(d, p, s, access), density, prop, source, access
+
+
+def compile_version(delivery: dict, arrival: dict) -> np.ndarray:
+    """
+    Radii per cell for one table version, shape (2, N_CELLS) int32.
+
+    Row 0 = delivery, row 1 = arrival; P95 with access multipliers and the
+    arrival >= delivery invariant, exactly like the live functions.
+    """
+    radii = np.zeros((2, N_CELLS), dtype=np.int32)
+    for index, density, prop, source, access in iter_cells():
+        multiplier = ACCESS_MULTIPLIERS.get(prop, 1.0) if access else 1.0
+        dlv = int(resolve_base_radius(delivery, density, prop, source, DEFAULT_BY_PROPERTY) * multiplier)
+        arr = int(resolve_base_radius(arrival, density, prop, source, DEFAULT_ARRIVAL_BY_PROPERTY) * multiplier)
+        radii[0, index] = dlv
+        radii[1, index] = max(arr, dlv)
+    return radii
+
+
+def load_version(spec: str) -> tuple[str, np.ndarray]:
+    """'current' for the live tables, else a geofence_config.json-style path."""
+    if spec == "current":
+        return "current", compile_version(GEOFENCE_LOOKUP, ARRIVAL_GEOFENCE_LOOKUP)
+    delivery, arrival = tables_from_config(load_config(spec))
+    return Path(spec).stem, compile_version(delivery, arrival)
+
+
+# =============================================================================
+# Streaming Record Reader
+# =============================================================================
+
+_CELL_MEMO: dict[tuple[str, str, str, str], int] = {}
+
+
+def record_cell(density: str, prop: str, source: str, access: str) -> int:
+    """Cell index for raw record strings (memoized: a handful of distinct tuples)."""
+    raw = (density, prop, source, access)
+    index = _CELL_MEMO.get(raw)
+    if index is None:
+        index = cell_index(
+            DENSITY_CATEGORIES.index(normalize_input(density, DENSITY_CATEGORIES, "SUBURBAN")),
+            PROPERTY_TYPES.index(normalize_input(prop, PROPERTY_TYPES, "HOUSE")),
+            BACKTEST_SOURCES.index(normalize_input(source, BACKTEST_SOURCES, "AMS")),
+            1 if access.strip().upper() in TRUE_VALUES else 0,
+        )
+        _CELL_MEMO[raw] = index
+    return index
+
+
+def resolve_columns(header: list[str]) -> dict[str, int]:
+    lowered = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                columns[field] = lowered.index(alias)
+                break
+    missing = {"density", "property", "source", "delivery"} - set(columns)
+    if missing:
+        raise ValueError(f"records file is missing columns: {sorted(missing)}")
+    return columns
+
+
+def read_header(path: str) -> tuple[list[str], int]:
+    with open(path, "rb") as f:
+        line = f.readline()
+    return next(csv.reader([line.decode("utf-8-sig")])), len(line)
+
+
+def plan_shards(paths: list[str], shard_bytes: int = SHARD_BYTES) -> list[tuple[str, int, int]]:
+    """Split files into (path, start, end) byte ranges that align to lines when read."""
+    shards = []
+    for path in paths:
+        _, header_len = read_header(path)
+        size = os.path.getsize(path)
+        start = header_len
+        while start < size:
+            end = min(size, start + shard_bytes)
+            shards.append((path, start, end))
+            start = end
+    return shards
+
+
+def iter_chunks(
+    path: str,
+    start: int,
+    end: int,
+    columns: dict[str, int],
+    chunk_rows: int = CHUNK_ROWS,
+    stats: dict | None = None,
+):
+    """
+    Yield (cells, delivery_m, arrival_m) numpy chunks for lines beginning
+    inside [start, end). A shard owns every line that starts in its range.
+
+    Lines that are not UTF-8 or are too short to hold the density, property,
+    source and delivery columns are skipped and counted in
+    stats["skipped_rows"] when a stats dict is given. Missing trailing
+    access / arrival fields read as blank.
+    """
+    ci, pi, si, di = columns["density"], columns["property"], columns["source"], columns["delivery"]
+    ai = columns.get("access")
+    ri = columns.get("arrival")
+    width = max(ci, pi, si, di) + 1
+
+    def flush(lines):
+        rows = [row for row in csv.reader(lines) if len(row) >= width]
+        if stats is not None:
+            stats["skipped_rows"] = stats.get("skipped_rows", 0) + len(lines) - len(rows)
+        cells = np.empty(len(rows), dtype=np.int32)
+        delivery = np.empty(len(rows), dtype=np.float64)
+        arrival = np.full(len(rows), np.nan, dtype=np.float64)
+        for i, row in enumerate(rows):
+            access = row[ai] if ai is not None and ai < len(row) else ""
+            cells[i] = record_cell(row[ci], row[pi], row[si], access)
+            try:
+                delivery[i] = float(row[di])
+            except ValueError:
+                delivery[i] = np.nan
+            if ri is not None and ri < len(row) and row[ri]:
+                try:
+                    arrival[i] = float(row[ri])
+                except ValueError:
+                    pass
+        return cells, delivery, arrival
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        if start > 0:
+            # Back up one byte: if we landed exactly on a line start, keep it
+            f.seek(start - 1)
+            position = start - 1 + len(f.readline())
+        lines = []
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            if line.strip():
+                try:
+                    lines.append(line.decode("utf-8"))
+                except UnicodeDecodeError:
+                    if stats is not None:
+                        stats["skipped_rows"] = stats.get("skipped_rows", 0) + 1
+                    continue
+            if len(lines) >= chunk_rows:
+                yield flush(lines)
+                lines = []
+        if lines:
+            yield flush(lines)
+
+
+# =============================================================================
+# Scoring
+# =============================================================================
+
+def score_chunk(cells: np.ndarray, delivery: np.ndarray, arrival: np.ndarray, radii: np.ndarray) -> dict:
+    """
+    Per-cell counts for one chunk against every version at once.
+
+    Args:
+        radii: (V, 2, N_CELLS) radii for V versions
+
+    Returns:
+        dict of arrays: n_delivery/n_arrival (N_CELLS,), delivery_captured /
+        arrival_captured / false_arrival (V, N_CELLS)
+    """
+    has_delivery = ~np.isnan(delivery)
+    has_arrival = ~np.isnan(arrival)
+    both = has_delivery & has_arrival
+
+    dlv_radius = radii[:, 0, :][:, cells]                 # (V, n)
+    arr_radius = radii[:, 1, :][:, cells]
+    dlv_in = (delivery <= dlv_radius) & has_delivery      # NaN compares False
+    arr_in = (arrival <= arr_radius) & has_arrival
+    false_arr = arr_in & ~dlv_in & both
+
+    def per_cell(mask: np.ndarray) -> np.ndarray:
+        return np.stack([np.bincount(cells[m], minlength=N_CELLS) for m in mask])
+
+    return {
+        "n_delivery": np.bincount(cells[has_delivery], minlength=N_CELLS),
+        "n_arrival": np.bincount(cells[has_arrival], minlength=N_CELLS),
+        "n_both": np.bincount(cells[both], minlength=N_CELLS),
+        "delivery_captured": per_cell(dlv_in),
+        "arrival_captured": per_cell(arr_in),
+        "false_arrival": per_cell(false_arr),
+    }
+
+
+def _merge(total: dict | None, part: dict) -> dict:
+    if total is None:
+        return {key: value.astype(np.int64) for key, value in part.items()}
+    for key, value in part.items():
+        total[key] += value
+    return total
+
+
+def score_shard(shard: tuple[str, int, int], radii: np.ndarray) -> dict | None:
+    """Worker entry point: stream one byte range and sum its counts."""
+    path, start, end = shard
+    columns = resolve_columns(read_header(path)[0])
+    stats = {"skipped_rows": 0}
+    total = None
+    for cells, delivery, arrival in iter_chunks(path, start, end, columns, stats=stats):
+        total = _merge(total, score_chunk(cells, delivery, arrival, radii))
+    if total is not None:
+        total["skipped_rows"] = np.int64(stats["skipped_rows"])
+    return total
+
+
+def run_backtest(paths: list[str], radii: np.ndarray, workers: int | None = None) -> dict:
+    """Score every record file against all versions, sharded across cores."""
+    shards = plan_shards(paths)
+    total = None
+    if workers == 1 or len(shards) == 1:
+        for shard in shards:
+            part = score_shard(shard, radii)
+            if part is not None:
+                total = _merge(total, part)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(score_shard, shards, [radii] * len(shards)):
+                if part is not None:
+                    total = _merge(total, part)
+    if total is None:
+        raise ValueError("no records found")
+    return total
+
+
+# =============================================================================
+# Report
+# =============================================================================
+
+def _share(num: float, den: float) -> float | None:
+    return round(num / den, 4) if den else None
+
+
+def build_report(names: list[str], radii: np.ndarray, totals: dict) -> tuple[list[dict], dict]:
+    """
+    Per-cell rows (baseline = first version, deltas for each candidate) and
+    a global summary per version.
+    """
+    rows = []
+    for index, density, prop, source, access in iter_cells():
+        n_dlv = int(totals["n_delivery"][index])
+        n_arr = int(totals["n_arrival"][index])
+        if not n_dlv and not n_arr:
+            continue
+        row = {
+            "density_category": density, "property_type": prop,
+            "address_source": source, "access_required": "YES" if access else "NO",
+            "deliveries": n_dlv, "arrivals": n_arr,
+        }
+        for v, name in enumerate(names):
+            dlv_r, arr_r = int(radii[v, 0, index]), int(radii[v, 1, index])
+            row[f"{name}_delivery_m"] = dlv_r
+            row[f"{name}_arrival_m"] = arr_r
+            row[f"{name}_delivery_capture"] = _share(totals["delivery_captured"][v, index], n_dlv)
+            row[f"{name}_arrival_capture"] = _share(totals["arrival_captured"][v, index], n_arr)
+            row[f"{name}_false_arrival"] = _share(totals["false_arrival"][v, index], totals["n_both"][index])
+            row[f"{name}_delivery_area_m2"] = round(n_dlv * math.pi * dlv_r ** 2)
+            row[f"{name}_arrival_area_m2"] = round(n_arr * math.pi * arr_r ** 2)
+        base = names[0]
+        for name in names[1:]:
+            for metric in ("delivery_capture", "arrival_capture"):
+                new, old = row[f"{name}_{metric}"], row[f"{base}_{metric}"]
+                row[f"{name}_vs_{base}_{metric}_pp"] = (
+                    round((new - old) * 100, 2) if new is not None and old is not None else None
+                )
+            old_area = row[f"{base}_delivery_area_m2"]
+            row[f"{name}_vs_{base}_delivery_area_pct"] = (
+                round((row[f"{name}_delivery_area_m2"] - old_area) / old_area * 100, 1) if old_area else None
+            )
+        rows.append(row)
+
+    n_dlv = int(totals["n_delivery"].sum())
+    n_arr = int(totals["n_arrival"].sum())
+    summary = {
+        "deliveries": n_dlv, "arrivals": n_arr,
+        "skipped_rows": int(totals.get("skipped_rows", 0)), "versions": {},
+    }
+    for v, name in enumerate(names):
+        summary["versions"][name] = {
+            "delivery_capture": _share(totals["delivery_captured"][v].sum(), n_dlv),
+            "arrival_capture": _share(totals["arrival_captured"][v].sum(), n_arr),
+            "false_arrival": _share(totals["false_arrival"][v].sum(), totals["n_both"].sum()),
+            "delivery_area_km2": round(float((totals["n_delivery"] * math.pi * radii[v, 0].astype(np.float64) ** 2).sum()) / 1e6, 1),
+            "arrival_area_km2": round(float((totals["n_arrival"] * math.pi * radii[v, 1].astype(np.float64) ** 2).sum()) / 1e6, 1),
+        }
+    return rows, summary
+
+
+def write_rows(rows: list[dict], path: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# =============================================================================
+# Main Execution
+# =============================================================================
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Backtest radius table versions on historical records")
+    parser.add_argument("records", nargs="+", help="Record CSV files")
+    parser.add_argument("--table", action="append", default=[],
+                        help="'current' or a geofence_config.json-style file; first one is the baseline")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="backtest_diff.csv", help="Per-cell diff CSV")
+    args = parser.parse_args(argv)
+
+    specs = args.table or ["current"]
+    versions = [load_version(spec) for spec in specs]
+    names = [name for name, _ in versions]
+    if len(set(names)) != len(names):
+        raise SystemExit("table versions need distinct file names")
+    radii = np.stack([r for _, r in versions])
+
+    start = time.perf_counter()
+    totals = run_backtest(args.records, radii, args.workers)
+    rows, summary = build_report(names, radii, totals)
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+
+    write_rows(rows, args.out)
+    print(json.dumps(summary, indent=2))
+    print(f"📁 Per-cell diff: {args.out} ({len(rows)} cells)")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Density Resolution Cache
+========================
+
+Bounded TTL + LRU cache in front of address -> density resolution (ZIP
+lookup, coordinate lookup or an external geocode). Stop lists repeat the
+same customers and buildings day after day, so the expensive step should
+run once per distinct address, not once per stop.
+
+Entries are keyed by the normalized address (geofence_model.normalize_address),
+since density belongs to the place, not the customer. Failed resolutions
+(resolver returned None) are cached too, with a shorter TTL, so an
+ungeocodable address is not retried on every stop.
+
+Usage:
+    from geofence_cache import DensityResolutionCache
+    from geofence_model import process_deliveries
+
+    cache = DensityResolutionCache.load("density_cache.json")   # warm start
+    results = process_deliveries(stops, resolve_density=geocode_density,
+                                 density_cache=cache)
+    cache.save("density_cache.json")
+    print(cache.stats())
+
+Author: Code Puppy 🐶
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from geofence_model import normalize_address
+
+DEFAULT_MAX_ENTRIES = 500_000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # density of an address changes slowly
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600  # retry failed resolutions daily
+
+# Returned internally for "no live entry"; a cached None is a failed resolution
+_MISSING = object()
+
+
+def cache_key(
+    address: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    zip_code: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Build a cache key from a free-text address (preferred) or a customer ID.
+
+    Customers move and share buildings, so the customer ID is only used when
+    no address is given.
+
+    Returns:
+        str or None: "ADDR:<normalized address>[|<zip5>]", "CUST:<id>", or
+                     None if neither is usable
+    """
+    if address:
+        normalized = normalize_address(address)
+        if normalized:
+            zip5 = str(zip_code or "").strip()[:5]
+            return f"ADDR:{normalized}|{zip5}" if zip5 else f"ADDR:{normalized}"
+    if customer_id not in (None, ""):
+        return f"CUST:{customer_id}"
+    return None
+
+
+class DensityResolutionCache:
+    """
+    LRU cache with a per-entry TTL and hit/miss/eviction counters.
+
+    Entries store wall-clock insert times so snapshots stay valid across
+    processes (batch jobs start warm from yesterday's run). A None value is
+    a negative entry and expires after negative_ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = min(negative_ttl_seconds, ttl_seconds)
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[Optional[str], float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _ttl(self, value: Optional[str]) -> float:
+        return self.ttl_seconds if value is not None else self.negative_ttl_seconds
+
+    def _lookup(self, key: str):
+        """Live cached value (None for a negative entry) or _MISSING."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        value, stored_at = entry
+        if self._clock() - stored_at > self._ttl(value):
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached density for key, or None if missing/expired/negative."""
+        value = self._lookup(key)
+        return None if value is _MISSING else value
+
+    def put(self, key: str, value: Optional[str], stored_at: Optional[float] = None) -> None:
+        """Insert or refresh an entry, evicting the least recently used."""
+        self._entries[key] = (value, self._clock() if stored_at is None else stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def resolve(self, key: Optional[str], resolver: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Return the cached density for key, calling resolver only on a miss.
+
+        A None from the resolver is cached as a negative entry.
+        """
+        if key is None:
+            return resolver()
+        value = self._lookup(key)
+        if value is _MISSING:
+            value = resolver()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # -------------------------------------------------------------------------
+    # On-disk snapshot
+    # -------------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write live entries (LRU order) to a JSON snapshot, atomically."""
+        now = self._clock()
+        entries = [
+            [key, value, stored_at]
+            for key, (value, stored_at) in self._entries.items()
+            if now - stored_at <= self._ttl(value)
+        ]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "DensityResolutionCache":
+        """Create a cache warmed from a snapshot (empty if the file is missing)."""
+        cache = cls(**kwargs)
+        if not os.path.exists(path):
+            return cache
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        now = cache._clock()
+        for key, value, stored_at in snapshot.get("entries", []):
+            if now - stored_at <= cache._ttl(value):
+                cache.put(key, value, stored_at)
+        cache.evictions = 0
+        return cache
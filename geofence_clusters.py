@@ -0,0 +1,468 @@
+"""
+Cluster Fences
+==============
+
+In dense apartment and business areas a route has many stops whose
+geofence circles overlap. Checking every ping against every stop multiplies
+containment work, and a driver parked between two neighbours flaps between
+their arrivals.
+
+This module groups overlapping stop fences into cluster fences:
+    1. Stops are projected to meters on a local tangent plane and bucketed
+       on a grid of 2 x the largest radius, so overlapping circles always
+       share a cell or sit in adjacent cells
+    2. Candidate pairs come from a cell and its half neighbourhood (sort +
+       searchsorted, O(n log n)); pairs whose circles overlap are unioned
+       with a vectorized union-find (hook + pointer jumping)
+    3. Each cluster gets an enclosing fence: the members' centroid and the
+       smallest radius that covers every member circle
+
+Pings are tested against cluster fences first (through a grid index of
+clusters) and against individual stops only inside a matching cluster.
+Arrivals can be tracked per cluster, so moving between neighbours in one
+building no longer re-triggers an arrival.
+
+Usage:
+    from geofence_clusters import ClusterFences
+
+    fences = ClusterFences.from_stops(route_stops, kind="arrival")
+    fences.cluster_at(lat, lon)            # cluster id or -1
+    fences.locate(lat, lon)                # stops whose fence contains the ping
+    stop, cluster = fences.locate_many(ping_lats, ping_lons)
+
+    python geofence_clusters.py cluster stops.csv --out clusters.json
+    python geofence_clusters.py bench --stops 5000 --pings 1000000
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import csv
+import json
+import math
+import time
+from typing import Literal, Optional
+
+import numpy as np
+
+from geofence_model import get_arrival_radius, get_geofence_radius
+
+EARTH_RADIUS_M = 6_371_000.0
+MIN_CELL_M = 10.0
+
+# Forward half of the 8-neighbourhood (plus the cell itself), so each pair
+# of adjacent cells is visited once
+_HALF_NEIGHBOURS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+_NEIGHBOUR_KEYS = tuple((dx << 21) + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+# =============================================================================
+# Grid Helpers
+# =============================================================================
+
+class _Projection:
+    """Equirectangular meters around a reference point (fine at route scale)."""
+
+    def __init__(self, lat0: float, lon0: float):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.ky = EARTH_RADIUS_M * math.pi / 180.0
+        self.kx = self.ky * math.cos(math.radians(lat0))
+
+    def to_xy(self, lat, lon):
+        return (np.asarray(lon, dtype=np.float64) - self.lon0) * self.kx, \
+               (np.asarray(lat, dtype=np.float64) - self.lat0) * self.ky
+
+    def to_latlon(self, x, y):
+        return self.lat0 + y / self.ky, self.lon0 + x / self.kx
+
+
+def _cartesian(starts_a, counts_a, starts_b, counts_b) -> tuple[np.ndarray, np.ndarray]:
+    """All (a, b) position pairs for runs a = [starts_a, +counts_a) x b = [starts_b, +counts_b)."""
+    sizes = counts_a * counts_b
+    total = int(sizes.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    run = np.repeat(np.arange(len(sizes)), sizes)
+    k = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return starts_a[run] + k // counts_b[run], starts_b[run] + k % counts_b[run]
+
+
+def _components(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Union-find over edges (a, b): root label per node (the smallest member)."""
+    parent = np.arange(n)
+    while True:
+        # Pointer jumping: every node points straight at its root
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            return parent
+        ra, rb = ra[differ], rb[differ]
+        low = np.minimum(ra, rb)
+        # Hook the larger root under the smaller one
+        np.minimum.at(parent, ra, low)
+        np.minimum.at(parent, rb, low)
+
+
+# =============================================================================
+# Cluster Fences
+# =============================================================================
+
+class ClusterFences:
+    """
+    Stop fences merged into clusters of overlapping circles.
+
+    Attributes:
+        lat, lon, radius: Per-stop fence
+        labels: Cluster id per stop
+        center_lat, center_lon, cluster_radius: Per-cluster enclosing fence
+        member_offsets, members: CSR member lists (stops of cluster c are
+            members[member_offsets[c]:member_offsets[c + 1]])
+    """
+
+    def __init__(self, lat, lon, radius, min_overlap_m: float = 0.0):
+        """
+        Args:
+            lat, lon: Stop coordinates (degrees)
+            radius: Stop fence radii (meters)
+            min_overlap_m: How deep two circles must overlap to be merged
+                           (0 = any overlap)
+        """
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.radius = np.asarray(radius, dtype=np.float64)
+        n = len(self.lat)
+        if not (len(self.lon) == len(self.radius) == n):
+            raise ValueError("lat, lon and radius must have the same length")
+
+        self._proj = _Projection(float(self.lat.mean()) if n else 0.0, float(self.lon.mean()) if n else 0.0)
+        self._x, self._y = self._proj.to_xy(self.lat, self.lon)
+        self.cell_m = max(MIN_CELL_M, 2.0 * float(self.radius.max()) if n else MIN_CELL_M)
+
+        self.labels = self._cluster(min_overlap_m)
+        self._build_fences()
+        self._build_index()
+
+    @classmethod
+    def from_stops(
+        cls,
+        stops: list[dict],
+        kind: Literal["arrival", "delivery"] = "arrival",
+        percentile: str = "P95",
+        model_key: Optional[str] = None,
+        min_overlap_m: float = 0.0,
+    ) -> "ClusterFences":
+        """
+        Cluster stop dicts (lat, lon, property_type, address_source,
+        density_category, optional access_required / zip_code / market),
+        sizing each fence with get_arrival_radius or get_geofence_radius.
+        """
+        radius_fn = get_arrival_radius if kind == "arrival" else get_geofence_radius
+        radii = [
+            radius_fn(
+                stop.get("property_type", "HOUSE"),
+                stop.get("address_source", "AMS"),
+                stop.get("density_category", "SUBURBAN"),
+                percentile,
+                bool(stop.get("access_required", False)),
+                zip_code=stop.get("zip_code"),
+                lat=stop["lat"],
+                lon=stop["lon"],
+                model_key=stop.get("market") or model_key,
+            )
+            for stop in stops
+        ]
+        return cls([s["lat"] for s in stops], [s["lon"] for s in stops], radii, min_overlap_m)
+
+    # -------------------------------------------------------------------------
+    # Build
+    # -------------------------------------------------------------------------
+
+    def _cells(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return np.floor(x / self.cell_m).astype(np.int64), np.floor(y / self.cell_m).astype(np.int64)
+
+    @staticmethod
+    def _cell_key(cx, cy):
+        # Projected coordinates stay within +-2^20 cells of the origin at route scale
+        return (cx << 21) + cy
+
+    @staticmethod
+    def _member_key(cluster, cell_key):
+        return (cluster << 42) + cell_key + (1 << 41)
+
+    def _cluster(self, min_overlap_m: float) -> np.ndarray:
+        n = len(self._x)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        cx, cy = self._cells(self._x, self._y)
+        key = self._cell_key(cx, cy)
+        order = np.argsort(key, kind="stable")
+        cells, starts, counts = np.unique(key[order], return_index=True, return_counts=True)
+
+        lefts, rights = [], []
+        for dx, dy in _HALF_NEIGHBOURS:
+            target = cells + self._cell_key(dx, dy)
+            pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+            hit = cells[pos] == target
+            left, right = _cartesian(starts[hit], counts[hit], starts[pos[hit]], counts[pos[hit]])
+            if dx == 0 and dy == 0:
+                keep = left < right
+                left, right = left[keep], right[keep]
+            lefts.append(order[left])
+            rights.append(order[right])
+        a, b = np.concatenate(lefts), np.concatenate(rights)
+
+        reach = self.radius[a] + self.radius[b] - min_overlap_m
+        dist2 = (self._x[a] - self._x[b]) ** 2 + (self._y[a] - self._y[b]) ** 2
+        overlap = (reach > 0) & (dist2 < reach * reach)
+        roots = _components(n, a[overlap], b[overlap])
+        return np.unique(roots, return_inverse=True)[1].astype(np.int64)
+
+    def _build_fences(self) -> None:
+        n_clusters = int(self.labels.max()) + 1 if len(self.labels) else 0
+        sizes = np.bincount(self.labels, minlength=n_clusters)
+        cx = np.bincount(self.labels, weights=self._x, minlength=n_clusters) / np.maximum(sizes, 1)
+        cy = np.bincount(self.labels, weights=self._y, minlength=n_clusters) / np.maximum(sizes, 1)
+        reach = np.hypot(self._x - cx[self.labels], self._y - cy[self.labels]) + self.radius
+        cluster_radius = np.zeros(n_clusters)
+        np.maximum.at(cluster_radius, self.labels, reach)
+
+        self._cx, self._cy = cx, cy
+        self.center_lat, self.center_lon = self._proj.to_latlon(cx, cy)
+        self.cluster_radius = cluster_radius
+        # Members sorted by (cluster, stop cell), so the stops of one cluster
+        # near a ping are a few contiguous runs
+        self._member_keys = self._member_key(self.labels, self._cell_key(*self._cells(self._x, self._y)))
+        self.members = np.argsort(self._member_keys, kind="stable")
+        self._member_keys = self._member_keys[self.members]
+        self.member_offsets = np.concatenate([[0], np.cumsum(sizes)])
+
+    def _build_index(self) -> None:
+        """Grid cell -> clusters whose fence bounding box touches it (CSR)."""
+        lo_x, lo_y = self._cells(self._cx - self.cluster_radius, self._cy - self.cluster_radius)
+        hi_x, hi_y = self._cells(self._cx + self.cluster_radius, self._cy + self.cluster_radius)
+        keys, owners = [], []
+        for c in range(len(self._cx)):
+            gx, gy = np.meshgrid(np.arange(lo_x[c], hi_x[c] + 1), np.arange(lo_y[c], hi_y[c] + 1))
+            keys.append(self._cell_key(gx.ravel(), gy.ravel()))
+            owners.append(np.full(gx.size, c))
+        keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+        owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self._index_cells, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        self._index_starts = starts
+        self._index_counts = counts
+        self._index_clusters = owners[order]
+        self._index_lists = {
+            int(cell): self._index_clusters[start:start + count].tolist()
+            for cell, start, count in zip(self._index_cells, starts, counts)
+        }
+        self._member_cells: dict[int, list[int]] = {}
+        for key, stop in zip(self._member_keys.tolist(), self.members.tolist()):
+            self._member_cells.setdefault(key, []).append(stop)
+
+    # -------------------------------------------------------------------------
+    # Containment
+    # -------------------------------------------------------------------------
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.cluster_radius)
+
+    def cluster_members(self, cluster: int) -> np.ndarray:
+        return self.members[self.member_offsets[cluster]:self.member_offsets[cluster + 1]]
+
+    def cluster_at(self, lat: float, lon: float) -> int:
+        """Cluster whose fence contains the ping (nearest center on ties), or -1."""
+        x, y = self._proj.to_xy(lat, lon)
+        x, y = float(x), float(y)
+        key = (math.floor(x / self.cell_m) << 21) + math.floor(y / self.cell_m)
+        best, best_d2 = -1, math.inf
+        for c in self._index_lists.get(key, ()):
+            d2 = (x - self._cx[c]) ** 2 + (y - self._cy[c]) ** 2
+            if d2 <= self.cluster_radius[c] ** 2 and d2 < best_d2:
+                best, best_d2 = c, d2
+        return best
+
+    def locate(self, lat: float, lon: float) -> list[int]:
+        """Stops whose fence contains the ping, nearest first."""
+        x, y = self._proj.to_xy(lat, lon)
+        x, y = float(x), float(y)
+        key = (math.floor(x / self.cell_m) << 21) + math.floor(y / self.cell_m)
+        hits = []
+        for c in self._index_lists.get(key, ()):
+            if (x - self._cx[c]) ** 2 + (y - self._cy[c]) ** 2 > self.cluster_radius[c] ** 2:
+                continue
+            # A containing stop sits in the ping's cell or one of its neighbours
+            for offset in _NEIGHBOUR_KEYS:
+                for stop in self._member_cells.get(self._member_key(c, key + offset), ()):
+                    d2 = (x - self._x[stop]) ** 2 + (y - self._y[stop]) ** 2
+                    if d2 <= self.radius[stop] ** 2:
+                        hits.append((d2, stop))
+        return [stop for _, stop in sorted(hits)]
+
+    def locate_many(self, lat, lon, return_checks: bool = False):
+        """
+        Vectorized containment for a batch of pings.
+
+        Returns:
+            tuple: (nearest containing stop per ping or -1, its cluster or -1),
+            plus the number of cluster + stop distance checks performed when
+            return_checks is set
+        """
+        x, y = self._proj.to_xy(lat, lon)
+        x, y = np.atleast_1d(x), np.atleast_1d(y)
+        n = len(x)
+        stop_out = np.full(n, -1, dtype=np.int64)
+        cluster_out = np.full(n, -1, dtype=np.int64)
+        checks = 0
+        if n and len(self._index_cells):
+            key = self._cell_key(*self._cells(x, y))
+            pos = np.minimum(np.searchsorted(self._index_cells, key), len(self._index_cells) - 1)
+            hit = np.flatnonzero(self._index_cells[pos] == key)
+            ping, slot = _cartesian(hit, np.ones(len(hit), dtype=np.int64),
+                                    self._index_starts[pos[hit]], self._index_counts[pos[hit]])
+            cluster = self._index_clusters[slot]
+            checks += len(cluster)
+            inside = (x[ping] - self._cx[cluster]) ** 2 + (y[ping] - self._cy[cluster]) ** 2 \
+                <= self.cluster_radius[cluster] ** 2
+            ping, cluster = ping[inside], cluster[inside]
+
+            # Members of the matched cluster in the 3 x 3 cells around the
+            # ping: one contiguous run per cell column
+            ping_key = key[ping]
+            pings, slots = [], []
+            for dx in (-1, 0, 1):
+                column = self._member_key(cluster, ping_key + self._cell_key(dx, 0))
+                lo = np.searchsorted(self._member_keys, column - 1, side="left")
+                hi = np.searchsorted(self._member_keys, column + 1, side="right")
+                p, slot = _cartesian(ping, np.ones(len(ping), dtype=np.int64), lo, hi - lo)
+                pings.append(p)
+                slots.append(slot)
+            ping = np.concatenate(pings)
+            stop = self.members[np.concatenate(slots)]
+            checks += len(stop)
+            d2 = (x[ping] - self._x[stop]) ** 2 + (y[ping] - self._y[stop]) ** 2
+            inside = d2 <= self.radius[stop] ** 2
+            ping, stop, d2 = ping[inside], stop[inside], d2[inside]
+
+            # Nearest containing stop per ping: sort by (ping, d2), keep the first
+            order = np.lexsort((d2, ping))
+            ping, stop = ping[order], stop[order]
+            first = np.ones(len(ping), dtype=bool)
+            first[1:] = ping[1:] != ping[:-1]
+            stop_out[ping[first]] = stop[first]
+            cluster_out[ping[first]] = self.labels[stop[first]]
+        if return_checks:
+            return stop_out, cluster_out, checks
+        return stop_out, cluster_out
+
+    def stats(self) -> dict:
+        sizes = np.diff(self.member_offsets)
+        return {
+            "stops": len(self.lat),
+            "clusters": self.n_clusters,
+            "multi_stop_clusters": int((sizes > 1).sum()),
+            "largest_cluster": int(sizes.max()) if len(sizes) else 0,
+            "max_cluster_radius_m": round(float(self.cluster_radius.max()), 1) if len(sizes) else 0.0,
+        }
+
+    def to_json(self) -> dict:
+        """Cluster fences with member lists (stop indices in input order)."""
+        return {
+            "clusters": [
+                {
+                    "id": c,
+                    "lat": round(float(self.center_lat[c]), 7),
+                    "lon": round(float(self.center_lon[c]), 7),
+                    "radius_m": round(float(self.cluster_radius[c]), 1),
+                    "members": sorted(self.cluster_members(c).tolist()),
+                }
+                for c in range(self.n_clusters)
+            ],
+            "stats": self.stats(),
+        }
+
+
+# =============================================================================
+# Benchmark
+# =============================================================================
+
+def synthetic_stops(n_stops: int, seed: int = 7) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """A dense downtown route: stops packed into buildings of 5-40 units."""
+    rng = np.random.default_rng(seed)
+    buildings = max(1, n_stops // 20)
+    span = 0.03 * math.sqrt(n_stops / 5_000)        # same density at any route size
+    b_lat = 40.75 + rng.uniform(0, span, buildings)
+    b_lon = -73.99 + rng.uniform(0, span * 1.3, buildings)
+    which = rng.integers(0, buildings, n_stops)
+    lat = b_lat[which] + rng.normal(0, 5e-5, n_stops)
+    lon = b_lon[which] + rng.normal(0, 6e-5, n_stops)
+    radius = rng.choice([19, 29, 36, 44], n_stops)   # URBAN_HIGH apartment / business fences
+    return lat, lon, radius.astype(np.float64)
+
+
+def bench(n_stops: int, n_pings: int) -> dict:
+    lat, lon, radius = synthetic_stops(n_stops)
+    start = time.perf_counter()
+    fences = ClusterFences(lat, lon, radius)
+    build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    pick = rng.integers(0, n_stops, n_pings)
+    p_lat = lat[pick] + rng.normal(0, 4e-4, n_pings)
+    p_lon = lon[pick] + rng.normal(0, 5e-4, n_pings)
+    start = time.perf_counter()
+    stop, _, checks = fences.locate_many(p_lat, p_lon, return_checks=True)
+    locate_s = time.perf_counter() - start
+    return {
+        **fences.stats(),
+        "build_s": round(build_s, 4),
+        "pings": n_pings,
+        "pings_inside": int((stop >= 0).sum()),
+        "pings_per_s": round(n_pings / locate_s),
+        "checks_per_ping": round(checks / n_pings, 2),
+        "naive_checks_per_ping": n_stops,
+    }
+
+
+# =============================================================================
+# Main Execution
+# =============================================================================
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Merge overlapping stop geofences into cluster fences")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("cluster", help="Cluster a stops CSV")
+    run.add_argument("stops", help="CSV with lat, lon, property_type, address_source, density_category")
+    run.add_argument("--kind", choices=["arrival", "delivery"], default="arrival")
+    run.add_argument("--percentile", default="P95")
+    run.add_argument("--min-overlap", type=float, default=0.0, help="Meters of overlap needed to merge")
+    run.add_argument("--out", default="clusters.json")
+    bench_cmd = sub.add_parser("bench", help="Build + ping containment on a synthetic dense route")
+    bench_cmd.add_argument("--stops", type=int, default=5_000)
+    bench_cmd.add_argument("--pings", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "cluster":
+        with open(args.stops, newline="", encoding="utf-8-sig") as f:
+            stops = [{key.strip().lower(): value for key, value in row.items()} for row in csv.DictReader(f)]
+        for stop in stops:
+            stop["lat"], stop["lon"] = float(stop["lat"]), float(stop["lon"])
+            stop["access_required"] = str(stop.get("access_required", "")).strip().upper() in ("1", "TRUE", "YES", "Y")
+        fences = ClusterFences.from_stops(stops, args.kind, args.percentile, min_overlap_m=args.min_overlap)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(fences.to_json(), f, indent=2)
+        print(json.dumps(fences.stats(), indent=2))
+        print(f"📁 Clusters: {args.out}")
+    else:
+        print(json.dumps(bench(args.stops, args.pings), indent=2))
+
+
+if __name__ == "__main__":
+    main()
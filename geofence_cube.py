@@ -0,0 +1,585 @@
+"""
+Aggregate Cube
+==============
+
+Persisted per-(density, property, source, access, week) aggregates of
+delivery and arrival distances, so reports and roll-ups never rescan raw
+records. Each cell keeps a count, a distance sum and a log-binned
+histogram (DDSketch-style: every quantile within RELATIVE_ACCURACY of the
+true value). Histograms are mergeable, so any roll-up is just a sum.
+
+The cube is built incrementally - each ingest remembers how far into each
+record file it has read and adds only the rows appended since - and stored
+as a compressed columnar .npz holding only populated (cell, week) rows.
+A file rewritten rather than appended to cannot be subtracted back out, so
+ingest refuses it; `ingest --force` rebuilds the cube from every source.
+Rows with a missing field, an unparseable date or distance, or bad UTF-8
+are skipped and counted per source.
+
+Records are the geofence_backtest.py CSV format plus a date column
+(delivery_date / dlvrd_date / dlvrd_dt / date, YYYY-MM-DD...).
+
+Usage:
+    python geofence_cube.py ingest records/2026-10-*.csv --cube geofence_cube.npz
+    python geofence_cube.py ingest records/*.csv --force    # rebuild from scratch
+    python geofence_cube.py rollup --cube geofence_cube.npz --by property_type --where density_category=RURAL
+    python geofence_cube.py report --cube geofence_cube.npz --out geofence_cube_report.html
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import csv
+import hashlib
+import html
+import json
+import math
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+from geofence_backtest import BACKTEST_SOURCES, read_header, record_cell, resolve_columns
+from geofence_model import DENSITY_CATEGORIES, PROPERTY_TYPES
+
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+MIN_DISTANCE_M = 0.5
+MAX_DISTANCE_M = 100_000.0
+# Bin 0: <= MIN_DISTANCE_M; bin i: (MIN * GAMMA^(i-1), MIN * GAMMA^i]; last: overflow
+N_BINS = math.ceil(math.log(MAX_DISTANCE_M / MIN_DISTANCE_M, GAMMA)) + 2
+
+DIMENSIONS = {
+    "density_category": DENSITY_CATEGORIES,
+    "property_type": PROPERTY_TYPES,
+    "address_source": BACKTEST_SOURCES,
+    "access_required": ["NO", "YES"],
+}
+CELL_SHAPE = tuple(len(values) for values in DIMENSIONS.values())
+N_CELLS = math.prod(CELL_SHAPE)   # same order as geofence_backtest cells
+KINDS = ("delivery", "arrival")
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+CHUNK_ROWS = 250_000
+FINGERPRINT_BYTES = 4096   # hashed at each end of the ingested prefix
+
+
+def distance_bins(distances: np.ndarray) -> np.ndarray:
+    """Log-bin index per distance (NaN must be filtered out first)."""
+    scaled = np.maximum(distances, MIN_DISTANCE_M) / MIN_DISTANCE_M
+    bins = np.ceil(np.log(scaled) / math.log(GAMMA) - 1e-9)
+    return np.clip(bins, 0, N_BINS - 1).astype(np.int64)
+
+
+def bin_values() -> np.ndarray:
+    """Representative distance per bin (midpoint in relative terms)."""
+    i = np.arange(N_BINS)
+    values = MIN_DISTANCE_M * 2 * GAMMA ** i / (GAMMA + 1)
+    values[0] = MIN_DISTANCE_M
+    return values
+
+
+BIN_VALUES = bin_values()
+
+
+def iso_week(day: date) -> int:
+    year, week, _ = day.isocalendar()
+    return year * 100 + week
+
+
+def quantiles(hist: np.ndarray, qs=QUANTILES) -> np.ndarray:
+    """Quantiles from histograms of shape (..., N_BINS); NaN where empty."""
+    cumulative = np.cumsum(hist, axis=-1)
+    total = cumulative[..., -1:]
+    out = []
+    for q in qs:
+        index = (cumulative < np.maximum(q * total, 1)).sum(axis=-1)
+        values = BIN_VALUES[np.minimum(index, N_BINS - 1)]
+        out.append(np.where(total[..., 0] > 0, values, np.nan))
+    return np.stack(out, axis=-1)
+
+
+# =============================================================================
+# Cube
+# =============================================================================
+
+class AggregateCube:
+    """
+    Counts, sums and log histograms per (cell, week), dense per week in
+    memory and sparse on disk.
+    """
+
+    def __init__(self):
+        self.weeks: dict[int, dict[str, np.ndarray]] = {}
+        # ingested file -> {"offset", "fingerprint", "rows", "skipped"}
+        self.sources: dict[str, dict] = {}
+        self.skipped_rows = 0   # malformed rows skipped since this cube was loaded
+
+    def _week(self, week: int) -> dict[str, np.ndarray]:
+        block = self.weeks.get(week)
+        if block is None:
+            block = {}
+            for kind in KINDS:
+                block[f"{kind}_count"] = np.zeros(N_CELLS, np.int64)
+                block[f"{kind}_sum"] = np.zeros(N_CELLS, np.float64)
+                block[f"{kind}_hist"] = np.zeros((N_CELLS, N_BINS), np.int64)
+            self.weeks[week] = block
+        return block
+
+    def add(self, cells: np.ndarray, weeks: np.ndarray, delivery: np.ndarray, arrival: np.ndarray) -> None:
+        """Fold a chunk of records (backtest cell index, ISO week, distances) in."""
+        for week in np.unique(weeks):
+            block = self._week(int(week))
+            in_week = weeks == week
+            for kind, distances in zip(KINDS, (delivery, arrival)):
+                keep = in_week & ~np.isnan(distances)
+                c, d = cells[keep], distances[keep]
+                block[f"{kind}_count"] += np.bincount(c, minlength=N_CELLS)
+                block[f"{kind}_sum"] += np.bincount(c, weights=d, minlength=N_CELLS)
+                flat = np.bincount(c * N_BINS + distance_bins(d), minlength=N_CELLS * N_BINS)
+                block[f"{kind}_hist"] += flat.reshape(N_CELLS, N_BINS)
+
+    # -------------------------------------------------------------------------
+    # Ingest
+    # -------------------------------------------------------------------------
+
+    def ingest(self, path: str) -> int:
+        """
+        Add the rows of a records CSV that are not in the cube yet: the whole
+        file the first time, afterwards only complete lines appended since
+        the last ingest. A last line without a newline is left for the next
+        ingest, as it may still be being written.
+
+        Raises:
+            ValueError: The file has no date column, or it shrank or changed
+                        before the ingested offset (rebuild the cube instead)
+
+        Returns:
+            int: Records added (malformed rows are counted in
+                 self.sources[...]["skipped"] and self.skipped_rows)
+        """
+        key = os.path.abspath(path)
+        header, header_len = read_header(path)
+        columns = resolve_columns(header)
+        if "date" not in columns:
+            raise ValueError(f"{path} has no delivery date column")
+
+        entry = self.sources.get(key) or {"offset": header_len, "fingerprint": None, "rows": 0, "skipped": 0}
+        offset = entry["offset"]
+        if offset > os.path.getsize(path) or (
+            entry["fingerprint"] is not None and _fingerprint(path, offset) != entry["fingerprint"]
+        ):
+            raise ValueError(f"{path} was rewritten since it was ingested; rebuild the cube (ingest --force)")
+
+        week_memo: dict[str, int] = {}
+        added = skipped = 0
+
+        def flush(lines: list[bytes]) -> None:
+            nonlocal added, skipped
+            text = []
+            for line in lines:
+                try:
+                    text.append(line.decode("utf-8"))
+                except UnicodeDecodeError:
+                    skipped += 1
+            *arrays, bad = _parse_rows(list(csv.reader(text)), columns, week_memo)
+            self.add(*arrays)
+            added += len(arrays[0])
+            skipped += bad
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            lines = []
+            while True:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if line.strip():
+                    lines.append(line)
+                if len(lines) >= CHUNK_ROWS:
+                    flush(lines)
+                    lines = []
+            if lines:
+                flush(lines)
+
+        self.sources[key] = {
+            "offset": offset,
+            "fingerprint": _fingerprint(path, offset),
+            "rows": entry["rows"] + added,
+            "skipped": entry["skipped"] + skipped,
+        }
+        self.skipped_rows += skipped
+        return added
+
+    @classmethod
+    def rebuild(cls, paths: list[str]) -> "AggregateCube":
+        """A fresh cube holding every row of the given files exactly once."""
+        cube = cls()
+        for path in paths:
+            cube.ingest(path)
+        return cube
+
+    # -------------------------------------------------------------------------
+    # Roll-ups
+    # -------------------------------------------------------------------------
+
+    def stack(self, weeks: list[int] | None = None) -> tuple[list[int], dict[str, np.ndarray]]:
+        """Weeks in order and arrays shaped (W, *CELL_SHAPE[, N_BINS])."""
+        selected = sorted(self.weeks if weeks is None else set(weeks) & set(self.weeks))
+        arrays = {}
+        for name in (f"{kind}_{part}" for kind in KINDS for part in ("count", "sum", "hist")):
+            blocks = [self.weeks[w][name] for w in selected]
+            tail = (N_BINS,) if name.endswith("hist") else ()
+            arrays[name] = (
+                np.stack(blocks).reshape(len(selected), *CELL_SHAPE, *tail)
+                if blocks else np.zeros((0, *CELL_SHAPE, *tail))
+            )
+        return selected, arrays
+
+    def rollup(self, by: tuple[str, ...] = (), where: dict[str, str] | None = None,
+               weeks: list[int] | None = None) -> list[dict]:
+        """
+        Aggregate over every dimension not in `by` (dimensions plus "week").
+
+        Args:
+            by: Dimensions to group by, e.g. ("property_type",) or ("week",)
+            where: Filters, e.g. {"density_category": "RURAL"}
+            weeks: Restrict to these ISO weeks (yyyyww)
+
+        Returns:
+            list[dict]: One row per group with count, mean and quantiles for
+                        delivery and arrival distances
+        """
+        unknown = set(by) | set(where or {})
+        unknown -= set(DIMENSIONS) | {"week"}
+        if unknown:
+            raise ValueError(f"unknown dimensions: {sorted(unknown)}")
+        selected, arrays = self.stack(weeks)
+        axes = ["week"] + list(DIMENSIONS)
+        labels = {"week": selected, **DIMENSIONS}
+
+        for name, value in (where or {}).items():
+            axis = axes.index(name)
+            keep = [i for i, label in enumerate(labels[name]) if str(label) == str(value)]
+            arrays = {key: np.take(array, keep, axis=axis) for key, array in arrays.items()}
+            labels[name] = [labels[name][i] for i in keep]
+
+        reduce_axes = tuple(i for i, name in enumerate(axes) if name not in by)
+        grouped = {key: array.sum(axis=reduce_axes) for key, array in arrays.items()}
+        kept = [name for name in axes if name in by]
+
+        rows = []
+        for index in np.ndindex(*(len(labels[name]) for name in kept)):
+            row = {name: labels[name][i] for name, i in zip(kept, index)}
+            for kind in KINDS:
+                count = int(grouped[f"{kind}_count"][index])
+                row[f"{kind}_count"] = count
+                row[f"{kind}_mean_m"] = round(float(grouped[f"{kind}_sum"][index]) / count, 1) if count else None
+                for q, value in zip(QUANTILES, quantiles(grouped[f"{kind}_hist"][index])):
+                    row[f"{kind}_p{round(q * 100)}_m"] = None if np.isnan(value) else round(float(value), 1)
+            if row["delivery_count"] or row["arrival_count"]:
+                rows.append(row)
+        return rows
+
+    # -------------------------------------------------------------------------
+    # Storage
+    # -------------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write populated (cell, week) rows as compressed columns, atomically."""
+        columns: dict[str, list] = {"week": [], "cell": []}
+        for kind in KINDS:
+            for part in ("count", "sum", "hist"):
+                columns[f"{kind}_{part}"] = []
+        for week in sorted(self.weeks):
+            block = self.weeks[week]
+            populated = np.flatnonzero(block["delivery_count"] + block["arrival_count"])
+            columns["week"].append(np.full(len(populated), week, np.uint32))
+            columns["cell"].append(populated.astype(np.uint16))
+            for name in columns:
+                if name not in ("week", "cell"):
+                    columns[name].append(block[name][populated])
+
+        arrays = {}
+        for name, parts in columns.items():
+            arrays[name] = np.concatenate(parts) if parts else np.zeros(0)
+        for kind in KINDS:
+            arrays[f"{kind}_hist"] = arrays[f"{kind}_hist"].reshape(-1, N_BINS).astype(np.uint32)
+            arrays[f"{kind}_count"] = arrays[f"{kind}_count"].astype(np.uint32)
+        meta = {
+            "relative_accuracy": RELATIVE_ACCURACY, "min_distance_m": MIN_DISTANCE_M,
+            "n_bins": N_BINS, "dimensions": DIMENSIONS, "sources": self.sources,
+        }
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AggregateCube":
+        """Read a saved cube (empty if the file is missing)."""
+        cube = cls()
+        if not os.path.exists(path):
+            return cube
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if (meta["n_bins"], meta["relative_accuracy"], meta["dimensions"]) != (
+                N_BINS, RELATIVE_ACCURACY, DIMENSIONS
+            ):
+                raise ValueError(f"{path} was built with a different cube layout; rebuild it")
+            cube.sources = meta["sources"]
+            columns = {name: data[name] for name in data.files if name != "meta"}
+        weeks, cells = columns.pop("week"), columns.pop("cell").astype(np.int64)
+        for week in np.unique(weeks):
+            rows = weeks == week
+            block = cube._week(int(week))
+            for name, values in columns.items():
+                block[name][cells[rows]] = values[rows]
+        return cube
+
+
+def _fingerprint(path: str, offset: int) -> str:
+    """Hash of the first and last FINGERPRINT_BYTES of a file's first `offset` bytes."""
+    digest = hashlib.sha256(str(offset).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    return digest.hexdigest()[:16]
+
+
+def _parse_rows(rows: list[list[str]], columns: dict[str, int], week_memo: dict[str, int]):
+    """
+    Arrays for the well-formed rows plus how many were skipped: too few
+    fields, or a date / distance that does not parse. Missing trailing
+    access / arrival fields read as blank, as in geofence_backtest.
+    """
+    ci, pi, si, di = columns["density"], columns["property"], columns["source"], columns["delivery"]
+    ai, ri, ti = columns.get("access"), columns.get("arrival"), columns["date"]
+    width = max(ci, pi, si, di, ti) + 1
+    n = len(rows)
+    cells = np.empty(n, np.int64)
+    weeks = np.empty(n, np.int64)
+    delivery = np.full(n, np.nan)
+    arrival = np.full(n, np.nan)
+    kept = 0
+    for row in rows:
+        if len(row) < width:
+            continue
+        try:
+            day = row[ti][:10]
+            week = week_memo.get(day)
+            if week is None:
+                week = week_memo[day] = iso_week(date.fromisoformat(day))
+            dlv = float(row[di]) if row[di] else np.nan
+            arr = float(row[ri]) if ri is not None and ri < len(row) and row[ri] else np.nan
+        except ValueError:
+            continue
+        access = row[ai] if ai is not None and ai < len(row) else ""
+        cells[kept] = record_cell(row[ci], row[pi], row[si], access)
+        weeks[kept], delivery[kept], arrival[kept] = week, dlv, arr
+        kept += 1
+    return cells[:kept], weeks[:kept], delivery[:kept], arrival[:kept], n - kept
+
+
+# =============================================================================
+# HTML Report
+# =============================================================================
+
+_REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Geofence Distance Cube Report</title>
+    <script src="https://cdn.tailwindcss.com"></script>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <style>.chart-container {{ position: relative; height: 300px; }}</style>
+</head>
+<body class="bg-gray-50 min-h-screen">
+    <header class="bg-[#0053e2] text-white py-6 shadow-lg">
+        <div class="max-w-7xl mx-auto px-4">
+            <h1 class="text-3xl font-bold">🎯 Geofence Distance Report</h1>
+            <p class="text-blue-100 mt-2">Generated from the aggregate cube - {weeks_label}</p>
+        </div>
+    </header>
+    <main class="max-w-7xl mx-auto px-4 py-8">
+        <section class="grid md:grid-cols-3 gap-6 mb-8">
+            <div class="bg-white border-l-4 border-[#0053e2] p-4 rounded-r-lg shadow-md">
+                <p class="text-3xl font-bold text-[#0053e2]">{deliveries}</p>
+                <p class="text-gray-600">Deliveries</p>
+            </div>
+            <div class="bg-white border-l-4 border-[#ffc220] p-4 rounded-r-lg shadow-md">
+                <p class="text-3xl font-bold text-yellow-700">{delivery_p95} m</p>
+                <p class="text-gray-600">Overall delivery P95</p>
+            </div>
+            <div class="bg-white border-l-4 border-[#2a8703] p-4 rounded-r-lg shadow-md">
+                <p class="text-3xl font-bold text-[#2a8703]">{arrival_p95} m</p>
+                <p class="text-gray-600">Overall arrival P95</p>
+            </div>
+        </section>
+        <div class="grid md:grid-cols-2 gap-8 mb-8">
+{chart_sections}
+        </div>
+        <section class="bg-white rounded-xl shadow-md p-6 mb-8">
+            <h2 class="text-2xl font-bold text-[#0053e2] mb-4">Density × Property P95 (meters)</h2>
+            <div class="overflow-x-auto">
+                <table class="w-full text-left border-collapse">
+                    <thead><tr class="bg-[#0053e2] text-white">{table_head}</tr></thead>
+                    <tbody class="text-gray-700">{table_body}</tbody>
+                </table>
+            </div>
+        </section>
+    </main>
+    <script>
+        Chart.defaults.font.family = 'system-ui, -apple-system, sans-serif';
+        const CHARTS = {charts_json};
+        for (const [id, spec] of Object.entries(CHARTS)) {{
+            new Chart(document.getElementById(id), {{
+                type: spec.type,
+                data: {{
+                    labels: spec.labels,
+                    datasets: spec.datasets.map((d, i) => ({{
+                        ...d,
+                        borderColor: ['#0053e2', '#ffc220', '#2a8703', '#ea1100'][i],
+                        backgroundColor: ['#0053e2', '#ffc220', '#2a8703', '#ea1100'][i] + (spec.type === 'line' ? '20' : ''),
+                        borderRadius: 6,
+                        tension: 0.3
+                    }}))
+                }},
+                options: {{
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    scales: {{ y: {{ beginAtZero: true, title: {{ display: true, text: spec.yLabel }} }} }}
+                }}
+            }});
+        }}
+    </script>
+</body>
+</html>
+"""
+
+_CHART_SECTION = """            <section class="bg-white rounded-xl shadow-md p-6">
+                <h3 class="text-xl font-bold text-gray-800 mb-4">{title}</h3>
+                <div class="chart-container"><canvas id="{chart_id}"></canvas></div>
+            </section>"""
+
+
+def _bar_chart(rows: list[dict], dimension: str) -> dict:
+    return {
+        "type": "bar",
+        "labels": [row[dimension] for row in rows],
+        "datasets": [
+            {"label": "Delivery P95 (m)", "data": [row["delivery_p95_m"] for row in rows]},
+            {"label": "Arrival P95 (m)", "data": [row["arrival_p95_m"] for row in rows]},
+        ],
+        "yLabel": "Radius (meters)",
+    }
+
+
+def render_report(cube: AggregateCube, weeks: list[int] | None = None) -> str:
+    """Self-contained HTML report (Tailwind + Chart.js) built from roll-ups."""
+    overall = cube.rollup(weeks=weeks)
+    overall = overall[0] if overall else {"delivery_count": 0, "delivery_p95_m": None, "arrival_p95_m": None}
+    charts = {}
+    sections = []
+    for chart_id, title, dimension in (
+        ("propertyChart", "📊 P95 by Property Type", "property_type"),
+        ("sourceChart", "📍 P95 by Address Source", "address_source"),
+        ("densityChart", "🏙️ P95 by Population Density", "density_category"),
+    ):
+        charts[chart_id] = _bar_chart(cube.rollup(by=(dimension,), weeks=weeks), dimension)
+        sections.append(_CHART_SECTION.format(title=title, chart_id=chart_id))
+
+    trend = cube.rollup(by=("week",), weeks=weeks)
+    charts["trendChart"] = {
+        "type": "line",
+        "labels": [f"{row['week'] // 100}-W{row['week'] % 100:02d}" for row in trend],
+        "datasets": [
+            {"label": "Delivery P95 (m)", "data": [row["delivery_p95_m"] for row in trend]},
+            {"label": "Arrival P95 (m)", "data": [row["arrival_p95_m"] for row in trend]},
+        ],
+        "yLabel": "Radius (meters)",
+    }
+    sections.append(_CHART_SECTION.format(title="📈 Weekly P95 Trend", chart_id="trendChart"))
+
+    grid = {(row["density_category"], row["property_type"]): row
+            for row in cube.rollup(by=("density_category", "property_type"), weeks=weeks)}
+    head = "".join(f'<th class="p-3">{html.escape(name)}</th>' for name in ["Density"] + PROPERTY_TYPES)
+    body = []
+    for density in DENSITY_CATEGORIES:
+        cells = []
+        for prop in PROPERTY_TYPES:
+            row = grid.get((density, prop))
+            value = row["delivery_p95_m"] if row else None
+            cells.append(f'<td class="p-3 font-mono">{"-" if value is None else f"{value:.0f}m"}</td>')
+        body.append(f'<tr class="border-b"><td class="p-3 font-semibold">{density}</td>{"".join(cells)}</tr>')
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.0f}"
+
+    selected = [row["week"] for row in trend]
+    weeks_label = f"{selected[0]}…{selected[-1]} (ISO weeks)" if selected else "no data"
+    return _REPORT_TEMPLATE.format(
+        weeks_label=weeks_label,
+        deliveries=f"{overall['delivery_count']:,}",
+        delivery_p95=fmt(overall["delivery_p95_m"]),
+        arrival_p95=fmt(overall["arrival_p95_m"]),
+        chart_sections="\n".join(sections),
+        table_head=head,
+        table_body="".join(body),
+        charts_json=json.dumps(charts).replace("</", "<\\/"),
+    )
+
+
+# =============================================================================
+# Main Execution
+# =============================================================================
+
+def _parse_where(items: list[str]) -> dict[str, str]:
+    return dict(item.split("=", 1) for item in items)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Aggregate cube for geofence distance reports")
+    parser.add_argument("--cube", default="geofence_cube.npz")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Add record CSVs to the cube")
+    ingest.add_argument("records", nargs="+")
+    ingest.add_argument("--force", action="store_true",
+                        help="Rebuild the cube from scratch from these and all previously ingested files")
+    rollup = sub.add_parser("rollup", help="Print a roll-up as JSON")
+    rollup.add_argument("--by", action="append", default=[])
+    rollup.add_argument("--where", action="append", default=[], help="dimension=value")
+    report = sub.add_parser("report", help="Render the HTML report")
+    report.add_argument("--out", default="geofence_cube_report.html")
+    for cmd in (rollup, report):
+        cmd.add_argument("--week", type=int, action="append", help="ISO week yyyyww (repeatable)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cube = AggregateCube.load(args.cube)
+    if args.command == "ingest":
+        if args.force:
+            paths = [os.path.abspath(path) for path in args.records]
+            missing = [path for path in cube.sources if path not in paths and not os.path.exists(path)]
+            for path in missing:
+                print(f"⚠️  {path} no longer exists; dropped from the rebuilt cube")
+            paths += [path for path in cube.sources if path not in paths and path not in missing]
+            cube = AggregateCube.rebuild(paths)
+            added = sum(entry["rows"] for entry in cube.sources.values())
+        else:
+            added = sum(cube.ingest(path) for path in args.records)
+        cube.save(args.cube)
+        print(f"✅ Ingested {added:,} records ({cube.skipped_rows:,} malformed rows skipped); "
+              f"cube holds {len(cube.weeks)} weeks -> {args.cube}")
+    elif args.command == "rollup":
+        print(json.dumps(cube.rollup(tuple(args.by), _parse_where(args.where), args.week), indent=2))
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(render_report(cube, args.week))
+        print(f"📁 Report: {args.out} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,9 +25,24 @@ Author: Code Puppy 🐶
 Date: January 29, 2026
 """
 
-from typing import Literal, Optional
+import csv
+import hashlib
+import json
+import math
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, Literal, Optional
 from enum import Enum
 
+try:
+    import numpy as np
+except ImportError:  # vectorized paths fall back to pure Python
+    np = None
+
 
 # =============================================================================
 # Type Definitions
@@ -62,6 +77,14 @@ class AccessRequired(str, Enum):
     NO = "NO"      # No access restrictions
 
 
+# Valid values, in the order used by the compiled radius table.
+# MANUAL_ADJ has no lookup data and normalizes to AMS like any unknown source.
+PROPERTY_TYPES: list[str] = [p.value for p in PropertyType]
+ADDRESS_SOURCES: list[str] = ["AMS", "GOOGLE", "MAPBOX", "CUSTOMER_PIN"]
+DENSITY_CATEGORIES: list[str] = [d.value for d in DensityCategory]
+PERCENTILES: list[str] = ["P90", "P95", "P99"]
+
+
 # =============================================================================
 # Geofence Lookup Table (P95 Percentile - captures 95% of deliveries)
 # =============================================================================
@@ -385,6 +408,33 @@ def get_density_from_zip(zip_code: str, zip_density_map: dict[str, float]) -> st
     return get_density_category(density)
 
 
+def adjust_radius(
+    base_radius: float,
+    property_type: str,
+    percentile: str = "P95",
+    access_required: bool = False,
+) -> int:
+    """
+    Apply the access multiplier and percentile scaling to a P95 base radius.
+    
+    Args:
+        base_radius: P95 radius in meters from a lookup table
+        property_type: Normalized property type (selects the access multiplier)
+        percentile: P90, P95 or P99 (anything else is treated as P95)
+        access_required: Whether the property requires access code/buzzer
+    
+    Returns:
+        int: Radius in meters
+    """
+    if access_required:
+        base_radius = base_radius * ACCESS_MULTIPLIERS.get(property_type, 1.0)
+    if percentile == "P90":
+        return int(base_radius * 0.85)  # P90 is ~15% smaller than P95
+    elif percentile == "P99":
+        return int(base_radius * 1.8)   # P99 is ~80% larger than P95
+    return int(base_radius)
+
+
 def normalize_input(value: str, valid_values: list[str], default: str) -> str:
     """
     Normalize and validate input values.
@@ -403,6 +453,283 @@ def normalize_input(value: str, valid_values: list[str], default: str) -> str:
     return normalized if normalized in valid_values else default
 
 
+# USPS-style abbreviations so "123 Main Street" == "123 MAIN ST"
+ABBREVIATIONS = {
+    "STREET": "ST", "AVENUE": "AVE", "ROAD": "RD", "DRIVE": "DR",
+    "LANE": "LN", "COURT": "CT", "BOULEVARD": "BLVD", "PLACE": "PL",
+    "CIRCLE": "CIR", "TERRACE": "TER", "PARKWAY": "PKWY", "HIGHWAY": "HWY",
+    "TRAIL": "TRL", "SQUARE": "SQ", "APARTMENT": "APT", "SUITE": "STE",
+    "BUILDING": "BLDG", "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+}
+
+_ADDRESS_PUNCTUATION = re.compile(r"[^A-Z0-9 #]+")
+_UNIT_DESIGNATORS = frozenset({"APT", "STE", "UNIT"})
+
+
+def normalize_address(line_1: str, line_2: str = "", city: str = "") -> str:
+    """
+    Normalize an address to a canonical uppercase token string.
+
+    Args:
+        line_1: Street line (CUST_RQ_ADDR_LINE_1_TXT)
+        line_2: Unit line (CUST_RQ_ADDR_LINE_2_TXT)
+        city: City name (CUST_RQ_CITY_NM)
+
+    Returns:
+        str: e.g. "123 MAIN ST APT 4 BENTONVILLE"
+    """
+    text = " ".join(part for part in (line_1, line_2, city) if part)
+    text = _ADDRESS_PUNCTUATION.sub(" ", text.upper().replace("#", " # "))
+    tokens = []
+    for tok in text.split():
+        if tok == "#":
+            # "#4" means APT 4, but "Apt #4" / "Ste #4" already name the unit
+            if tokens and tokens[-1] in _UNIT_DESIGNATORS:
+                continue
+            tok = "APT"
+        tokens.append(ABBREVIATIONS.get(tok, tok))
+    return " ".join(tokens)
+
+
+# =============================================================================
+# Local Radius Overrides (geo-cell -> ZIP -> density table)
+# =============================================================================
+# Density only has four buckets, so some markets need local radii: specific
+# ZIPs, DORM campuses, problem apartment complexes. Overrides live in packed
+# sorted key arrays (8-byte key + two int16 radii = 12 bytes each) searched
+# with bisect, so millions of entries stay compact and lookups O(log n).
+
+# Geo-cell grid size (~110m north-south)
+GEO_CELL_DEGREES: float = 0.001
+
+# Property code meaning "any property type" in an override key
+_ANY_PROPERTY: int = 7
+
+# Marks "no override for this radius kind" (e.g. delivery-only overrides)
+NO_OVERRIDE: int = -1
+
+
+def geo_cell(lat: float, lon: float) -> int:
+    """Integer grid cell id for a coordinate."""
+    # floor(a / b), not a // b: must match the vectorized path bit for bit
+    row = math.floor((lat + 90.0) / GEO_CELL_DEGREES)
+    col = math.floor((lon + 180.0) / GEO_CELL_DEGREES)
+    return (row << 20) | col
+
+
+def _override_key(location: int, property_code: int) -> int:
+    return (location << 3) | property_code
+
+
+class RadiusOverrides:
+    """
+    Hierarchical per-geo-cell and per-ZIP radius overrides.
+    
+    Each level is three parallel arrays sorted by key: uint64 keys
+    (location << 3 | property code) and int16 delivery/arrival P95 radii.
+    Overrides replace the base (P95) radius; access and percentile
+    adjustments still apply on top.
+    """
+
+    LEVELS = ("GEO", "ZIP")
+
+    def __init__(self, rows: list[tuple[str, int, int, int, int]] = ()):
+        """
+        Args:
+            rows: (level, location, property_code, delivery_m, arrival_m)
+                  where location is a geo_cell() id or an integer ZIP.
+                  Later rows win on duplicate keys.
+        """
+        merged: dict[str, dict[int, tuple[int, int]]] = {level: {} for level in self.LEVELS}
+        for level, location, property_code, delivery, arrival in rows:
+            if level not in merged:
+                raise ValueError(f"unknown override level {level!r} (expected one of {self.LEVELS})")
+            merged[level][_override_key(location, property_code)] = (delivery, arrival)
+
+        self._keys: dict[str, array] = {}
+        self._radii: dict[str, tuple[array, array]] = {}
+        for level, entries in merged.items():
+            keys = sorted(entries)
+            self._keys[level] = array("Q", keys)
+            self._radii[level] = (
+                array("h", (entries[k][0] for k in keys)),
+                array("h", (entries[k][1] for k in keys)),
+            )
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._keys.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the packed arrays."""
+        return sum(
+            len(self._keys[level]) * (self._keys[level].itemsize + 2 * self._radii[level][0].itemsize)
+            for level in self.LEVELS
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RadiusOverrides":
+        """
+        Load overrides from a CSV file with columns:
+        level (GEO|ZIP), zip_code, lat, lon, property_type (blank = any),
+        delivery_m, arrival_m (blank = no override for that radius).
+
+        Raises:
+            ValueError: A row has an unknown level or an unparseable
+                        location or radius; the message names the CSV line.
+        """
+        def radius(value: str) -> int:
+            if value in (None, ""):
+                return NO_OVERRIDE
+            meters = int(float(value))
+            # Packed into array('h'); NO_OVERRIDE (-1) is reserved
+            if not 0 <= meters <= 32767:
+                raise ValueError(f"radius {value!r} outside 0..32767 m")
+            return meters
+
+        rows = []
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                level = (row.get("level") or "").strip().upper()
+                try:
+                    if level == "GEO":
+                        location = geo_cell(float(row["lat"]), float(row["lon"]))
+                    elif level == "ZIP":
+                        location = int(row["zip_code"][:5])
+                    else:
+                        raise ValueError(f"unknown level {level!r} (expected one of {cls.LEVELS})")
+                    delivery, arrival = radius(row.get("delivery_m")), radius(row.get("arrival_m"))
+                    prop = (row.get("property_type") or "").strip().upper()
+                    if not prop:
+                        property_code = _ANY_PROPERTY
+                    elif prop in PROPERTY_TYPES:
+                        property_code = PROPERTY_TYPES.index(prop)
+                    else:
+                        raise ValueError(f"unknown property_type {prop!r} (expected one of {PROPERTY_TYPES} or blank)")
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError(f"{path} line {reader.line_num}: bad override row {row}: {e}") from e
+                rows.append((level, location, property_code, delivery, arrival))
+        return cls(rows)
+
+    def _find(self, level: str, location: int, property_code: int, kind: int) -> Optional[int]:
+        keys = self._keys[level]
+        if not keys:
+            return None
+        radii = self._radii[level][kind]
+        for code in (property_code, _ANY_PROPERTY):
+            key = _override_key(location, code)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key and radii[i] != NO_OVERRIDE:
+                return radii[i]
+        return None
+
+    def resolve(
+        self,
+        property_type: str,
+        zip_code: Optional[str] = None,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        kind: int = 0,
+    ) -> Optional[int]:
+        """
+        Most specific override (geo-cell, then ZIP) for one stop.
+        
+        Args:
+            property_type: Normalized property type
+            kind: 0 = delivery, 1 = arrival
+        
+        Returns:
+            int or None: Override P95 radius, None to fall through
+        """
+        property_code = PROPERTY_TYPES.index(property_type)
+        # Missing or non-finite coordinates have no cell: fall through to ZIP
+        if lat is not None and lon is not None and math.isfinite(lat) and math.isfinite(lon):
+            found = self._find("GEO", geo_cell(lat, lon), property_code, kind)
+            if found is not None:
+                return found
+        if zip_code:
+            try:
+                return self._find("ZIP", int(str(zip_code)[:5]), property_code, kind)
+            except ValueError:
+                return None
+        return None
+
+    def resolve_many(
+        self,
+        property_types: list[str],
+        zip_codes: Optional[list] = None,
+        lats: Optional[list] = None,
+        lons: Optional[list] = None,
+        kind: int = 0,
+    ) -> list[int]:
+        """
+        Vectorized resolve: override radius per stop, NO_OVERRIDE where none.
+        
+        Uses numpy searchsorted over the packed arrays when numpy is
+        installed, bisect otherwise.
+        """
+        n = len(property_types)
+        if np is None:
+            return [
+                r if r is not None else NO_OVERRIDE
+                for r in (
+                    self.resolve(
+                        property_types[i],
+                        zip_codes[i] if zip_codes is not None else None,
+                        lats[i] if lats is not None else None,
+                        lons[i] if lons is not None else None,
+                        kind,
+                    )
+                    for i in range(n)
+                )
+            ]
+
+        codes = np.array([PROPERTY_TYPES.index(p) for p in property_types], dtype=np.uint64)
+        result = np.full(n, NO_OVERRIDE, dtype=np.int16)
+        locations = []
+        if lats is not None and lons is not None:
+            lat_arr = np.asarray(lats, dtype=np.float64)
+            lon_arr = np.asarray(lons, dtype=np.float64)
+            valid = np.isfinite(lat_arr) & np.isfinite(lon_arr)
+            rows = np.floor((np.where(valid, lat_arr, 0) + 90.0) / GEO_CELL_DEGREES).astype(np.uint64)
+            cols = np.floor((np.where(valid, lon_arr, 0) + 180.0) / GEO_CELL_DEGREES).astype(np.uint64)
+            locations.append(("GEO", (rows << np.uint64(20)) | cols, valid))
+        if zip_codes is not None:
+            zips = np.array([int(str(z)[:5]) if str(z)[:5].isdigit() else 0 for z in zip_codes], dtype=np.uint64)
+            locations.append(("ZIP", zips, zips > 0))
+
+        for level, location, valid in locations:
+            keys = np.frombuffer(self._keys[level], dtype=np.uint64) if self._keys[level] else None
+            if keys is None:
+                continue
+            radii = np.frombuffer(self._radii[level][kind], dtype=np.int16)
+            for code in (codes, np.full(n, _ANY_PROPERTY, dtype=np.uint64)):
+                wanted = (location << np.uint64(3)) | code
+                pos = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+                hit = valid & (keys[pos] == wanted) & (radii[pos] != NO_OVERRIDE) & (result == NO_OVERRIDE)
+                result[hit] = radii[pos][hit]
+        return result.tolist()
+
+
+# Active overrides consulted by get_geofence_radius / get_arrival_radius
+_RADIUS_OVERRIDES: Optional[RadiusOverrides] = None
+
+
+def set_radius_overrides(overrides: Optional[RadiusOverrides]) -> None:
+    """Install (or clear, with None) the override layer."""
+    global _RADIUS_OVERRIDES
+    _RADIUS_OVERRIDES = overrides
+
+
+def load_radius_overrides(path: str) -> RadiusOverrides:
+    """Load overrides from a CSV file and install them."""
+    overrides = RadiusOverrides.load(path)
+    set_radius_overrides(overrides)
+    return overrides
+
+
 # =============================================================================
 # Main Prediction Function
 # =============================================================================
@@ -412,7 +739,11 @@ def get_geofence_radius(
     address_source: str,
     density_category: str,
     percentile: Literal["P90", "P95", "P99"] = "P95",
-    access_required: bool = False
+    access_required: bool = False,
+    zip_code: Optional[str] = None,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    model_key: Optional[str] = None,
 ) -> int:
     """
     Get the recommended geofence radius in meters.
@@ -435,6 +766,11 @@ def get_geofence_radius(
         access_required: Whether the property requires access code/buzzer.
                          Default is False. When True, radius is increased
                          based on property type (apartments +28%, etc.)
+        zip_code: Optional 5-digit ZIP, checked against radius overrides
+        lat, lon: Optional stop coordinates, checked against geo-cell
+                  overrides before the ZIP
+        model_key: Optional market, experiment key or version name; routes
+                   the lookup to that table version in geofence_registry
     
     Returns:
         int: Recommended geofence radius in meters
@@ -446,35 +782,34 @@ def get_geofence_radius(
         205
     """
     # Normalize inputs
-    valid_properties = ["HOUSE", "APARTMENT", "BUSINESS", "MOBILE_HOME", "DORM", "OTHER"]
-    valid_sources = ["AMS", "GOOGLE", "MAPBOX", "CUSTOMER_PIN"]
-    valid_densities = ["URBAN_HIGH", "URBAN_MEDIUM", "SUBURBAN", "RURAL"]
+    prop = normalize_input(property_type, PROPERTY_TYPES, "HOUSE")
+    source = normalize_input(address_source, ADDRESS_SOURCES, "AMS")
+    density = normalize_input(density_category, DENSITY_CATEGORIES, "SUBURBAN")
     
-    prop = normalize_input(property_type, valid_properties, "HOUSE")
-    source = normalize_input(address_source, valid_sources, "AMS")
-    density = normalize_input(density_category, valid_densities, "SUBURBAN")
+    # Local overrides first (geo-cell, then ZIP)
+    base_radius = None
+    if _RADIUS_OVERRIDES is not None:
+        base_radius = _RADIUS_OVERRIDES.resolve(prop, zip_code, lat, lon, kind=0)
+    
+    # Routed table version (market / experiment)
+    if base_radius is None and model_key is not None:
+        from geofence_registry import get_registry
+        return get_registry().resolve(model_key).delivery_radius(
+            prop, source, density, percentile, access_required
+        )
     
     # Look up base radius (P95)
-    key = (density, prop, source)
-    base_radius = GEOFENCE_LOOKUP.get(key)
+    if base_radius is None:
+        key = (density, prop, source)
+        base_radius = GEOFENCE_LOOKUP.get(key)
     
     # Fallback hierarchy
     if base_radius is None:
         # Try without source specificity
         base_radius = DEFAULT_BY_PROPERTY.get(prop, DEFAULT_RADIUS)
     
-    # Apply access multiplier if access is required
-    if access_required:
-        access_multiplier = ACCESS_MULTIPLIERS.get(prop, 1.0)
-        base_radius = base_radius * access_multiplier
-    
-    # Adjust for different percentiles
-    if percentile == "P90":
-        return int(base_radius * 0.85)  # P90 is ~15% smaller than P95
-    elif percentile == "P99":
-        return int(base_radius * 1.8)   # P99 is ~80% larger than P95
-    else:  # P95 (default)
-        return int(base_radius)
+    # Apply access multiplier and percentile scaling
+    return adjust_radius(base_radius, prop, percentile, access_required)
 
 
 def get_arrival_radius(
@@ -482,7 +817,11 @@ def get_arrival_radius(
     address_source: str,
     density_category: str,
     percentile: Literal["P90", "P95", "P99"] = "P95",
-    access_required: bool = False
+    access_required: bool = False,
+    zip_code: Optional[str] = None,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    model_key: Optional[str] = None,
 ) -> int:
     """
     Get the recommended arrival radius in meters (where driver parks).
@@ -503,6 +842,11 @@ def get_arrival_radius(
                     Default is P95 (captures 95% of arrivals)
         access_required: Whether the property requires access code/buzzer.
                          Default is False.
+        zip_code: Optional 5-digit ZIP, checked against radius overrides
+        lat, lon: Optional stop coordinates, checked against geo-cell
+                  overrides before the ZIP
+        model_key: Optional market, experiment key or version name; routes
+                   the lookup to that table version in geofence_registry
     
     Returns:
         int: Recommended arrival radius in meters
@@ -514,35 +858,34 @@ def get_arrival_radius(
         164
     """
     # Normalize inputs
-    valid_properties = ["HOUSE", "APARTMENT", "BUSINESS", "MOBILE_HOME", "DORM", "OTHER"]
-    valid_sources = ["AMS", "GOOGLE", "MAPBOX", "CUSTOMER_PIN"]
-    valid_densities = ["URBAN_HIGH", "URBAN_MEDIUM", "SUBURBAN", "RURAL"]
-    
-    prop = normalize_input(property_type, valid_properties, "HOUSE")
-    source = normalize_input(address_source, valid_sources, "AMS")
-    density = normalize_input(density_category, valid_densities, "SUBURBAN")
+    prop = normalize_input(property_type, PROPERTY_TYPES, "HOUSE")
+    source = normalize_input(address_source, ADDRESS_SOURCES, "AMS")
+    density = normalize_input(density_category, DENSITY_CATEGORIES, "SUBURBAN")
     
-    # Look up base arrival radius (P95) - same structure as delivery lookup
-    key = (density, prop, source)
-    base_radius = ARRIVAL_GEOFENCE_LOOKUP.get(key)
+    # Local overrides first (geo-cell, then ZIP)
+    base_radius = None
+    if _RADIUS_OVERRIDES is not None:
+        base_radius = _RADIUS_OVERRIDES.resolve(prop, zip_code, lat, lon, kind=1)
     
-    # Fallback hierarchy
-    if base_radius is None:
-        # Try without source specificity
-        base_radius = DEFAULT_ARRIVAL_BY_PROPERTY.get(prop, 50)
-    
-    # Apply access multiplier if access is required (same as delivery)
-    if access_required:
-        access_multiplier = ACCESS_MULTIPLIERS.get(prop, 1.0)
-        base_radius = base_radius * access_multiplier
-    
-    # Adjust for different percentiles
-    if percentile == "P90":
-        arrival_radius = int(base_radius * 0.85)  # P90 is ~15% smaller than P95
-    elif percentile == "P99":
-        arrival_radius = int(base_radius * 1.8)   # P99 is ~80% larger than P95
-    else:  # P95 (default)
-        arrival_radius = int(base_radius)
+    if base_radius is None and model_key is not None:
+        # Routed table version (market / experiment)
+        from geofence_registry import get_registry
+        arrival_radius = get_registry().resolve(model_key).arrival_radius(
+            prop, source, density, percentile, access_required
+        )
+    else:
+        # Look up base arrival radius (P95) - same structure as delivery lookup
+        if base_radius is None:
+            key = (density, prop, source)
+            base_radius = ARRIVAL_GEOFENCE_LOOKUP.get(key)
+        
+        # Fallback hierarchy
+        if base_radius is None:
+            # Try without source specificity
+            base_radius = DEFAULT_ARRIVAL_BY_PROPERTY.get(prop, 50)
+        
+        # Apply access multiplier and percentile scaling (same as delivery)
+        arrival_radius = adjust_radius(base_radius, prop, percentile, access_required)
     
     # Ensure arrival >= delivery (driver parks at least as far as they deliver)
     # This handles edge cases like DORM/UNIVERSITY where delivery might be larger
@@ -552,6 +895,10 @@ def get_arrival_radius(
         density_category=density,
         percentile=percentile,
         access_required=access_required,
+        zip_code=zip_code,
+        lat=lat,
+        lon=lon,
+        model_key=model_key,
     )
     
     return max(arrival_radius, delivery_radius)
@@ -578,24 +925,493 @@ def get_geofence_radius_with_zip(
         int: Recommended geofence radius in meters
     """
     density_category = get_density_from_zip(zip_code, zip_density_map)
-    return get_geofence_radius(property_type, address_source, density_category, percentile)
+    return get_geofence_radius(
+        property_type, address_source, density_category, percentile, zip_code=zip_code
+    )
+
+
+# =============================================================================
+# Compiled Radius Table
+# =============================================================================
+# Every (kind, density, property, source, percentile, access) combination
+# precomputed into one flat int16 array. This is the single artifact the
+# browser model, the UI matrix and fast lookups are generated from, so the
+# Python functions above stay the only definition of the model.
+
+RADIUS_KINDS: list[str] = ["DELIVERY", "ARRIVAL"]
+
+# Axis sizes, outermost first
+TABLE_SHAPE: tuple[int, ...] = (
+    len(RADIUS_KINDS),
+    len(DENSITY_CATEGORIES),
+    len(PROPERTY_TYPES),
+    len(ADDRESS_SOURCES),
+    len(PERCENTILES),
+    2,  # access_required: False, True
+)
+
+# Flat-index step per axis (row-major over TABLE_SHAPE), so adding a density,
+# property or source never leaves a hardcoded stride behind
+TABLE_STRIDES: tuple[int, ...] = tuple(
+    math.prod(TABLE_SHAPE[axis + 1:]) for axis in range(len(TABLE_SHAPE))
+)
+
+
+def table_index(
+    kind: int, density: int, prop: int, source: int, percentile: int, access: int
+) -> int:
+    """Flat index into the compiled table from per-axis codes."""
+    k, d, p, s, pct, a = TABLE_STRIDES
+    return kind * k + density * d + prop * p + source * s + percentile * pct + access * a
+
+
+def compile_radius_table(
+    delivery_lookup: Optional[dict] = None,
+    arrival_lookup: Optional[dict] = None,
+) -> array:
+    """
+    Evaluate the model for every combination into a flat int16 array.
+    
+    Args:
+        delivery_lookup: Optional (density, property, source) -> P95 table
+                         to compile instead of GEOFENCE_LOOKUP
+        arrival_lookup: Same for ARRIVAL_GEOFENCE_LOOKUP
+    
+    Returns:
+        array: int16 radii (meters) in TABLE_SHAPE order
+    """
+    if delivery_lookup is None and arrival_lookup is None:
+        radius_fns = (get_geofence_radius, get_arrival_radius)
+    else:
+        delivery_lookup = GEOFENCE_LOOKUP if delivery_lookup is None else delivery_lookup
+        arrival_lookup = ARRIVAL_GEOFENCE_LOOKUP if arrival_lookup is None else arrival_lookup
+
+        # Same fallbacks and scaling as get_geofence_radius / get_arrival_radius
+        def delivery_fn(prop, source, density, percentile, access):
+            base = delivery_lookup.get((density, prop, source), DEFAULT_BY_PROPERTY.get(prop, DEFAULT_RADIUS))
+            return adjust_radius(base, prop, percentile, access)
+
+        def arrival_fn(prop, source, density, percentile, access):
+            base = arrival_lookup.get((density, prop, source), DEFAULT_ARRIVAL_BY_PROPERTY.get(prop, 50))
+            return max(adjust_radius(base, prop, percentile, access),
+                       delivery_fn(prop, source, density, percentile, access))
+
+        radius_fns = (delivery_fn, arrival_fn)
+
+    table = array("h")
+    for radius_fn in radius_fns:
+        for density in DENSITY_CATEGORIES:
+            for prop in PROPERTY_TYPES:
+                for source in ADDRESS_SOURCES:
+                    for percentile in PERCENTILES:
+                        for access in (False, True):
+                            table.append(radius_fn(prop, source, density, percentile, access))
+    return table
+
+
+def table_to_bytes(table: array) -> bytes:
+    """Serialize a compiled table as little-endian int16 bytes."""
+    if sys.byteorder == "big":
+        table = array("h", table)
+        table.byteswap()
+    return table.tobytes()
+
+
+def table_version(table: array) -> str:
+    """Short content hash identifying a compiled table."""
+    return hashlib.sha256(table_to_bytes(table)).hexdigest()[:12]
+
+
+def _code(value: str, valid_values: list[str], default: str) -> int:
+    return valid_values.index(normalize_input(value, valid_values, default))
+
+
+def _percentile_code(percentile: str) -> int:
+    # Mirrors get_geofence_radius: anything but P90/P99 is treated as P95
+    return 0 if percentile == "P90" else 2 if percentile == "P99" else 1
+
+
+def lookup_radii(
+    property_type: str,
+    address_source: str,
+    density_category: str,
+    percentile: Literal["P90", "P95", "P99"] = "P95",
+    access_required: bool = False
+) -> tuple[int, int]:
+    """
+    Get (delivery_radius, arrival_radius) from the compiled table.
+    
+    Same inputs and results as get_geofence_radius / get_arrival_radius,
+    but a single indexed read per radius.
+    """
+    offset = table_index(
+        0,
+        _code(density_category, DENSITY_CATEGORIES, "SUBURBAN"),
+        _code(property_type, PROPERTY_TYPES, "HOUSE"),
+        _code(address_source, ADDRESS_SOURCES, "AMS"),
+        _percentile_code(percentile),
+        1 if access_required else 0,
+    )
+    return RADIUS_TABLE[offset], RADIUS_TABLE[offset + _KIND_STRIDE]
+
+
+_KIND_STRIDE: int = TABLE_STRIDES[0]
+
+RADIUS_TABLE: array = compile_radius_table()
+MODEL_VERSION: str = table_version(RADIUS_TABLE)
+
+
+# =============================================================================
+# Config Tables (geofence_config.json format)
+# =============================================================================
+# Candidate tables are exchanged as geofence_config.json-style dicts:
+# density -> property -> source -> P95 radius, with optional MELISSA and
+# DEFAULT source columns and an optional "arrival_radii_meters" section.
+
+CONFIG_PATH = Path(__file__).parent / "geofence_config.json"
+
+
+def _flatten_radii(nested: dict) -> dict[tuple[str, str, str], int]:
+    return {
+        (density, prop, source): int(radius)
+        for density, by_property in nested.items()
+        for prop, by_source in by_property.items()
+        for source, radius in by_source.items()
+    }
+
+
+def _nest_radii(lookup: dict[tuple[str, str, str], int]) -> dict:
+    nested: dict = {}
+    for (density, prop, source), radius in lookup.items():
+        nested.setdefault(density, {}).setdefault(prop, {})[source] = int(radius)
+    return nested
+
+
+def load_config(path: str | Path = CONFIG_PATH) -> dict:
+    """Read a geofence_config.json-style file."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def tables_from_config(config: dict) -> tuple[dict, dict]:
+    """
+    Get (delivery, arrival) lookup dicts from a config.
+    
+    Returns:
+        tuple: Two dicts keyed (density, property_type, address_source).
+               Arrival falls back to ARRIVAL_GEOFENCE_LOOKUP when the
+               config has no "arrival_radii_meters" section.
+    """
+    delivery = _flatten_radii(config["geofence_radii_meters"])
+    arrival = (
+        _flatten_radii(config["arrival_radii_meters"])
+        if "arrival_radii_meters" in config
+        else dict(ARRIVAL_GEOFENCE_LOOKUP)
+    )
+    return delivery, arrival
+
+
+def tables_to_config(
+    delivery: dict[tuple[str, str, str], int],
+    arrival: dict[tuple[str, str, str], int],
+    metadata: Optional[dict] = None,
+    base: Optional[dict] = None,
+) -> dict:
+    """
+    Build a geofence_config.json-style dict from lookup tables.
+
+    Args:
+        base: Optional config whose other sections (density_thresholds...)
+              are carried over, so the result is a complete config file
+    """
+    config = {
+        "metadata": metadata or {},
+        "geofence_radii_meters": _nest_radii(delivery),
+        "arrival_radii_meters": _nest_radii(arrival),
+        "fallback_defaults": dict(DEFAULT_BY_PROPERTY),
+        "percentile_multipliers": {"P90": 0.85, "P95": 1.0, "P99": 1.8},
+    }
+    for key, value in (base or {}).items():
+        config.setdefault(key, value)
+    return config
+
+
+def resolve_base_radius(
+    lookup: dict[tuple[str, str, str], int],
+    density: str,
+    prop: str,
+    source: str,
+    default_by_property: dict[str, int],
+) -> int:
+    """
+    P95 radius for a cell of any table: exact source, then the DEFAULT
+    source column, then AMS (what the live model does with unknown
+    sources), then the property default.
+    """
+    for candidate in (source, "DEFAULT", "AMS"):
+        radius = lookup.get((density, prop, candidate))
+        if radius is not None:
+            return radius
+    return default_by_property.get(prop, DEFAULT_RADIUS)
+
+
+# =============================================================================
+# GeoJSON Map Layers
+# =============================================================================
+# Fences are drawn as polygons. Vertex offsets depend only on the radius, so
+# each radius gets one cached template ring (degrees at the equator) that
+# is scaled in longitude by 1/cos(lat) and offset to each stop.
+
+CIRCLE_SEGMENTS: int = 32
+METERS_PER_DEGREE: float = 6_371_000.0 * math.pi / 180.0
+GEOJSON_CHUNK_STOPS: int = 500
+FENCE_KINDS: tuple[str, str] = ("arrival", "delivery")
+
+
+@lru_cache(maxsize=2048)
+def circle_template(radius_m: float, segments: int = CIRCLE_SEGMENTS) -> tuple[tuple[float, float], ...]:
+    """Closed ring of (d_lon at the equator, d_lat) offsets in degrees, counterclockwise."""
+    scale = radius_m / METERS_PER_DEGREE
+    ring = tuple(
+        (scale * math.cos(2 * math.pi * i / segments), scale * math.sin(2 * math.pi * i / segments))
+        for i in range(segments)
+    )
+    return ring + ring[:1]
+
+
+def circle_ring(
+    lat: float,
+    lon: float,
+    radius_m: float,
+    segments: int = CIRCLE_SEGMENTS,
+) -> list[tuple[float, float]]:
+    """(lon, lat) polygon ring approximating a fence circle."""
+    stretch = 1.0 / max(math.cos(math.radians(lat)), 1e-6)
+    return [(lon + dx * stretch, lat + dy) for dx, dy in circle_template(radius_m, segments)]
+
+
+def _ring_json(lat: float, lon: float, template, stretch: float, pair_format: str) -> str:
+    return ",".join([pair_format % (lon + dx * stretch, lat + dy) for dx, dy in template])
+
+
+@lru_cache(maxsize=2048)
+def _template_array(radius_m: float, segments: int):
+    template = np.array(circle_template(radius_m, segments))
+    template.flags.writeable = False
+    return template
+
+
+def _fixed_digits(values, precision: int):
+    """
+    Quantized coordinates as right-aligned ASCII, one fixed-width uint8 row
+    per value. Leading spaces are valid JSON whitespace, so a whole batch is
+    formatted with a few vectorized passes instead of one repr per float.
+    """
+    q = np.rint(values * 10.0 ** precision).astype(np.int64)
+    negative = q < 0
+    q = np.abs(q)
+    whole = q // 10 ** precision
+    int_digits = np.maximum(1, np.floor(np.log10(np.maximum(whole, 1))).astype(np.int64) + 1)
+    max_digits = int(int_digits.max()) if len(q) else 1
+    width = 1 + max_digits + (1 + precision if precision else 0)
+    out = np.full((len(q), width), ord(" "), dtype=np.uint8)
+    col = width - 1
+    for _ in range(precision):
+        out[:, col] = 48 + q % 10
+        q //= 10
+        col -= 1
+    if precision:
+        out[:, col] = ord(".")
+        col -= 1
+    for digit in range(max_digits):
+        show = digit < int_digits
+        out[show, col] = 48 + q[show] % 10
+        q //= 10
+        col -= 1
+    rows = np.flatnonzero(negative)
+    out[rows, width - 1 - (1 + precision if precision else 0) - int_digits[rows]] = ord("-")
+    return out
+
+
+def _rings_json(lats, lons, radii, segments: int, precision: int) -> list[str]:
+    """Polygon ring JSON for many fences at once (numpy + fixed-width digits)."""
+    templates = np.stack([_template_array(radius, segments) for radius in radii])
+    stretch = 1.0 / np.maximum(np.cos(np.radians(lats)), 1e-6)
+    n, vertices = templates.shape[:2]
+    lon_text = _fixed_digits((lons[:, None] + templates[:, :, 0] * stretch[:, None]).ravel(), precision)
+    lat_text = _fixed_digits((lats[:, None] + templates[:, :, 1]).ravel(), precision)
+    lon_w, lat_w = lon_text.shape[1], lat_text.shape[1]
+    pair = np.empty((n * vertices, lon_w + lat_w + 4), dtype=np.uint8)
+    pair[:, 0] = ord("[")
+    pair[:, 1:1 + lon_w] = lon_text
+    pair[:, 1 + lon_w] = ord(",")
+    pair[:, 2 + lon_w:2 + lon_w + lat_w] = lat_text
+    pair[:, -2] = ord("]")
+    pair[:, -1] = ord(",")
+    data = pair.tobytes().decode("ascii")
+    step = vertices * pair.shape[1]
+    return [data[i:i + step - 1] for i in range(0, len(data), step)]
+
+
+def _fence_radii(
+    stop: dict,
+    lat: float,
+    lon: float,
+    model_key: Optional[str],
+    route: Optional[Callable[[dict], object]] = None,
+) -> tuple[int, int]:
+    """
+    (arrival, delivery) radii for one stop, equal to get_arrival_radius /
+    get_geofence_radius: geo-cell / ZIP overrides first, then the routed
+    table version, then the compiled table. One table read per stop.
+    """
+    arrival, delivery = stop.get("arrival_radius_m"), stop.get("delivery_radius_m")
+    if arrival is not None and delivery is not None:
+        return arrival, delivery
+    prop = normalize_input(stop.get("property_type"), PROPERTY_TYPES, "HOUSE")
+    inputs = (
+        prop,
+        stop.get("address_source") or "AMS",
+        stop.get("density_category") or "SUBURBAN",
+        stop.get("percentile") or "P95",
+        bool(stop.get("access_required", False)),
+    )
+    if route is not None:
+        version = route(stop)
+    else:
+        key = stop.get("market") or model_key
+        if key is None:
+            version = None
+        else:
+            from geofence_registry import get_registry
+            version = get_registry().resolve(key)
+    table_delivery, table_arrival = version.lookup(*inputs) if version is not None else lookup_radii(*inputs)
+
+    if _RADIUS_OVERRIDES is not None:
+        zip_code = stop.get("zip_code")
+        for kind in (0, 1):
+            base = _RADIUS_OVERRIDES.resolve(prop, zip_code, lat, lon, kind=kind)
+            if base is not None:
+                radius = adjust_radius(base, prop, inputs[3], inputs[4])
+                if kind == 0:
+                    table_delivery = radius
+                else:
+                    table_arrival = radius
+        table_arrival = max(table_arrival, table_delivery)
+    return (table_arrival if arrival is None else arrival), (table_delivery if delivery is None else delivery)
+
+
+def iter_geojson(
+    stops: list[dict],
+    bbox: Optional[tuple[float, float, float, float]] = None,
+    precision: Optional[int] = None,
+    segments: int = CIRCLE_SEGMENTS,
+    chunk_stops: int = GEOJSON_CHUNK_STOPS,
+    model_key: Optional[str] = None,
+    route: Optional[Callable[[dict], object]] = None,
+) -> Iterator[str]:
+    """
+    Stream a FeatureCollection of arrival and delivery fences, chunk by chunk.
+
+    Args:
+        stops: Dicts with lat, lon and the usual model inputs (property_type,
+               address_source, density_category, percentile,
+               access_required, zip_code, market), plus an optional
+               stop_id. Precomputed arrival_radius_m / delivery_radius_m
+               are used as given.
+        bbox: Optional (min_lon, min_lat, max_lon, max_lat); only fences
+              that reach into it are emitted
+        precision: Optional decimal places to quantize coordinates to
+                   (5 is about 1 m). Quantized output is also much faster
+                   to produce.
+        segments: Polygon vertices per circle
+        chunk_stops: Stops per yielded chunk
+        model_key: Market / experiment / version for stops without a
+                   "market" key
+        route: Optional callable(stop) -> geofence_registry.ModelVersion
+               that replaces market / model_key routing (e.g. experiment
+               arms by unit). Overrides still apply on top.
+
+    Yields:
+        str: Consecutive pieces of one GeoJSON document
+    """
+    vectorized = np is not None and precision is not None
+    pair_format = "[%r,%r]" if precision is None else f"[%.{int(precision)}f,%.{int(precision)}f]"
+
+    def render(chunk: list[tuple]) -> str:
+        if vectorized:
+            lats = np.array([lat for lat, _, _, _, _ in chunk for _ in FENCE_KINDS])
+            lons = np.array([lon for _, lon, _, _, _ in chunk for _ in FENCE_KINDS])
+            rings = iter(_rings_json(lats, lons, [r for *_, radii, _ in chunk for r in radii], segments, precision))
+        else:
+            rings = (
+                _ring_json(lat, lon, circle_template(radius, segments), stretch, pair_format)
+                for lat, lon, stretch, radii, _ in chunk
+                for radius in radii
+            )
+        features = []
+        for _, _, _, radii, stop_id in chunk:
+            for kind, radius in zip(FENCE_KINDS, radii):
+                features.append(
+                    '{"type":"Feature","geometry":{"type":"Polygon","coordinates":[[' + next(rings) + ']]},'
+                    f'"properties":{{"stop_id":{stop_id},"fence":"{kind}","radius_m":{radius}}}}}'
+                )
+        return ",".join(features)
+
+    yield '{"type":"FeatureCollection","features":['
+    first = True
+    chunk: list[tuple] = []
+    for stop in stops:
+        lat, lon = float(stop["lat"]), float(stop["lon"])
+        radii = _fence_radii(stop, lat, lon, model_key, route)
+        stretch = 1.0 / max(math.cos(math.radians(lat)), 1e-6)
+        if bbox is not None:
+            reach = max(radii) / METERS_PER_DEGREE
+            if (lat + reach < bbox[1] or lat - reach > bbox[3]
+                    or lon + reach * stretch < bbox[0] or lon - reach * stretch > bbox[2]):
+                continue
+        chunk.append((lat, lon, stretch, radii, json.dumps(stop.get("stop_id"))))
+        if len(chunk) == chunk_stops:
+            yield ("" if first else ",") + render(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield ("" if first else ",") + render(chunk)
+    yield "]}"
 
 
 # =============================================================================
 # Batch Processing
 # =============================================================================
 
-def process_deliveries(deliveries: list[dict]) -> list[dict]:
+def process_deliveries(
+    deliveries: list[dict],
+    resolve_density: Optional[Callable[[dict], str]] = None,
+    density_cache=None,
+    model_key: Optional[str] = None,
+) -> list[dict]:
     """
     Process a batch of deliveries and add recommended geofence radius.
     
     Args:
         deliveries: List of dicts with keys: property_type, address_source, 
                     density_category (or population_density)
+        resolve_density: Optional callable(delivery) -> density category for
+                         deliveries without density fields (ZIP map,
+                         coordinate lookup, geocode result...)
+        density_cache: Optional geofence_cache.DensityResolutionCache so
+                       resolve_density runs once per distinct address
+                       (customer ID when there is none) instead of once
+                       per stop
+        model_key: Optional market / experiment / version for the whole
+                   batch; a delivery's own "market" key takes precedence
                     
     Returns:
         list[dict]: Same deliveries with 'recommended_radius_m' added
     """
+    if density_cache is not None:
+        from geofence_cache import cache_key
+
     results = []
     for delivery in deliveries:
         # Get density category
@@ -603,13 +1419,20 @@ def process_deliveries(deliveries: list[dict]) -> list[dict]:
             density = delivery["density_category"]
         elif "population_density" in delivery:
             density = get_density_category(delivery["population_density"])
+        elif resolve_density is not None:
+            if density_cache is not None:
+                key = cache_key(delivery.get("address"), delivery.get("customer_id"), delivery.get("zip_code"))
+                density = density_cache.resolve(key, lambda: resolve_density(delivery))
+            else:
+                density = resolve_density(delivery)
         else:
             density = "SUBURBAN"  # Default
         
         radius = get_geofence_radius(
             property_type=delivery.get("property_type", "HOUSE"),
             address_source=delivery.get("address_source", "AMS"),
-            density_category=density
+            density_category=density,
+            model_key=delivery.get("market") or model_key,
         )
         
         result = {**delivery, "recommended_radius_m": radius}
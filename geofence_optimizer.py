@@ -0,0 +1,331 @@
+"""
+Radius Table Optimizer
+======================
+
+Per-cell P95 radii give every cell the same capture rate, whatever it costs.
+This finds the table that meets a GLOBAL capture target (e.g. 95% of all
+deliveries) with the smallest total fence area, so tight cells (HOUSE/AMS)
+can trade slack with loose ones (DORM/CUSTOMER_PIN).
+
+    minimize   sum_c  n_c * pi * r_c^2
+    subject to sum_c  captured_c(r_c) >= target * N
+
+Works from per-cell distance histograms (1 m bins, cumulative-summed once).
+For a multiplier lambda every cell independently picks the radius that
+maximizes lambda * captured - area; lambda is bisected until the target is
+met, then the few cells that flip at the final lambda are added greedily by
+area-per-capture. Arrival radii are solved the same way, never below the
+cell's delivery radius.
+
+Histograms use the backtest's cells (density, property, source) with access
+records folded in by dividing their distances by ACCESS_MULTIPLIERS, so one
+base radius serves both.
+
+Usage:
+    python geofence_optimizer.py build records/*.csv --out histograms.npz
+    python geofence_optimizer.py optimize histograms.npz --target 0.95 \
+        --arrival-target 0.95 --out optimized_config.json
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from geofence_backtest import BACKTEST_SOURCES, iter_chunks, plan_shards, read_header, resolve_columns
+from geofence_model import (
+    ACCESS_MULTIPLIERS,
+    ARRIVAL_GEOFENCE_LOOKUP,
+    DEFAULT_ARRIVAL_BY_PROPERTY,
+    DEFAULT_BY_PROPERTY,
+    DENSITY_CATEGORIES,
+    GEOFENCE_LOOKUP,
+    PROPERTY_TYPES,
+    load_config,
+    resolve_base_radius,
+    tables_to_config,
+)
+
+MAX_RADIUS_M = 1500      # histogram range; farther records are never captured
+MIN_RADIUS_M = 10
+MIN_CELL_RECORDS = 50    # thinner cells keep their current radius
+
+# Table cells in the same order as the backtest (which adds access as the
+# last axis: backtest cell = table cell * 2 + access)
+TABLE_CELLS = [
+    (density, prop, source)
+    for density in DENSITY_CATEGORIES
+    for prop in PROPERTY_TYPES
+    for source in BACKTEST_SOURCES
+]
+
+# Per-cell divisor for access records (cell order above)
+_ACCESS_DIVISOR = np.array([ACCESS_MULTIPLIERS.get(prop, 1.0) for _, prop, _ in TABLE_CELLS])
+
+
+# =============================================================================
+# Histograms
+# =============================================================================
+
+def histogram_chunk(cells: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    """
+    Count one chunk of backtest-cell records into (cells, MAX_RADIUS_M + 2).
+
+    Bin b holds distances in (b-1, b], so a radius r captures bins 0..r.
+    The last bin is overflow (beyond MAX_RADIUS_M).
+    """
+    keep = ~np.isnan(distances)
+    cells, distances = cells[keep], distances[keep]
+    table_cell = cells // 2
+    scaled = np.where(cells % 2 == 1, distances / _ACCESS_DIVISOR[table_cell], distances)
+    bins = np.clip(np.ceil(np.maximum(scaled, 0)), 0, MAX_RADIUS_M + 1).astype(np.int64)
+    width = MAX_RADIUS_M + 2
+    flat = np.bincount(table_cell * width + bins, minlength=len(TABLE_CELLS) * width)
+    return flat.reshape(len(TABLE_CELLS), width)
+
+
+def _histogram_shard(shard: tuple[str, int, int]) -> tuple[np.ndarray, np.ndarray]:
+    path, start, end = shard
+    columns = resolve_columns(read_header(path)[0])
+    shape = (len(TABLE_CELLS), MAX_RADIUS_M + 2)
+    delivery, arrival = np.zeros(shape, np.int64), np.zeros(shape, np.int64)
+    for cells, dlv, arr in iter_chunks(path, start, end, columns):
+        delivery += histogram_chunk(cells, dlv)
+        arrival += histogram_chunk(cells, arr)
+    return delivery, arrival
+
+
+def build_histograms(paths: list[str], workers: int | None = None) -> dict[str, np.ndarray]:
+    """Delivery and arrival histograms for record CSVs (backtest format)."""
+    shards = plan_shards(paths)
+    shape = (len(TABLE_CELLS), MAX_RADIUS_M + 2)
+    histograms = {"delivery": np.zeros(shape, np.int64), "arrival": np.zeros(shape, np.int64)}
+    if workers == 1 or len(shards) <= 1:
+        parts = list(map(_histogram_shard, shards))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_histogram_shard, shards))
+    for delivery, arrival in parts:
+        histograms["delivery"] += delivery
+        histograms["arrival"] += arrival
+    return histograms
+
+
+def save_histograms(histograms: dict[str, np.ndarray], path: str) -> None:
+    np.savez_compressed(
+        path,
+        delivery=histograms["delivery"],
+        arrival=histograms["arrival"],
+        cells=np.array(["|".join(cell) for cell in TABLE_CELLS]),
+    )
+
+
+def load_histograms(path: str) -> dict[str, np.ndarray]:
+    with np.load(path) as data:
+        if list(data["cells"]) != ["|".join(cell) for cell in TABLE_CELLS]:
+            raise ValueError(f"{path} was built for a different cell layout")
+        return {"delivery": data["delivery"], "arrival": data["arrival"]}
+
+
+# =============================================================================
+# Optimization
+# =============================================================================
+
+def baseline_radii(lookup: dict, default_by_property: dict[str, int]) -> np.ndarray:
+    """Current P95 base radius per table cell."""
+    return np.array([
+        resolve_base_radius(lookup, density, prop, source, default_by_property)
+        for density, prop, source in TABLE_CELLS
+    ])
+
+
+def optimize_radii(
+    counts: np.ndarray,
+    target: float,
+    baseline: np.ndarray,
+    lower: np.ndarray | None = None,
+    min_radius: int = MIN_RADIUS_M,
+    min_records: int = MIN_CELL_RECORDS,
+) -> tuple[np.ndarray, dict]:
+    """
+    Minimum-area radii meeting a global capture target.
+
+    Args:
+        counts: (cells, MAX_RADIUS_M + 2) distance histogram
+        target: Required share of all records captured (0-1)
+        baseline: Radius per cell for cells with fewer than min_records
+        lower: Optional per-cell radius floor (delivery radii for arrival)
+
+    Returns:
+        tuple: (radius per cell, stats dict)
+    """
+    n = counts.sum(axis=1)
+    captured = np.cumsum(counts[:, :-1], axis=1)          # captured[c, r]
+    radius = np.arange(captured.shape[1])
+    area = n[:, None] * math.pi * radius.astype(np.float64) ** 2
+
+    floor = np.full(len(n), min_radius)
+    if lower is not None:
+        floor = np.maximum(floor, lower)
+    floor = np.minimum(floor, MAX_RADIUS_M)
+    allowed = radius[None, :] >= floor[:, None]
+    thin = n < min_records
+    fixed = np.clip(np.maximum(baseline, floor), 0, MAX_RADIUS_M)
+    allowed[thin] = radius[None, :] == fixed[thin, None]
+
+    rows = np.arange(len(n))
+    needed = target * n.sum()
+
+    def solve(lam: float) -> np.ndarray:
+        score = lam * captured - area
+        score[~allowed] = -np.inf
+        return score.argmax(axis=1)                       # ties -> smaller radius
+
+    def total(choice: np.ndarray) -> int:
+        return int(captured[rows, choice].sum())
+
+    lo, hi = 0.0, 1.0
+    while total(solve(hi)) < needed and hi < 1e15:
+        lo, hi = hi, hi * 4
+    for _ in range(60):
+        mid = math.sqrt(lo * hi) if lo else hi / 4
+        if total(solve(mid)) >= needed:
+            hi = mid
+        else:
+            lo = mid
+        if hi - lo <= hi * 1e-9:
+            break
+
+    # Greedy completion: start from the infeasible side and take the cheapest
+    # (area per captured record) of the steps that flip between lo and hi
+    choice, upper = solve(lo), solve(hi)
+    flips = np.flatnonzero(choice != upper)
+    gain = captured[flips, upper[flips]] - captured[flips, choice[flips]]
+    cost = area[flips, upper[flips]] - area[flips, choice[flips]]
+    have = total(choice)
+    for i in np.argsort(cost / np.maximum(gain, 1)):
+        if have >= needed:
+            break
+        cell = flips[i]
+        have += int(gain[i])
+        choice[cell] = upper[cell]
+    if have < needed:
+        choice = upper
+
+    stats = {
+        "records": int(n.sum()),
+        "target": target,
+        "capture": round(total(choice) / n.sum(), 4) if n.sum() else None,
+        "area_km2": round(float(area[rows, choice].sum()) / 1e6, 2),
+        "cells_fixed": int((thin & (n > 0)).sum()),
+        "lambda": hi,
+    }
+    return choice, stats
+
+
+def evaluate(counts: np.ndarray, radii: np.ndarray) -> dict:
+    """Capture and total area for any radius per cell on a histogram."""
+    n = counts.sum(axis=1)
+    captured = np.cumsum(counts[:, :-1], axis=1)
+    clipped = np.clip(radii, 0, MAX_RADIUS_M)
+    hits = captured[np.arange(len(n)), clipped]
+    return {
+        "capture": round(int(hits.sum()) / n.sum(), 4) if n.sum() else None,
+        "area_km2": round(float((n * math.pi * radii.astype(np.float64) ** 2).sum()) / 1e6, 2),
+    }
+
+
+def optimize_tables(
+    histograms: dict[str, np.ndarray],
+    target: float = 0.95,
+    arrival_target: float = 0.95,
+    min_records: int = MIN_CELL_RECORDS,
+    base_config: dict | None = None,
+) -> tuple[dict, dict]:
+    """
+    Optimize delivery then arrival radii and build a geofence_config.json dict.
+
+    Sections the optimizer does not produce (density_thresholds...) are
+    copied from base_config, the shipped geofence_config.json by default.
+
+    Returns:
+        tuple: (config dict, report dict with before/after capture and area)
+    """
+    start = time.perf_counter()
+    base_dlv = baseline_radii(GEOFENCE_LOOKUP, DEFAULT_BY_PROPERTY)
+    base_arr = np.maximum(baseline_radii(ARRIVAL_GEOFENCE_LOOKUP, DEFAULT_ARRIVAL_BY_PROPERTY), base_dlv)
+
+    delivery, dlv_stats = optimize_radii(histograms["delivery"], target, base_dlv, min_records=min_records)
+    arrival, arr_stats = optimize_radii(
+        histograms["arrival"], arrival_target, base_arr, lower=delivery, min_records=min_records
+    )
+    arrival = np.maximum(arrival, delivery)
+
+    report = {
+        "delivery": {"current": evaluate(histograms["delivery"], base_dlv), "optimized": dlv_stats},
+        "arrival": {"current": evaluate(histograms["arrival"], base_arr), "optimized": arr_stats},
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+    # Cells with no records at all stay out of the config, so lookups keep
+    # falling back exactly as they do today
+    has_data = (histograms["delivery"].sum(axis=1) + histograms["arrival"].sum(axis=1)) > 0
+    dlv_table, arr_table = dict(GEOFENCE_LOOKUP), dict(ARRIVAL_GEOFENCE_LOOKUP)
+    for i, cell in enumerate(TABLE_CELLS):
+        if has_data[i]:
+            dlv_table[cell] = int(delivery[i])
+            arr_table[cell] = int(arrival[i])
+    config = tables_to_config(dlv_table, arr_table, {
+        "description": "Minimum-area radii meeting a global capture target",
+        "delivery_target": target,
+        "arrival_target": arrival_target,
+        "records": dlv_stats["records"],
+        "generated_by": "geofence_optimizer.py",
+    }, base=load_config() if base_config is None else base_config)
+    return config, report
+
+
+# =============================================================================
+# Main Execution
+# =============================================================================
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Minimum-area radius table optimizer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build distance histograms from record CSVs")
+    build.add_argument("records", nargs="+")
+    build.add_argument("--workers", type=int, default=os.cpu_count())
+    build.add_argument("--out", default="histograms.npz")
+    opt = sub.add_parser("optimize", help="Optimize radii from histograms")
+    opt.add_argument("histograms")
+    opt.add_argument("--target", type=float, default=0.95, help="Global delivery capture target")
+    opt.add_argument("--arrival-target", type=float, default=0.95)
+    opt.add_argument("--min-records", type=int, default=MIN_CELL_RECORDS)
+    opt.add_argument("--out", default="optimized_config.json")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        histograms = build_histograms(args.records, args.workers)
+        save_histograms(histograms, args.out)
+        summary = {"deliveries": int(histograms["delivery"].sum()), "arrivals": int(histograms["arrival"].sum())}
+        print(f"📁 Histograms: {args.out} ({summary['deliveries']:,} deliveries)")
+        return summary
+
+    config, report = optimize_tables(
+        load_histograms(args.histograms), args.target, args.arrival_target, args.min_records
+    )
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"📁 Optimized config: {args.out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Model Registry
+==============
+
+Many compiled radius table versions loaded at once - one per market, plus
+A/B test candidates - with O(1) routing from a market or experiment key to
+a version.
+
+Storage is interned: a compiled table (see geofence_model.compile_radius_table)
+is split into rows of PERCENTILES x access values, one row per
+(kind, density, property, source). Distinct rows live once in a shared
+int16 pool; a version is just a vector of uint16 row ids into it, and
+versions with identical content share one vector. 100 versions that differ
+in a handful of cells cost little more than one.
+
+Manifest (JSON) for loading a registry:
+    {
+      "default": "current",
+      "versions": {"v2": "configs/v2.json", "pin_fix": "configs/pin_fix.json"},
+      "markets": {"DFW": "v2"},
+      "experiments": {"pin_radius_ab": {"current": 50, "pin_fix": 50}}
+    }
+Version files are geofence_config.json-style; "current" is always the
+live model.
+
+Usage:
+    from geofence_registry import get_registry
+
+    registry = get_registry()                  # GEOFENCE_REGISTRY manifest, if set
+    version = registry.resolve("DFW")          # market, experiment or version name
+    delivery_m, arrival_m = version.lookup("HOUSE", "AMS", "SUBURBAN")
+
+    # Experiments assign a stable variant per unit (driver, store...)
+    registry.resolve("pin_radius_ab", unit_id="driver-1234").name
+
+Author: Code Puppy 🐶
+"""
+
+import hashlib
+import json
+import os
+from array import array
+from pathlib import Path
+from typing import Literal, Optional
+
+from geofence_model import (
+    ADDRESS_SOURCES,
+    DENSITY_CATEGORIES,
+    PROPERTY_TYPES,
+    RADIUS_TABLE,
+    TABLE_STRIDES,
+    _code,
+    _percentile_code,
+    compile_radius_table,
+    load_config,
+    table_version,
+    tables_from_config,
+)
+
+# One row = every (percentile, access) value of a (kind, density, property, source) cell
+ROW_SIZE = TABLE_STRIDES[3]
+ROWS_PER_VERSION = len(RADIUS_TABLE) // ROW_SIZE
+_KIND_ROWS, _DENSITY_ROWS, _PROPERTY_ROWS, _SOURCE_ROWS = (stride // ROW_SIZE for stride in TABLE_STRIDES[:4])
+_PERCENTILE_STRIDE, _ACCESS_STRIDE = TABLE_STRIDES[4:]
+
+# Experiment traffic is split over this many hash buckets
+EXPERIMENT_BUCKETS = 1000
+
+DEFAULT_VERSION = "current"
+
+
+class ModelVersion:
+    """A read-only view of one table version inside a registry's row pool."""
+
+    __slots__ = ("name", "digest", "_rows", "_pool")
+
+    def __init__(self, name: str, digest: str, rows: array, pool: array):
+        self.name = name
+        self.digest = digest
+        self._rows = rows
+        self._pool = pool
+
+    def lookup(
+        self,
+        property_type: str,
+        address_source: str,
+        density_category: str,
+        percentile: Literal["P90", "P95", "P99"] = "P95",
+        access_required: bool = False,
+    ) -> tuple[int, int]:
+        """(delivery_radius, arrival_radius), normalized like geofence_model.lookup_radii."""
+        row = (
+            _code(density_category, DENSITY_CATEGORIES, "SUBURBAN") * _DENSITY_ROWS
+            + _code(property_type, PROPERTY_TYPES, "HOUSE") * _PROPERTY_ROWS
+            + _code(address_source, ADDRESS_SOURCES, "AMS") * _SOURCE_ROWS
+        )
+        offset = _percentile_code(percentile) * _PERCENTILE_STRIDE + (_ACCESS_STRIDE if access_required else 0)
+        rows, pool = self._rows, self._pool
+        return pool[rows[row] * ROW_SIZE + offset], pool[rows[row + _KIND_ROWS] * ROW_SIZE + offset]
+
+    def delivery_radius(self, *args, **kwargs) -> int:
+        return self.lookup(*args, **kwargs)[0]
+
+    def arrival_radius(self, *args, **kwargs) -> int:
+        return self.lookup(*args, **kwargs)[1]
+
+    def table(self) -> array:
+        """Materialize the flat compiled table (TABLE_SHAPE order)."""
+        table = array("h")
+        for row in self._rows:
+            table.extend(self._pool[row * ROW_SIZE:(row + 1) * ROW_SIZE])
+        return table
+
+
+class ModelRegistry:
+    """Interned storage for many table versions plus market/experiment routing."""
+
+    def __init__(self, default: str = DEFAULT_VERSION):
+        self._pool = array("h")
+        self._row_ids: dict[bytes, int] = {}
+        self._row_vectors: dict[bytes, array] = {}
+        self.versions: dict[str, ModelVersion] = {}
+        self.markets: dict[str, str] = {}
+        self.experiments: dict[str, tuple[ModelVersion, ...]] = {}
+        self.default_name = default
+        self.add_table(DEFAULT_VERSION, RADIUS_TABLE)
+
+    # -------------------------------------------------------------------------
+    # Versions
+    # -------------------------------------------------------------------------
+
+    def _intern_row(self, values: array) -> int:
+        key = values.tobytes()
+        row_id = self._row_ids.get(key)
+        if row_id is None:
+            row_id = len(self._row_ids)
+            if row_id > 0xFFFF:
+                raise OverflowError("row pool is full (65536 distinct rows)")
+            self._row_ids[key] = row_id
+            self._pool.extend(values)
+        return row_id
+
+    def add_table(self, name: str, table: array) -> ModelVersion:
+        """Register a compiled table (flat int16, TABLE_SHAPE order) under name."""
+        if len(table) != len(RADIUS_TABLE):
+            raise ValueError(f"table has {len(table)} entries, expected {len(RADIUS_TABLE)}")
+        rows = array("H", (
+            self._intern_row(table[i:i + ROW_SIZE]) for i in range(0, len(table), ROW_SIZE)
+        ))
+        rows = self._row_vectors.setdefault(rows.tobytes(), rows)   # share identical versions
+        version = ModelVersion(name, table_version(table), rows, self._pool)
+        self.versions[name] = version
+        return version
+
+    def add_lookups(self, name: str, delivery: dict, arrival: dict) -> ModelVersion:
+        """Compile and register (density, property, source) -> P95 lookup dicts."""
+        return self.add_table(name, compile_radius_table(delivery, arrival))
+
+    def add_config(self, name: str, path: str | Path) -> ModelVersion:
+        """Compile and register a geofence_config.json-style file."""
+        return self.add_lookups(name, *tables_from_config(load_config(path)))
+
+    # -------------------------------------------------------------------------
+    # Routing
+    # -------------------------------------------------------------------------
+
+    def set_market(self, market: str, version: str) -> None:
+        if version not in self.versions:
+            raise KeyError(f"unknown version: {version}")
+        self.markets[market.upper()] = version
+
+    def set_experiment(self, key: str, weights: dict[str, float]) -> None:
+        """
+        Split traffic across versions by weight. The first version listed is
+        the control (used when no unit_id is given).
+        """
+        unknown = set(weights) - set(self.versions)
+        if unknown:
+            raise KeyError(f"unknown versions: {sorted(unknown)}")
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("experiment weights must sum to more than zero")
+        buckets: list[ModelVersion] = []
+        cumulative = 0.0
+        for name, weight in weights.items():
+            cumulative += weight
+            end = round(cumulative / total * EXPERIMENT_BUCKETS)
+            buckets.extend([self.versions[name]] * (end - len(buckets)))
+        self.experiments[key] = (self.versions[next(iter(weights))], *buckets)
+
+    def resolve(self, key: Optional[str] = None, unit_id: Optional[str] = None) -> ModelVersion:
+        """
+        Version for an experiment key, market code or version name (in that
+        order); the default version for None or unknown keys.
+        """
+        if key:
+            experiment = self.experiments.get(key)
+            if experiment is not None:
+                if unit_id is None:
+                    return experiment[0]
+                digest = hashlib.blake2b(f"{key}:{unit_id}".encode(), digest_size=8).digest()
+                return experiment[1 + int.from_bytes(digest, "little") % EXPERIMENT_BUCKETS]
+            name = self.markets.get(key.upper(), key)
+            version = self.versions.get(name)
+            if version is not None:
+                return version
+        return self.versions[self.default_name]
+
+    # -------------------------------------------------------------------------
+    # Loading + stats
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_manifest(cls, path: str | Path) -> "ModelRegistry":
+        """Build a registry from a JSON manifest (paths relative to it)."""
+        path = Path(path)
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        registry = cls()
+        for name, config_path in manifest.get("versions", {}).items():
+            registry.add_config(name, path.parent / config_path)
+        for market, version in manifest.get("markets", {}).items():
+            registry.set_market(market, version)
+        for key, weights in manifest.get("experiments", {}).items():
+            registry.set_experiment(key, weights)
+        default = manifest.get("default", DEFAULT_VERSION)
+        if default not in registry.versions:
+            raise KeyError(f"unknown default version: {default}")
+        registry.default_name = default
+        return registry
+
+    def stats(self) -> dict:
+        pool_bytes = self._pool.itemsize * len(self._pool)
+        vector_bytes = sum(v.itemsize * len(v) for v in self._row_vectors.values())
+        return {
+            "versions": len(self.versions),
+            "distinct_versions": len(self._row_vectors),
+            "distinct_rows": len(self._row_ids),
+            "bytes": pool_bytes + vector_bytes,
+            "bytes_if_copied": len(self.versions) * len(RADIUS_TABLE) * RADIUS_TABLE.itemsize,
+            "markets": len(self.markets),
+            "experiments": len(self.experiments),
+        }
+
+
+_REGISTRY: Optional[ModelRegistry] = None
+
+
+def get_registry() -> ModelRegistry:
+    """
+    Process-wide registry: loaded from the GEOFENCE_REGISTRY manifest when
+    set, else just the live model.
+    """
+    global _REGISTRY
+    if _REGISTRY is None:
+        manifest = os.environ.get("GEOFENCE_REGISTRY")
+        _REGISTRY = ModelRegistry.from_manifest(manifest) if manifest else ModelRegistry()
+    return _REGISTRY
+
+
+def set_registry(registry: Optional[ModelRegistry]) -> None:
+    """Install (or with None, reset) the process-wide registry."""
+    global _REGISTRY
+    _REGISTRY = registry
+
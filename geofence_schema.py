@@ -0,0 +1,298 @@
+"""
+Schema-Driven Model
+===================
+
+The live lookup key is fixed at (density, property_type, address_source).
+Here the key is a schema: any number of categorical dimensions (time of
+day, vehicle type, building height...), radius rules that may leave
+dimensions as wildcards, and an ordered fallback lattice saying which
+dimensions to keep at each step, e.g.
+
+    (density, property, source)   exact cell
+    (density, property)           the config's DEFAULT source column
+    (property,)                   property default
+    global default
+
+compile() resolves every fallback for every cell up front into one dense
+int16 array of shape (kind, *dimensions, percentile, access), so lookups
+and batch scoring are one index computation however many dimensions or
+fallback levels the schema has.
+
+The default schema reads geofence_config.json and adds the sources the
+live model folds into AMS: MELISSA (its own config column) and MANUAL_ADJ
+(no data yet, so it falls back to the DEFAULT column). The scalar
+functions in geofence_model are unchanged; for the four live sources this
+model matches them exactly.
+
+Schema JSON:
+    {
+      "dimensions": [{"name": "vehicle_type", "values": ["CAR", "VAN"], "default": "CAR"}, ...],
+      "fallbacks": [["vehicle_type", "property_type"], ["property_type"]],
+      "rules": [{"vehicle_type": "VAN", "property_type": "HOUSE", "delivery": 40, "arrival": 55}],
+      "defaults": {"delivery": 50, "arrival": 50},
+      "access_dimension": "property_type",
+      "access_multipliers": {"APARTMENT": 1.28},
+      "percentile_multipliers": {"P90": 0.85, "P95": 1.0, "P99": 1.8}
+    }
+Rules omit (or use "*" for) the dimensions they do not pin; each rule's
+pinned dimensions must be one of the fallback levels.
+
+Usage:
+    from geofence_schema import default_schema
+
+    model = default_schema().compile()
+    model.lookup(property_type="HOUSE", address_source="MANUAL_ADJ", density_category="RURAL")
+    model.lookup_many({"property_type": props, "address_source": sources, ...})
+
+Author: Code Puppy 🐶
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from geofence_model import (
+    ACCESS_MULTIPLIERS,
+    ADDRESS_SOURCES,
+    DEFAULT_ARRIVAL_BY_PROPERTY,
+    DEFAULT_BY_PROPERTY,
+    DEFAULT_RADIUS,
+    DENSITY_CATEGORIES,
+    PERCENTILES,
+    PROPERTY_TYPES,
+    load_config,
+    normalize_input,
+    tables_from_config,
+)
+
+KINDS = ("delivery", "arrival")
+WILDCARD = "*"
+DEFAULT_PERCENTILE_MULTIPLIERS = {"P90": 0.85, "P95": 1.0, "P99": 1.8}
+
+
+class Dimension:
+    """A categorical model dimension; unknown inputs normalize to `default`."""
+
+    def __init__(self, name: str, values: list[str], default: str):
+        if default not in values:
+            raise ValueError(f"default {default!r} is not a value of {name}")
+        self.name = name
+        self.values = list(values)
+        self.default = default
+        self._codes = {value: code for code, value in enumerate(self.values)}
+        self._memo: dict = {}
+
+    def code(self, value) -> int:
+        """Index of a raw input value (normalized like geofence_model inputs)."""
+        code = self._memo.get(value)
+        if code is None:
+            raw = value if value is None or isinstance(value, str) else str(value)
+            code = self._codes[normalize_input(raw, self.values, self.default)]
+            self._memo[value] = code
+        return code
+
+
+class ModelSchema:
+    """Dimensions, wildcard radius rules, fallback lattice and modifiers."""
+
+    def __init__(
+        self,
+        dimensions: list[Dimension],
+        fallbacks: list[list[str]],
+        rules: list[dict],
+        defaults: Optional[dict[str, int]] = None,
+        access_dimension: Optional[str] = "property_type",
+        access_multipliers: Optional[dict[str, float]] = None,
+        percentile_multipliers: Optional[dict[str, float]] = None,
+    ):
+        self.dimensions = dimensions
+        self.names = [dim.name for dim in dimensions]
+        for level in fallbacks:
+            unknown = set(level) - set(self.names)
+            if unknown:
+                raise ValueError(f"fallback level {level} has unknown dimensions {sorted(unknown)}")
+        self.fallbacks = [frozenset(level) for level in fallbacks]
+        self.rules = rules
+        self.defaults = defaults or {"delivery": DEFAULT_RADIUS, "arrival": 50}
+        if access_dimension is not None and access_dimension not in self.names:
+            raise ValueError(f"unknown access dimension: {access_dimension}")
+        self.access_dimension = access_dimension
+        self.access_multipliers = access_multipliers or {}
+        self.percentile_multipliers = percentile_multipliers or DEFAULT_PERCENTILE_MULTIPLIERS
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> "ModelSchema":
+        return cls(
+            dimensions=[Dimension(d["name"], d["values"], d["default"]) for d in spec["dimensions"]],
+            fallbacks=spec["fallbacks"],
+            rules=spec.get("rules", []),
+            defaults=spec.get("defaults"),
+            access_dimension=spec.get("access_dimension", "property_type"),
+            access_multipliers=spec.get("access_multipliers"),
+            percentile_multipliers=spec.get("percentile_multipliers"),
+        )
+
+    def _base_radii(self) -> np.ndarray:
+        """P95 radius per (kind, *cell) with the fallback lattice resolved."""
+        shape = tuple(len(dim.values) for dim in self.dimensions)
+        base = np.empty((len(KINDS), *shape), dtype=np.float64)
+        for k, kind in enumerate(KINDS):
+            base[k] = self.defaults[kind]
+
+        by_level: dict[frozenset, list[dict]] = {level: [] for level in self.fallbacks}
+        for rule in self.rules:
+            pinned = frozenset(
+                name for name in self.names if rule.get(name, WILDCARD) != WILDCARD
+            )
+            if pinned not in by_level:
+                raise ValueError(f"rule pins {sorted(pinned)}, which is not a fallback level: {rule}")
+            by_level[pinned].append(rule)
+
+        # Least preferred level first, so more preferred levels overwrite it
+        for level in reversed(self.fallbacks):
+            for rule in by_level[level]:
+                index = tuple(
+                    dim.values.index(rule[dim.name]) if dim.name in level else slice(None)
+                    for dim in self.dimensions
+                )
+                for k, kind in enumerate(KINDS):
+                    if rule.get(kind) is not None:
+                        base[(k, *index)] = rule[kind]
+        return base
+
+    def compile(self) -> "CompiledModel":
+        """
+        Dense (kind, *dimensions, percentile, access) int16 radii with every
+        fallback, multiplier and the arrival >= delivery rule applied.
+        """
+        base = self._base_radii()
+        shape = base.shape[1:]
+
+        access = np.ones(shape)
+        if self.access_dimension is not None:
+            axis = self.names.index(self.access_dimension)
+            dim = self.dimensions[axis]
+            multipliers = np.array([self.access_multipliers.get(v, 1.0) for v in dim.values])
+            access = access * multipliers.reshape([-1 if i == axis else 1 for i in range(len(shape))])
+
+        table = np.empty((*base.shape, len(PERCENTILES), 2), dtype=np.int16)
+        for p, percentile in enumerate(PERCENTILES):
+            scale = self.percentile_multipliers.get(percentile, 1.0)
+            # Same operation order as geofence_model.adjust_radius
+            table[..., p, 0] = np.trunc(base * scale)
+            table[..., p, 1] = np.trunc((base * access) * scale)
+        table[1] = np.maximum(table[1], table[0])
+        return CompiledModel(self.dimensions, table)
+
+
+class CompiledModel:
+    """Flat radius array plus the strides to index it."""
+
+    def __init__(self, dimensions: list[Dimension], table: np.ndarray):
+        self.dimensions = dimensions
+        self.shape = table.shape
+        self.flat = np.ascontiguousarray(table).ravel()
+        self.strides = [int(np.prod(self.shape[i + 1:])) for i in range(len(self.shape))]
+        self._kind_stride = self.strides[0]
+        self._dim_strides = self.strides[1:-2]
+        self._pct_stride = self.strides[-2]
+
+    @staticmethod
+    def _percentile_code(percentile: str) -> int:
+        # Anything but P90/P99 is P95, as in get_geofence_radius
+        return 0 if percentile == "P90" else 2 if percentile == "P99" else 1
+
+    def lookup(self, percentile: str = "P95", access_required: bool = False, **values) -> tuple[int, int]:
+        """(delivery_radius, arrival_radius) for one stop; missing dims use their default."""
+        offset = self._percentile_code(percentile) * self._pct_stride + (1 if access_required else 0)
+        for dim, stride in zip(self.dimensions, self._dim_strides):
+            offset += dim.code(values.get(dim.name)) * stride
+        return int(self.flat[offset]), int(self.flat[offset + self._kind_stride])
+
+    def lookup_many(self, columns: dict, percentile="P95", access_required=False) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized lookup for a batch.
+
+        Args:
+            columns: dimension name -> sequence of raw values (missing
+                     dimensions use their default)
+            percentile: One value or a sequence
+            access_required: One bool or a sequence
+
+        Returns:
+            tuple: (delivery radii, arrival radii) int16 arrays
+        """
+        n = max((len(v) for v in columns.values()), default=1)
+        offset = np.zeros(n, dtype=np.int64)
+        for dim, stride in zip(self.dimensions, self._dim_strides):
+            raw = columns.get(dim.name)
+            if raw is None:
+                offset += dim.code(None) * stride
+                continue
+            raw = np.asarray(raw)
+            if raw.dtype.kind not in "US":
+                raw = raw.astype(object).astype(str)
+            uniques, inverse = np.unique(raw, return_inverse=True)
+            codes = np.array([dim.code(value) for value in uniques], dtype=np.int64)
+            offset += codes[inverse.ravel()] * stride
+        if isinstance(percentile, str):
+            offset += self._percentile_code(percentile) * self._pct_stride
+        else:
+            offset += np.array([self._percentile_code(p) for p in percentile]) * self._pct_stride
+        offset += np.asarray(access_required, dtype=bool).astype(np.int64)
+        return self.flat[offset], self.flat[offset + self._kind_stride]
+
+
+# =============================================================================
+# Default Schema
+# =============================================================================
+
+SCHEMA_SOURCES = ADDRESS_SOURCES + ["MELISSA", "MANUAL_ADJ"]
+
+
+def default_schema(config_path: Optional[str | Path] = None) -> ModelSchema:
+    """
+    The current model as a schema: config tables (MELISSA and DEFAULT source
+    columns included), exact -> DEFAULT source -> property default.
+    """
+    delivery, arrival = tables_from_config(load_config(config_path) if config_path else load_config())
+    rules = []
+    for kind, lookup in (("delivery", delivery), ("arrival", arrival)):
+        for (density, prop, source), radius in lookup.items():
+            rules.append({
+                "density_category": density,
+                "property_type": prop,
+                "address_source": WILDCARD if source == "DEFAULT" else source,
+                kind: radius,
+            })
+    for prop in PROPERTY_TYPES:
+        rules.append({
+            "property_type": prop,
+            "delivery": DEFAULT_BY_PROPERTY.get(prop, DEFAULT_RADIUS),
+            "arrival": DEFAULT_ARRIVAL_BY_PROPERTY.get(prop, 50),
+        })
+    return ModelSchema(
+        dimensions=[
+            Dimension("density_category", DENSITY_CATEGORIES, "SUBURBAN"),
+            Dimension("property_type", PROPERTY_TYPES, "HOUSE"),
+            Dimension("address_source", SCHEMA_SOURCES, "AMS"),
+        ],
+        fallbacks=[
+            ["density_category", "property_type", "address_source"],
+            ["density_category", "property_type"],
+            ["property_type"],
+        ],
+        rules=rules,
+        defaults={"delivery": DEFAULT_RADIUS, "arrival": 50},
+        access_dimension="property_type",
+        access_multipliers=dict(ACCESS_MULTIPLIERS),
+    )
+
+
+def load_schema(path: str | Path) -> ModelSchema:
+    """Read a schema JSON file (see module docstring)."""
+    with open(path, encoding="utf-8") as f:
+        return ModelSchema.from_dict(json.load(f))
+
@@ -0,0 +1,362 @@
+"""
+Geofence Sidecar (binary protocol)
+==================================
+
+A tiny lookup server for co-located dispatch services, where even JSON over
+HTTP costs far more than the lookup itself. Answers straight from the
+compiled radius table in geofence_model.
+
+Protocol (all little-endian, one response per request, in order):
+    request   uint32 length | N x 5 uint8 codes
+                              (property, source, density, percentile, access)
+    response  uint32 length | N x 2 int16 (delivery_m, arrival_m)
+
+Codes are positions in PROPERTY_TYPES, ADDRESS_SOURCES, DENSITY_CATEGORIES
+and PERCENTILES; access is 0/1. Out-of-range codes get the same defaults
+as get_geofence_radius (HOUSE / AMS / SUBURBAN / P95). Clients may pipeline
+any number of frames before reading responses.
+
+Usage:
+    python geofence_sidecar.py serve --unix /tmp/geofence.sock
+    python geofence_sidecar.py serve --tcp 127.0.0.1:9501
+    python geofence_sidecar.py bench --batch 4096 --depth 16
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import selectors
+import socket
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python lookup path
+    np = None
+
+from geofence_model import (
+    ADDRESS_SOURCES,
+    DENSITY_CATEGORIES,
+    PERCENTILES,
+    PROPERTY_TYPES,
+    RADIUS_TABLE,
+    TABLE_STRIDES,
+    _percentile_code,
+    normalize_input,
+    table_index,
+    table_to_bytes,
+)
+
+STOP_SIZE = 5
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+HEADER = struct.Struct("<I")
+
+# Field order on the wire, with the default code for out-of-range values
+FIELDS = (
+    (PROPERTY_TYPES, PROPERTY_TYPES.index("HOUSE")),
+    (ADDRESS_SOURCES, ADDRESS_SOURCES.index("AMS")),
+    (DENSITY_CATEGORIES, DENSITY_CATEGORIES.index("SUBURBAN")),
+    (PERCENTILES, PERCENTILES.index("P95")),
+)
+
+
+# =============================================================================
+# Lookup
+# =============================================================================
+
+def _remap_table(size: int, default: int) -> bytes:
+    """256-entry byte map: valid codes to themselves, anything else to default."""
+    return bytes(code if code < size else default for code in range(256))
+
+
+_REMAPS = [_remap_table(len(values), default) for values, default in FIELDS]
+_REMAPS.append(bytes([0] + [1] * 255))  # access: any nonzero byte is "yes"
+
+_COMBOS = TABLE_STRIDES[0]
+_DENSITY_STRIDE, _PROPERTY_STRIDE, _SOURCE_STRIDE, _PERCENTILE_STRIDE, _ACCESS_STRIDE = TABLE_STRIDES[1:]
+
+
+def _combo_index(prop: int, source: int, density: int, percentile: int, access: int) -> int:
+    # Delivery half of the compiled table; arrival is _COMBOS further on
+    return table_index(0, density, prop, source, percentile, access)
+
+
+# (delivery, arrival) per combination, packed as the wire result
+_PAIRS = [
+    struct.pack("<hh", RADIUS_TABLE[i], RADIUS_TABLE[i + _COMBOS]) for i in range(_COMBOS)
+]
+_PAIR_BY_KEY = {}
+for _p in range(len(PROPERTY_TYPES)):
+    for _s in range(len(ADDRESS_SOURCES)):
+        for _d in range(len(DENSITY_CATEGORIES)):
+            for _pct in range(len(PERCENTILES)):
+                for _a in (0, 1):
+                    _PAIR_BY_KEY[bytes((_p, _s, _d, _pct, _a))] = _PAIRS[_combo_index(_p, _s, _d, _pct, _a)]
+
+if np is not None:
+    _NP_REMAPS = [np.frombuffer(remap, dtype=np.uint8).astype(np.intp) for remap in _REMAPS]
+    _NP_PAIRS = np.frombuffer(table_to_bytes(RADIUS_TABLE), dtype="<i2").reshape(2, -1).T.copy()
+
+
+def lookup_frame(payload: bytes) -> bytes:
+    """
+    Resolve a packed request payload to packed (delivery, arrival) radii.
+
+    Args:
+        payload: N x 5 code bytes
+
+    Returns:
+        bytes: N x 2 little-endian int16
+    """
+    if len(payload) % STOP_SIZE:
+        raise ValueError(f"payload length {len(payload)} is not a multiple of {STOP_SIZE}")
+
+    if np is not None:
+        codes = np.frombuffer(payload, dtype=np.uint8).reshape(-1, STOP_SIZE)
+        prop, source, density, pct, access = (remap[codes[:, i]] for i, remap in enumerate(_NP_REMAPS))
+        index = (
+            density * _DENSITY_STRIDE + prop * _PROPERTY_STRIDE + source * _SOURCE_STRIDE
+            + pct * _PERCENTILE_STRIDE + access * _ACCESS_STRIDE
+        )
+        return _NP_PAIRS[index].tobytes()
+
+    pairs = _PAIR_BY_KEY
+    out = []
+    for offset in range(0, len(payload), STOP_SIZE):
+        key = payload[offset:offset + STOP_SIZE]
+        pair = pairs.get(key)
+        if pair is None:
+            pair = pairs[bytes(remap[b] for remap, b in zip(_REMAPS, key))]
+        out.append(pair)
+    return b"".join(out)
+
+
+def pack_stops(stops: list[tuple]) -> bytes:
+    """
+    Pack (property_type, address_source, density_category, percentile, access)
+    tuples of names into request codes, normalizing like get_geofence_radius.
+    """
+    packed = bytearray()
+    for prop, source, density, percentile, access in stops:
+        packed += bytes((
+            PROPERTY_TYPES.index(normalize_input(prop, PROPERTY_TYPES, "HOUSE")),
+            ADDRESS_SOURCES.index(normalize_input(source, ADDRESS_SOURCES, "AMS")),
+            DENSITY_CATEGORIES.index(normalize_input(density, DENSITY_CATEGORIES, "SUBURBAN")),
+            _percentile_code(percentile),
+            1 if access else 0,
+        ))
+    return bytes(packed)
+
+
+def unpack_radii(data: bytes) -> list[tuple[int, int]]:
+    """Decode a response payload into (delivery_m, arrival_m) pairs."""
+    values = array("h")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return list(zip(values[0::2], values[1::2]))
+
+
+# =============================================================================
+# Server
+# =============================================================================
+
+async def _handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            header = await reader.readexactly(HEADER.size)
+            (length,) = HEADER.unpack(header)
+            if length > MAX_FRAME_BYTES:
+                break
+            result = lookup_frame(await reader.readexactly(length))
+            writer.write(HEADER.pack(len(result)))
+            writer.write(result)
+            # Returns at once unless the client has stopped reading, in which
+            # case we stop reading too instead of buffering without bound
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(unix_path: str | None = None, host: str = "127.0.0.1", port: int = 9501) -> None:
+    """Serve forever on a Unix domain socket (preferred) or TCP."""
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        server = await asyncio.start_unix_server(_handle_connection, path=unix_path)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(_handle_connection, host, port)
+        where = f"{host}:{port}"
+    print(f"🎯 Geofence sidecar listening on {where} ({'numpy' if np is not None else 'pure-Python'} lookups)")
+    async with server:
+        await server.serve_forever()
+
+
+# =============================================================================
+# Client
+# =============================================================================
+
+class SidecarClient:
+    """Blocking client with request pipelining."""
+
+    def __init__(self, unix_path: str | None = None, host: str = "127.0.0.1", port: int = 9501):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._received = bytearray()
+
+    def _pop_response(self) -> bytes | None:
+        """Take one complete response frame off the receive buffer, if any."""
+        if len(self._received) < HEADER.size:
+            return None
+        (length,) = HEADER.unpack_from(self._received)
+        end = HEADER.size + length
+        if len(self._received) < end:
+            return None
+        payload = bytes(self._received[HEADER.size:end])
+        del self._received[:end]
+        return payload
+
+    def _recv(self) -> None:
+        chunk = self.sock.recv(1 << 20)
+        if not chunk:
+            raise ConnectionError("sidecar closed the connection")
+        self._received += chunk
+
+    def _read_response(self) -> bytes:
+        while (payload := self._pop_response()) is None:
+            self._recv()
+        return payload
+
+    def lookup(self, payload: bytes) -> bytes:
+        """One frame, one round trip."""
+        self.sock.sendall(HEADER.pack(len(payload)) + payload)
+        return self._read_response()
+
+    def lookup_pipelined(self, payloads: list[bytes], depth: int = 16) -> list[bytes]:
+        """
+        Keep up to `depth` frames in flight; responses come back in order.
+
+        Sending and reading are interleaved on a non-blocking socket: with
+        deep pipelines of large frames, a client that only sends would fill
+        the server's write buffer, the server would stop reading, and both
+        sides would wait on each other forever.
+        """
+        results: list[bytes] = []
+        outgoing = memoryview(b"")
+        sent_frames = 0
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
+        timeout = self.sock.gettimeout()
+        self.sock.setblocking(False)
+        try:
+            while len(results) < len(payloads):
+                if not outgoing and sent_frames < len(payloads) and sent_frames - len(results) < depth:
+                    payload = payloads[sent_frames]
+                    outgoing = memoryview(HEADER.pack(len(payload)) + payload)
+                    sent_frames += 1
+                events = selectors.EVENT_READ | (selectors.EVENT_WRITE if outgoing else 0)
+                selector.modify(self.sock, events)
+                for _, mask in selector.select():
+                    if mask & selectors.EVENT_WRITE:
+                        outgoing = outgoing[self.sock.send(outgoing):]
+                    if mask & selectors.EVENT_READ:
+                        self._recv()
+                        while (response := self._pop_response()) is not None:
+                            results.append(response)
+        finally:
+            selector.close()
+            self.sock.settimeout(timeout)
+        return results
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+# =============================================================================
+# Benchmark
+# =============================================================================
+
+def _serve_in_process(unix_path: str) -> None:
+    asyncio.run(serve(unix_path=unix_path))
+
+
+def bench(client: SidecarClient, frames: int, batch: int, depth: int, seed: int = 42) -> dict:
+    """Measure pipelined lookups/second over one connection."""
+    rng = random.Random(seed)
+    # Wire order: property, source, density, percentile, access
+    sizes = (len(PROPERTY_TYPES), len(ADDRESS_SOURCES), len(DENSITY_CATEGORIES), len(PERCENTILES), 2)
+    payload = bytes(code for _ in range(batch) for code in (rng.randrange(size) for size in sizes))
+    client.lookup_pipelined([payload] * depth, depth)  # warm up
+
+    start = time.perf_counter()
+    client.lookup_pipelined([payload] * frames, depth)
+    elapsed = time.perf_counter() - start
+    lookups = frames * batch
+    return {
+        "frames": frames,
+        "batch": batch,
+        "depth": depth,
+        "lookups": lookups,
+        "seconds": round(elapsed, 3),
+        "lookups_per_s": round(lookups / elapsed),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Binary-protocol geofence lookup sidecar")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "bench"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--unix", help="Unix domain socket path")
+        cmd.add_argument("--tcp", help="host:port (default 127.0.0.1:9501)")
+    bench_cmd = sub.choices["bench"]
+    bench_cmd.add_argument("--frames", type=int, default=2000)
+    bench_cmd.add_argument("--batch", type=int, default=4096, help="Stops per frame")
+    bench_cmd.add_argument("--depth", type=int, default=16, help="Frames in flight")
+    args = parser.parse_args(argv)
+
+    host, port = "127.0.0.1", 9501
+    if args.tcp:
+        host, _, port_str = args.tcp.rpartition(":")
+        port = int(port_str)
+
+    if args.command == "serve":
+        asyncio.run(serve(args.unix, host, port))
+        return
+
+    server = None
+    unix_path = args.unix
+    if not unix_path and not args.tcp:
+        # No server given: start one on a private socket for the run
+        unix_path = os.path.join(tempfile.mkdtemp(), "geofence.sock")
+        server = multiprocessing.Process(target=_serve_in_process, args=(unix_path,), daemon=True)
+        server.start()
+        while not os.path.exists(unix_path):
+            time.sleep(0.05)
+    client = SidecarClient(unix_path, host, port)
+    try:
+        print(json.dumps(bench(client, args.frames, args.batch, args.depth), indent=2))
+    finally:
+        client.close()
+        if server is not None:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Trajectory Processor
+====================
+
+Recomputes arrival and delivery distances from raw driver GPS pings, so the
+arrival tables (ARRIVAL_GEOFENCE_LOOKUP) can be regenerated and audited
+instead of trusting an ARRVL_DIST_METER column produced elsewhere.
+
+Pipeline, all segment-wise numpy ops over a memory-mapped ping file:
+    1. Step distance/speed between consecutive pings of the same driver
+    2. Runs of slow steps (< DWELL_SPEED_MPS) lasting >= MIN_DWELL_S are
+       dwell episodes; episodes split by a brief GPS jump are merged
+    3. Each delivery is matched to the dwell episode it happened in (or the
+       one that ended just before it); the episode's first ping is the
+       arrival point
+    4. arrival distance = arrival point -> stop, delivery distance = delivery
+       scan location (or the nearest ping in time) -> stop
+
+Pings: .npy with PING_DTYPE, sorted by (driver, ts). Build one from CSV
+(driver_id, ts, lat, lon) with the `convert` command. Driver IDs may be any
+string; `convert` stores integer codes in the .npy and the code -> ID list
+next to it (pings.drivers.json), which `process` uses to code deliveries
+the same way.
+
+Deliveries CSV columns (case-insensitive):
+    stop_id, driver_id, delivered_at (epoch s or ISO 8601), stop_lat,
+    stop_lon, [dlvrd_lat, dlvrd_lon], density_category, property_type,
+    address_source, access_required
+
+Output is a records CSV in the geofence_backtest.py format, so it feeds the
+backtest and the optimizer directly.
+
+Usage:
+    python geofence_trajectory.py convert pings.csv --out pings.npy
+    python geofence_trajectory.py process pings.npy deliveries.csv --out records.csv
+    python geofence_trajectory.py bench --pings 20000000
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import csv
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+PING_DTYPE = np.dtype([("driver", "<u4"), ("ts", "<f8"), ("lat", "<f8"), ("lon", "<f8")])
+
+EARTH_RADIUS_M = 6_371_000.0
+DWELL_SPEED_MPS = 2.0      # walking to the door still counts as dwelling
+MIN_DWELL_S = 30.0
+MAX_GAP_S = 300.0          # longer ping gaps split a trajectory
+MERGE_GAP_S = 30.0         # re-join dwells split by a jitter spike...
+MERGE_RADIUS_M = 50.0      # ...that didn't actually go anywhere
+MATCH_GRACE_S = 600.0      # delivery scanned up to this long after the dwell ended
+CHUNK_PINGS = 4_000_000
+
+OUTPUT_COLUMNS = [
+    "stop_id", "density_category", "property_type", "address_source",
+    "access_required", "dlvrd_distance", "arrvl_dist_meter", "dwell_s",
+]
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (broadcasts over numpy arrays)."""
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+# =============================================================================
+# Dwell Detection
+# =============================================================================
+
+def detect_dwells(driver: np.ndarray, ts: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> dict:
+    """
+    Find dwell episodes in pings sorted by (driver, ts).
+
+    Returns:
+        dict of arrays, one entry per episode: driver, first/last (ping
+        indices), start/end (ts), lat/lon (centroid)
+    """
+    step = haversine_m(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    dt = np.diff(ts)
+    connected = (driver[1:] == driver[:-1]) & (dt <= MAX_GAP_S)
+    slow = connected & (step <= DWELL_SPEED_MPS * np.maximum(dt, 1e-3))
+
+    # Runs of slow steps: step i joins ping i and i+1
+    edges = np.diff(np.concatenate(([0], slow.view(np.int8), [0])))
+    first = np.flatnonzero(edges == 1)
+    last = np.flatnonzero(edges == -1)          # exclusive step index = last ping
+
+    # Merge runs of the same driver separated by a short, local fast blip
+    if len(first) > 1:
+        after, before = first[1:], last[:-1]
+        joinable = (
+            (driver[after] == driver[before])
+            & (ts[after] - ts[before] <= MERGE_GAP_S)
+            & (haversine_m(lat[before], lon[before], lat[after], lon[after]) <= MERGE_RADIUS_M)
+        )
+        keep_start = np.concatenate(([True], ~joinable))
+        keep_end = np.concatenate((~joinable, [True]))
+        first, last = first[keep_start], last[keep_end]
+
+    long_enough = ts[last] - ts[first] >= MIN_DWELL_S
+    first, last = first[long_enough], last[long_enough]
+
+    # Centroids via prefix sums over the pings of each episode
+    lat_sum = np.concatenate(([0.0], np.cumsum(lat)))
+    lon_sum = np.concatenate(([0.0], np.cumsum(lon)))
+    count = last + 1 - first
+    return {
+        "driver": driver[first],
+        "first": first,
+        "last": last,
+        "start": ts[first],
+        "end": ts[last],
+        "lat": (lat_sum[last + 1] - lat_sum[first]) / count,
+        "lon": (lon_sum[last + 1] - lon_sum[first]) / count,
+    }
+
+
+def _sort_keys(driver: np.ndarray, ts: np.ndarray, drivers: np.ndarray, t0: float, span: float) -> np.ndarray:
+    """Single float key ordering (driver, ts) for searchsorted within a chunk."""
+    return np.searchsorted(drivers, driver) * span + (ts - t0)
+
+
+def match_deliveries(pings: np.ndarray, deliveries: dict) -> dict:
+    """
+    Arrival and delivery distances for deliveries of the drivers in `pings`.
+
+    Args:
+        pings: PING_DTYPE rows sorted by (driver, ts), whole drivers only
+        deliveries: dict of arrays (driver, ts, stop_lat, stop_lon,
+                    dlvrd_lat, dlvrd_lon - NaN where no scan location)
+
+    Returns:
+        dict: arrival_m, delivery_m, dwell_s arrays (NaN when unmatched)
+    """
+    driver = np.ascontiguousarray(pings["driver"])
+    ts = np.ascontiguousarray(pings["ts"])
+    lat = np.ascontiguousarray(pings["lat"])
+    lon = np.ascontiguousarray(pings["lon"])
+    dwells = detect_dwells(driver, ts, lat, lon)
+
+    drivers = np.unique(driver)
+    t0 = min(ts.min(), deliveries["ts"].min()) - 1
+    span = max(ts.max(), deliveries["ts"].max()) - t0 + MATCH_GRACE_S + 1
+    d_driver, d_ts = deliveries["driver"], deliveries["ts"]
+    d_key = _sort_keys(d_driver, d_ts, drivers, t0, span)
+    n = len(d_ts)
+
+    # Arrival: latest dwell starting at or before the scan, same driver, and
+    # not ended more than MATCH_GRACE_S before it
+    arrival = np.full(n, np.nan)
+    dwell_s = np.full(n, np.nan)
+    if len(dwells["start"]):
+        ep_key = _sort_keys(dwells["driver"], dwells["start"], drivers, t0, span)
+        ep = np.searchsorted(ep_key, d_key, side="right") - 1
+        safe = np.maximum(ep, 0)
+        hit = (ep >= 0) & (dwells["driver"][safe] == d_driver) & (d_ts - dwells["end"][safe] <= MATCH_GRACE_S)
+        first = dwells["first"][safe[hit]]
+        arrival[hit] = haversine_m(lat[first], lon[first], deliveries["stop_lat"][hit], deliveries["stop_lon"][hit])
+        dwell_s[hit] = dwells["end"][safe[hit]] - dwells["start"][safe[hit]]
+
+    # Delivery: scan location when present, else the ping nearest in time
+    scan_lat, scan_lon = deliveries["dlvrd_lat"].copy(), deliveries["dlvrd_lon"].copy()
+    missing = np.isnan(scan_lat) | np.isnan(scan_lon)
+    if missing.any() and len(ts) > 1:
+        ping_key = _sort_keys(driver, ts, drivers, t0, span)
+        right = np.clip(np.searchsorted(ping_key, d_key[missing]), 1, len(ts) - 1)
+        left = right - 1
+        nearest = np.where(np.abs(ping_key[left] - d_key[missing]) <= np.abs(ping_key[right] - d_key[missing]), left, right)
+        same = driver[nearest] == d_driver[missing]
+        scan_lat[missing] = np.where(same, lat[nearest], np.nan)
+        scan_lon[missing] = np.where(same, lon[nearest], np.nan)
+    delivery = haversine_m(scan_lat, scan_lon, deliveries["stop_lat"], deliveries["stop_lon"])
+
+    return {"arrival_m": arrival, "delivery_m": delivery, "dwell_s": dwell_s}
+
+
+# =============================================================================
+# Files
+# =============================================================================
+
+def iter_driver_chunks(pings: np.ndarray, chunk_pings: int = CHUNK_PINGS):
+    """Yield slices of ~chunk_pings rows that never split a driver."""
+    driver = pings["driver"]
+    start = 0
+    while start < len(pings):
+        end = min(len(pings), start + chunk_pings)
+        if end < len(pings):
+            end = int(np.searchsorted(driver, driver[end - 1], side="right"))
+        yield pings[start:end]
+        start = end
+
+
+def parse_timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _float_or_nan(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def driver_ids_path(pings_path: str) -> str:
+    """Where `convert` keeps the code -> driver ID list for a ping file."""
+    return str(Path(pings_path).with_suffix(".drivers.json"))
+
+
+def factorize_drivers(driver_ids) -> tuple[np.ndarray, list[str]]:
+    """
+    Integer codes for string driver IDs.
+
+    Returns:
+        tuple: (uint32 code per input, sorted distinct IDs; code = position)
+    """
+    ids, codes = np.unique(np.asarray([str(d).strip() for d in driver_ids], dtype=str), return_inverse=True)
+    return codes.astype(np.uint32), ids.tolist()
+
+
+def load_deliveries(path: str, driver_ids: list[str] | None = None) -> tuple[dict, list[dict]]:
+    """
+    Read a deliveries CSV, sorted by (driver, delivered_at).
+
+    Args:
+        driver_ids: The ping file's code -> driver ID list. Drivers with no
+                    pings get codes past the end, so they never match.
+                    Without it, driver IDs must already be the integer
+                    codes stored in the ping file.
+
+    Returns:
+        tuple: (numeric arrays for matching, pass-through attribute rows)
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = [{key.strip().lower(): value for key, value in row.items()} for row in csv.DictReader(f)]
+    if driver_ids is None:
+        try:
+            codes = [int(row["driver_id"]) for row in rows]
+        except ValueError as e:
+            raise ValueError(
+                f"non-numeric driver_id in {path}; pass the ping file's driver list "
+                f"(created by `convert`) to match string IDs"
+            ) from e
+    else:
+        known = {driver: code for code, driver in enumerate(driver_ids)}
+        codes = [known.setdefault(row["driver_id"].strip(), len(known)) for row in rows]
+    for row, code in zip(rows, codes):
+        row["_driver_code"] = code
+    rows.sort(key=lambda row: (row["_driver_code"], parse_timestamp(row["delivered_at"])))
+    arrays = {
+        "driver": np.array([row.pop("_driver_code") for row in rows], dtype=np.uint32),
+        "ts": np.array([parse_timestamp(row["delivered_at"]) for row in rows]),
+        "stop_lat": np.array([float(row["stop_lat"]) for row in rows]),
+        "stop_lon": np.array([float(row["stop_lon"]) for row in rows]),
+        "dlvrd_lat": np.array([_float_or_nan(row.get("dlvrd_lat")) for row in rows]),
+        "dlvrd_lon": np.array([_float_or_nan(row.get("dlvrd_lon")) for row in rows]),
+    }
+    return arrays, rows
+
+
+def process(pings: np.ndarray, deliveries: dict, chunk_pings: int = CHUNK_PINGS) -> dict:
+    """Match every delivery against its driver's pings, chunk by chunk."""
+    n = len(deliveries["ts"])
+    out = {key: np.full(n, np.nan) for key in ("arrival_m", "delivery_m", "dwell_s")}
+    for chunk in iter_driver_chunks(pings, chunk_pings):
+        lo = np.searchsorted(deliveries["driver"], chunk["driver"][0], side="left")
+        hi = np.searchsorted(deliveries["driver"], chunk["driver"][-1], side="right")
+        if lo == hi:
+            continue
+        part = match_deliveries(chunk, {key: values[lo:hi] for key, values in deliveries.items()})
+        for key, values in part.items():
+            out[key][lo:hi] = values
+    return out
+
+
+def write_records(path: str, rows: list[dict], result: dict) -> int:
+    """Write backtest-format records; returns how many had an arrival match."""
+    def fmt(value: float) -> str:
+        return "" if np.isnan(value) else f"{value:.1f}"
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_COLUMNS)
+        for i, row in enumerate(rows):
+            writer.writerow([
+                row.get("stop_id", ""), row.get("density_category", ""), row.get("property_type", ""),
+                row.get("address_source", ""), row.get("access_required", ""),
+                fmt(result["delivery_m"][i]), fmt(result["arrival_m"][i]), fmt(result["dwell_s"][i]),
+            ])
+    return int((~np.isnan(result["arrival_m"])).sum())
+
+
+def convert_csv(path: str, out: str) -> int:
+    """
+    CSV pings (driver_id, ts, lat, lon) -> sorted PING_DTYPE .npy, plus the
+    code -> driver ID list at driver_ids_path(out).
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        index = [header.index(name) for name in ("driver_id", "ts", "lat", "lon")]
+        rows = [(r[index[0]], parse_timestamp(r[index[1]]), float(r[index[2]]), float(r[index[3]])) for r in reader]
+    codes, driver_ids = factorize_drivers([row[0] for row in rows])
+    pings = np.array([(0, *row[1:]) for row in rows], dtype=PING_DTYPE)
+    pings["driver"] = codes
+    pings = pings[np.lexsort((pings["ts"], pings["driver"]))]
+    np.save(out, pings)
+    with open(driver_ids_path(out), "w", encoding="utf-8") as f:
+        json.dump(driver_ids, f)
+    return len(pings)
+
+
+# =============================================================================
+# Benchmark
+# =============================================================================
+
+def synthetic_route(n_pings: int, drivers: int = 500, seed: int = 42) -> tuple[np.ndarray, dict]:
+    """Pings for drivers alternating 60 s drives and 90 s stops, plus one delivery per stop."""
+    rng = np.random.default_rng(seed)
+    per = n_pings // drivers
+    pings = np.zeros(per * drivers, dtype=PING_DTYPE)
+    pings["driver"] = np.repeat(np.arange(drivers, dtype=np.uint32), per)
+    t = np.tile(np.arange(per, dtype=np.float64) * 5.0, drivers)   # 5 s pings
+    pings["ts"] = 1.7e9 + t
+    phase = t % 150.0
+    moving = phase < 60.0
+    speed = np.where(moving, 12.0, 0.0) * 5.0                      # meters per ping
+    heading = rng.uniform(0, 2 * np.pi, drivers)[pings["driver"]]
+    north = np.cumsum(speed * np.cos(heading)).reshape(drivers, per)
+    east = np.cumsum(speed * np.sin(heading)).reshape(drivers, per)
+    north -= north[:, :1]
+    east -= east[:, :1]
+    pings["lat"] = 40.0 + north.ravel() / 111_320 + rng.normal(0, 3e-5, len(pings))
+    pings["lon"] = -75.0 + east.ravel() / 85_000 + rng.normal(0, 3e-5, len(pings))
+
+    stop_at = np.flatnonzero((phase == 90.0) & (t > 0))            # mid-stop scans
+    deliveries = {
+        "driver": pings["driver"][stop_at],
+        "ts": pings["ts"][stop_at],
+        "stop_lat": pings["lat"][stop_at] + rng.normal(0, 2e-4, len(stop_at)),
+        "stop_lon": pings["lon"][stop_at] + rng.normal(0, 2e-4, len(stop_at)),
+        "dlvrd_lat": np.full(len(stop_at), np.nan),
+        "dlvrd_lon": np.full(len(stop_at), np.nan),
+    }
+    return pings, deliveries
+
+
+def bench(n_pings: int) -> dict:
+    pings, deliveries = synthetic_route(n_pings)
+    start = time.perf_counter()
+    result = process(pings, deliveries)
+    elapsed = time.perf_counter() - start
+    return {
+        "pings": len(pings),
+        "deliveries": len(deliveries["ts"]),
+        "matched": int((~np.isnan(result["arrival_m"])).sum()),
+        "seconds": round(elapsed, 3),
+        "pings_per_s": round(len(pings) / elapsed),
+    }
+
+
+# =============================================================================
+# Main Execution
+# =============================================================================
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Arrival/dwell detection from GPS pings")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="CSV pings -> sorted .npy")
+    convert.add_argument("pings_csv")
+    convert.add_argument("--out", default="pings.npy")
+    run = sub.add_parser("process", help="Compute arrival/delivery distances")
+    run.add_argument("pings", help=".npy ping file (memory-mapped)")
+    run.add_argument("deliveries", help="Deliveries CSV")
+    run.add_argument("--out", default="trajectory_records.csv")
+    run.add_argument("--chunk", type=int, default=CHUNK_PINGS, help="Pings per chunk")
+    bench_cmd = sub.add_parser("bench", help="Throughput on a synthetic fleet")
+    bench_cmd.add_argument("--pings", type=int, default=10_000_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        print(f"📁 {convert_csv(args.pings_csv, args.out):,} pings -> {args.out}")
+    elif args.command == "process":
+        pings = np.load(args.pings, mmap_mode="r")
+        driver_ids = None
+        if Path(driver_ids_path(args.pings)).exists():
+            with open(driver_ids_path(args.pings), encoding="utf-8") as f:
+                driver_ids = json.load(f)
+        deliveries, rows = load_deliveries(args.deliveries, driver_ids)
+        start = time.perf_counter()
+        result = process(pings, deliveries, args.chunk)
+        matched = write_records(args.out, rows, result)
+        print(f"✅ {len(rows):,} deliveries, {matched:,} matched to a dwell, "
+              f"{len(pings) / (time.perf_counter() - start):,.0f} pings/s")
+        print(f"📁 Records: {args.out}")
+    else:
+        print(json.dumps(bench(args.pings), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,46 @@ A beautiful FastAPI + HTMX interface for the geofence prediction model.
 Author: Code Puppy 🐶
 """
 
+import gzip
+import hashlib
+import json
+import os
 import sys
+import threading
+import zlib
+from contextlib import asynccontextmanager
+from operator import itemgetter
 from pathlib import Path
 
 # Add parent directory to import geofence_model
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
 
-from geofence_model import get_geofence_radius, get_arrival_radius
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
 
-app = FastAPI(title="Geofence Radius Predictor", version="1.0.0")
+from browser_model import render_browser_model
+import geofence_model
+from geofence_registry import get_registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /ready reports it (503 until done) while
+    # the server already answers requests. Gunicorn workers fork from a master
+    # that already warmed up (and gc.freeze()d) in when_ready: nothing to do
+    if not MODEL_STATE.get("ready"):
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="Geofence Radius Predictor", version="1.0.0", lifespan=lifespan)
 
 # Templates
 templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
@@ -66,13 +93,85 @@ ACCESS_LABELS = {
 }
 
 
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    """Render the main UI page."""
-    return templates.TemplateResponse(
-        "index.html",
+# =============================================================================
+# HTTP Caching
+# =============================================================================
+# Every response depends only on its query parameters and the model tables,
+# so the model version hash makes a strong validator. Deploying new tables
+# changes the hash and every ETag with it.
+
+PAGE_CACHE_CONTROL = "public, max-age=60"
+PREDICT_CACHE_CONTROL = "public, max-age=3600"
+
+# Dynamic bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def compress_variants(body: bytes) -> dict[str, bytes]:
+    """Precompress a body once at max quality for every supported encoding."""
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants
+
+
+def negotiate_encoding(request: Request) -> str:
+    """Pick br > gzip > identity from the Accept-Encoding header."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(coding.lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison (proxies may add W/ to compressed copies)."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def encoded_response(
+    request: Request,
+    variants: dict[str, bytes],
+    media_type: str,
+    headers: dict[str, str],
+    encoding: str | None = None,
+) -> Response:
+    """Serve the best precompressed variant the client accepts."""
+    if encoding is None:
+        encoding = negotiate_encoding(request)
+    body = variants.get(encoding, variants["identity"])
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if body is not variants["identity"]:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def load_model_state() -> dict:
+    """
+    Derive everything that depends on the model tables.
+
+    Called once at import (the tables are fixed for the life of the
+    process; a deploy with new tables starts new workers): computes the
+    version hash, prerenders the page and precompresses it. The page embeds
+    the registry's default version.
+    """
+    default = get_registry().resolve()
+    version = default.digest
+    page = templates.get_template("index.html").render(
         {
-            "request": request,
             "property_types": PROPERTY_TYPES,
             "address_sources": ADDRESS_SOURCES,
             "density_categories": DENSITY_CATEGORIES,
@@ -83,36 +182,125 @@ async def home(request: Request):
             "percentile_labels": PERCENTILE_LABELS,
             "access_options": ACCESS_OPTIONS,
             "access_labels": ACCESS_LABELS,
-        },
+            # Full radius matrix + decoder, embedded so dropdown changes render
+            # client-side; /predict stays as the fallback
+            "browser_model_js": render_browser_model(default.table()),
+            "model_version": version,
+        }
+    ).encode("utf-8")
+    variants = compress_variants(page)
+    return {
+        "version": version,
+        # One strong validator per representation: the encoded bodies differ
+        "page_etags": {encoding: f'"page-{version}-{encoding}"' for encoding in variants},
+        "page_variants": variants,
+    }
+
+
+MODEL_STATE = load_model_state()
+
+
+def warm_up() -> None:
+    """
+    Touch every lookup path once so the first real request pays nothing,
+    then mark the process ready.
+
+    Runs in the background at startup of every process. Under gunicorn
+    (preload_app) gunicorn.conf.py also runs it in the parent before fork,
+    so workers start warm, share the result copy-on-write and report ready
+    immediately.
+    """
+    for density in geofence_model.DENSITY_CATEGORIES:
+        for prop in geofence_model.PROPERTY_TYPES:
+            for source in geofence_model.ADDRESS_SOURCES:
+                for percentile in geofence_model.PERCENTILES:
+                    for access in (False, True):
+                        for version in get_registry().versions.values():
+                            version.lookup(prop, source, density, percentile, access)
+                        geofence_model.lookup_radii(prop, source, density, percentile, access)
+                        geofence_model.get_geofence_radius(prop, source, density, percentile, access)
+                        geofence_model.get_arrival_radius(prop, source, density, percentile, access)
+    for radius in sorted(set(geofence_model.RADIUS_TABLE)):
+        geofence_model.circle_template(radius)
+    MODEL_STATE["ready"] = True
+
+
+def prediction_etag(version: str, *params: str) -> str:
+    """
+    Strong ETag for a prediction: table digest + hash of the raw inputs.
+
+    Callers pass the version name among the inputs: versions with identical
+    tables share a digest but render different bodies (model_version).
+    """
+    digest = hashlib.blake2b("|".join(params).encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def route_version(market: str | None, experiment: str | None, unit_id: str | None):
+    """Table version for a request: experiment, then market, then the default."""
+    return get_registry().resolve(experiment or market, unit_id)
+
+
+def route_stop(stop, market: str | None, experiment: str | None):
+    """Table version for one stop of a list: its own market / experiment, else the request's."""
+    if stop.market or stop.experiment:
+        return route_version(stop.market, stop.experiment, stop.unit_id)
+    return route_version(market, experiment, stop.unit_id)
+
+
+def single_version(versions) -> str | None:
+    """Digest of the one version that served a whole request; None when mixed or empty."""
+    digests = {version.digest for version in versions}
+    return digests.pop() if len(digests) == 1 else None
+
+
+# =============================================================================
+# Routes
+# =============================================================================
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    """Render the main UI page (prerendered + precompressed per model version)."""
+    encoding = negotiate_encoding(request)
+    etag = MODEL_STATE["page_etags"][encoding]
+    if etag_matches(request, etag):
+        response = not_modified(etag, PAGE_CACHE_CONTROL)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+    return encoded_response(
+        request,
+        MODEL_STATE["page_variants"],
+        "text/html; charset=utf-8",
+        {"ETag": etag, "Cache-Control": PAGE_CACHE_CONTROL},
+        encoding,
     )
 
 
 @app.get("/predict", response_class=HTMLResponse)
 async def predict(
+    request: Request,
     property_type: str = "HOUSE",
     address_source: str = "AMS",
     density_category: str = "SUBURBAN",
     percentile: str = "P95",
     access_required: str = "NO",
+    market: str | None = None,
+    experiment: str | None = None,
+    unit_id: str | None = None,
 ):
     """Return both arrival and delivery radius predictions as an HTMX partial."""
+    version = route_version(market, experiment, unit_id)
+    etag = prediction_etag(
+        version.digest, version.name, property_type, address_source, density_category, percentile, access_required
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag, PREDICT_CACHE_CONTROL)
+
     access_bool = access_required.upper() == "YES"
     
     # Get both radii
-    arrival_radius = get_arrival_radius(
-        property_type=property_type,
-        address_source=address_source,
-        density_category=density_category,
-        percentile=percentile,
-        access_required=access_bool,
-    )
-    
-    delivery_radius = get_geofence_radius(
-        property_type=property_type,
-        address_source=address_source,
-        density_category=density_category,
-        percentile=percentile,
-        access_required=access_bool,
+    delivery_radius, arrival_radius = version.lookup(
+        property_type, address_source, density_category, percentile, access_bool
     )
     
     # Helper to determine styling based on radius
@@ -129,7 +317,7 @@ async def predict(
     arr_color, arr_icon, arr_label = get_radius_style(arrival_radius)
     del_color, del_icon, del_label = get_radius_style(delivery_radius)
     
-    return f"""
+    html = f"""
     <div class="grid grid-cols-1 md:grid-cols-2 gap-8 animate-fade-in">
         <!-- Arrival Radius -->
         <div class="bg-gray-50 rounded-xl p-6 border-2 border-gray-200">
@@ -158,9 +346,197 @@ async def predict(
         {property_type} • {address_source} • {density_category} • {percentile} • Access: {"Yes" if access_bool else "No"}
     </div>
     """
+    return HTMLResponse(html, headers={"ETag": etag, "Cache-Control": PREDICT_CACHE_CONTROL})
+
+
+# =============================================================================
+# JSON API
+# =============================================================================
+
+class StopInput(BaseModel):
+    property_type: str = "HOUSE"
+    address_source: str = "AMS"
+    density_category: str = "SUBURBAN"
+    percentile: str = "P95"
+    access_required: bool = False
+    market: str | None = None
+    experiment: str | None = None
+    unit_id: str | None = None
+
+
+@app.get("/api/predict")
+async def api_predict(
+    request: Request,
+    property_type: str = "HOUSE",
+    address_source: str = "AMS",
+    density_category: str = "SUBURBAN",
+    percentile: str = "P95",
+    access_required: str = "NO",
+    market: str | None = None,
+    experiment: str | None = None,
+    unit_id: str | None = None,
+):
+    """Return both radii as JSON (optionally routed by market / experiment)."""
+    version = route_version(market, experiment, unit_id)
+    etag = prediction_etag(
+        version.digest, version.name, property_type, address_source, density_category, percentile, access_required
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag, PREDICT_CACHE_CONTROL)
+
+    delivery_radius, arrival_radius = version.lookup(
+        property_type, address_source, density_category, percentile,
+        access_required.upper() == "YES",
+    )
+    body = json.dumps({
+        "arrival_radius_m": arrival_radius,
+        "delivery_radius_m": delivery_radius,
+        "model": version.name,
+        "model_version": version.digest,
+    })
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": PREDICT_CACHE_CONTROL},
+    )
+
+
+@app.post("/api/batch")
+async def api_batch(
+    request: Request,
+    stops: list[StopInput],
+    market: str | None = None,
+    experiment: str | None = None,
+):
+    """
+    Return both radii for a list of stops, compressed when large. Query
+    market / experiment apply to every stop unless the stop sets its own.
+    Each result names the version that served it; the top-level
+    model_version and X-Model-Version are set only when one version served
+    every stop.
+    """
+    results = []
+    versions = []
+    for stop in stops:
+        version = route_stop(stop, market, experiment)
+        versions.append(version)
+        delivery_radius, arrival_radius = version.lookup(
+            stop.property_type, stop.address_source, stop.density_category,
+            stop.percentile, stop.access_required,
+        )
+        results.append({
+            "arrival_radius_m": arrival_radius,
+            "delivery_radius_m": delivery_radius,
+            "model": version.name,
+            "model_version": version.digest,
+        })
+
+    served_by = single_version(versions)
+    body = json.dumps({"model_version": served_by, "results": results}).encode("utf-8")
+    headers = {"Cache-Control": "no-store"}
+    if served_by is not None:
+        headers["X-Model-Version"] = served_by
+    encoding = negotiate_encoding(request) if len(body) >= MIN_COMPRESS_BYTES else "identity"
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class MapStopInput(StopInput):
+    lat: float
+    lon: float
+    zip_code: str | None = None
+    stop_id: str | int | None = None
+
+
+def parse_bbox(bbox: str | None) -> tuple[float, float, float, float] | None:
+    """"min_lon,min_lat,max_lon,max_lat" -> tuple (422 when malformed)."""
+    if not bbox:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=422, detail="bbox min must not exceed max")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def compress_stream(chunks, encoding: str):
+    """Encode a stream of str chunks, compressing on the fly when negotiated."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            yield compressor.process(chunk.encode("utf-8"))
+        yield compressor.finish()
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            yield compressor.compress(chunk.encode("utf-8"))
+        yield compressor.flush()
+    else:
+        for chunk in chunks:
+            yield chunk.encode("utf-8")
+
+
+@app.post("/api/geojson")
+async def api_geojson(
+    request: Request,
+    stops: list[MapStopInput],
+    bbox: str | None = None,
+    precision: int = Query(6, ge=0, le=9),
+    segments: int = Query(geofence_model.CIRCLE_SEGMENTS, ge=8, le=128),
+    market: str | None = None,
+    experiment: str | None = None,
+):
+    """
+    Stream a GeoJSON FeatureCollection with each stop's arrival and delivery
+    fence polygons for map layers. Optional bbox filtering; coordinates are
+    quantized to `precision` decimal places (default 6, ~0.1 m) so the
+    vectorized encoder is used; routed like /api/batch, with
+    X-Model-Version set only when one version served every stop.
+    """
+    box = parse_bbox(bbox)
+    # Routing is a dict lookup, so it runs up front for the header. Radii
+    # are computed lazily while the response streams: geo-cell / ZIP
+    # overrides first, then the routed version, as in get_geofence_radius
+    rows = [stop.model_dump() for stop in stops]
+    for row, stop in zip(rows, stops):
+        row["version"] = route_stop(stop, market, experiment)
+
+    encoding = negotiate_encoding(request)
+    headers = {"Cache-Control": "no-store"}
+    served_by = single_version(row["version"] for row in rows)
+    if served_by is not None:
+        headers["X-Model-Version"] = served_by
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+    chunks = geofence_model.iter_geojson(
+        rows, bbox=box, precision=precision, segments=segments, route=itemgetter("version")
+    )
+    return StreamingResponse(
+        compress_stream(chunks, encoding), media_type="application/geo+json", headers=headers
+    )
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness probe: 200 only once warmup has finished."""
+    response.headers["Cache-Control"] = "no-store"
+    if not MODEL_STATE.get("ready"):
+        response.status_code = 503
+        return {"status": "warming_up"}
+    return {"status": "ready", "model_version": MODEL_STATE["version"], "pid": os.getpid()}
 
 
 @app.get("/health")
-async def health():
+async def health(response: Response):
     """Health check endpoint."""
-    return {"status": "healthy", "model": "geofence_radius_predictor"}
+    response.headers["Cache-Control"] = "no-store"
+    return {"status": "healthy", "model": "geofence_radius_predictor", "model_version": MODEL_STATE["version"]}
@@ -0,0 +1,45 @@
+"""
+Gunicorn config for production serving
+======================================
+
+Preforks N uvicorn workers from one parent that has already imported the
+app: model tables, compiled radius table and the prerendered/precompressed
+page are built once, then shared copy-on-write by every worker.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+
+Environment:
+    GEOFENCE_WORKERS   Worker count (default: one per CPU)
+    PORT               Listen port (default: 8501)
+
+Author: Code Puppy 🐶
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8501')}"
+workers = int(os.environ.get("GEOFENCE_WORKERS") or os.cpu_count() or 1)
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import app.py (and warm it up) in the parent before forking
+preload_app = True
+
+# Lookups are microseconds; anything slower is a stuck worker
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
+
+
+def when_ready(server):
+    """Runs in the parent after preload, right before workers are forked."""
+    # Warm every lookup path once here, so each forked worker starts warm
+    # and ready instead of repeating it
+    import app
+    app.warm_up()
+
+    # Move everything allocated so far out of the GC's tracked generations so
+    # collections in the workers don't touch (and un-share) those pages.
+    gc.freeze()
+    server.log.info("Model preloaded; forking %s workers", server.cfg.workers)
@@ -0,0 +1,391 @@
+"""
+Geofence Service Load Test
+==========================
+
+Drives /predict, /api/predict, /api/batch and /health with a pooled
+keep-alive asyncio HTTP/1.1 client and reports throughput plus
+p50/p95/p99/p99.9 latency as JSON you can diff between versions.
+
+Modes:
+    closed  N virtual users, each sends its next request when the last returns
+    open    Poisson arrivals at a fixed rate; latency is measured from the
+            scheduled send time, so queueing behind a slow server is counted
+
+Usage:
+    python loadtest.py --spawn --duration 20 --out before.json
+    python loadtest.py --url http://localhost:8501 --mode open --rate 2000
+    python loadtest.py --spawn --baseline before.json --out after.json
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+# =============================================================================
+# Input Mix
+# =============================================================================
+
+# Approximate share of each value in the delivery history; override with
+# --weights weights.json using the same structure
+ENUM_WEIGHTS: dict[str, dict[str, float]] = {
+    "property_type": {
+        "HOUSE": 0.62, "APARTMENT": 0.24, "BUSINESS": 0.06,
+        "MOBILE_HOME": 0.04, "DORM": 0.01, "OTHER": 0.03,
+    },
+    "address_source": {"AMS": 0.71, "GOOGLE": 0.17, "MAPBOX": 0.07, "CUSTOMER_PIN": 0.05},
+    "density_category": {"URBAN_HIGH": 0.12, "URBAN_MEDIUM": 0.28, "SUBURBAN": 0.41, "RURAL": 0.19},
+    "percentile": {"P90": 0.15, "P95": 0.75, "P99": 0.10},
+    "access_required": {"NO": 0.86, "YES": 0.14},
+}
+
+# Share of requests per endpoint
+DEFAULT_MIX = "predict=0.5,api=0.35,batch=0.1,health=0.05"
+
+
+class InputSampler:
+    """Draws stop inputs from per-field categorical distributions."""
+
+    def __init__(self, weights: dict[str, dict[str, float]], seed: int):
+        self.rng = random.Random(seed)
+        self.fields = {
+            field: (list(dist.keys()), list(dist.values()))
+            for field, dist in weights.items()
+        }
+
+    def stop(self) -> dict[str, str]:
+        return {
+            field: self.rng.choices(values, weights)[0]
+            for field, (values, weights) in self.fields.items()
+        }
+
+
+def build_request(endpoint: str, sampler: InputSampler, batch_size: int) -> tuple[str, str, bytes | None]:
+    """Return (method, path, body) for one request to an endpoint."""
+    if endpoint == "health":
+        return "GET", "/health", None
+    if endpoint == "batch":
+        stops = []
+        for _ in range(batch_size):
+            stop = sampler.stop()
+            stop["access_required"] = stop["access_required"] == "YES"
+            stops.append(stop)
+        return "POST", "/api/batch", json.dumps(stops).encode("utf-8")
+    path = "/predict" if endpoint == "predict" else "/api/predict"
+    return "GET", f"{path}?{urllib.parse.urlencode(sampler.stop())}", None
+
+
+# =============================================================================
+# Keep-alive HTTP/1.1 Client
+# =============================================================================
+
+class Connection:
+    """One persistent HTTP/1.1 connection (reconnects if the server closes it)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def _connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body: bytes | None) -> int:
+        """Send one request and drain the response; returns the status code."""
+        if self.writer is None or self.writer.is_closing():
+            await self._connect()
+
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nAccept-Encoding: gzip, br\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self.writer.write(head.encode("latin-1") + b"\r\n" + (body or b""))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed connection")
+        status = int(status_line.split()[1])
+
+        length, chunked, close = 0, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+
+        if close:
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+# =============================================================================
+# Load Generation
+# =============================================================================
+
+class Recorder:
+    """Collects per-endpoint latencies once the warmup window has passed."""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, endpoint: str, started: float, ok: bool) -> None:
+        if started < self.measure_from:
+            return
+        if ok:
+            self.latencies.setdefault(endpoint, []).append(time.perf_counter() - started)
+        else:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+async def _send(conn: Connection, endpoint: str, request: tuple, started: float, recorder: Recorder) -> None:
+    try:
+        status = await conn.request(*request)
+        ok = status < 400
+    except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+        conn.close()
+        ok = False
+    recorder.record(endpoint, started, ok)
+
+
+async def run_closed_loop(args, host, port, endpoints, weights, sampler, recorder, deadline) -> None:
+    """Each virtual user owns a connection and sends back-to-back."""
+
+    async def user(rng: random.Random) -> None:
+        conn = Connection(host, port)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            request = build_request(endpoint, sampler, args.batch_size)
+            await _send(conn, endpoint, request, time.perf_counter(), recorder)
+        conn.close()
+
+    await asyncio.gather(*(user(random.Random(args.seed + i)) for i in range(args.connections)))
+
+
+async def run_open_loop(args, host, port, endpoints, weights, sampler, recorder, deadline) -> None:
+    """Poisson arrivals at --rate, served by a fixed pool of connections."""
+    pool: asyncio.Queue = asyncio.Queue()
+    for _ in range(args.connections):
+        pool.put_nowait(Connection(host, port))
+    rng = random.Random(args.seed)
+    tasks = set()
+
+    async def fire(endpoint: str, request: tuple, scheduled: float) -> None:
+        conn = await pool.get()
+        try:
+            await _send(conn, endpoint, request, scheduled, recorder)
+        finally:
+            pool.put_nowait(conn)
+
+    next_send = time.perf_counter()
+    while next_send < deadline:
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = rng.choices(endpoints, weights)[0]
+        task = asyncio.create_task(fire(endpoint, build_request(endpoint, sampler, args.batch_size), next_send))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        next_send += rng.expovariate(args.rate)
+
+    await asyncio.gather(*tasks)
+    while not pool.empty():
+        pool.get_nowait().close()
+
+
+# =============================================================================
+# Reporting
+# =============================================================================
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a sorted list: the ceil(pct/100 * n)-th value."""
+    if not ordered:
+        return 0.0
+    # Rounding first keeps float noise (99.9 / 100 * 1000 = 999.0000000000001)
+    # from pushing ceil() up a whole rank
+    rank = max(0, min(len(ordered) - 1, math.ceil(round(pct * len(ordered) / 100, 9)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: list[float], errors: int, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / seconds, 1) if seconds else 0.0,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "p999_ms": ms(percentile(ordered, 99.9)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+def build_report(args, recorder: Recorder, seconds: float) -> dict:
+    """
+    Assemble the JSON report.
+
+    Args:
+        args: Parsed command line (echoed under "config")
+        recorder: Latencies and errors from the measured window
+        seconds: Measured wall time of that window, used for throughput
+    """
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    endpoints = sorted(set(recorder.latencies) | set(recorder.errors))
+    return {
+        "config": {
+            "url": args.url, "mode": args.mode, "connections": args.connections,
+            "rate": args.rate if args.mode == "open" else None,
+            "duration_s": args.duration, "warmup_s": args.warmup, "elapsed_s": round(seconds, 3),
+            "mix": args.mix, "batch_size": args.batch_size,
+        },
+        "overall": summarize(all_latencies, sum(recorder.errors.values()), seconds),
+        "endpoints": {
+            name: summarize(recorder.latencies.get(name, []), recorder.errors.get(name, 0), seconds)
+            for name in endpoints
+        },
+    }
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Relative change (%) of every overall metric vs a baseline report."""
+    deltas = {}
+    for key, value in report["overall"].items():
+        base = baseline.get("overall", {}).get(key)
+        if isinstance(value, (int, float)) and base:
+            deltas[key] = round((value - base) / base * 100, 1)
+    return deltas
+
+
+# =============================================================================
+# Local Server
+# =============================================================================
+
+def spawn_server(port: int, workers: int | None) -> subprocess.Popen:
+    """Start the app from this directory and wait for /ready."""
+    app_dir = Path(__file__).parent
+    if workers:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+        env = {**os.environ, "PORT": str(port), "GEOFENCE_WORKERS": str(workers)}
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"]
+        env = dict(os.environ)
+    proc = subprocess.Popen(cmd, cwd=app_dir, env=env)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as resp:
+                if resp.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not become ready within 30s")
+
+
+# =============================================================================
+# Main Execution
+# =============================================================================
+
+def parse_mix(mix: str) -> tuple[list[str], list[float]]:
+    pairs = [part.split("=") for part in mix.split(",") if part]
+    return [name for name, _ in pairs], [float(share) for _, share in pairs]
+
+
+async def run(args) -> dict:
+    parsed = urllib.parse.urlsplit(args.url)
+    host, port = parsed.hostname, parsed.port or 80
+    endpoints, weights = parse_mix(args.mix)
+
+    enum_weights = ENUM_WEIGHTS
+    if args.weights:
+        enum_weights = json.loads(Path(args.weights).read_text(encoding="utf-8"))
+    sampler = InputSampler(enum_weights, args.seed)
+
+    start = time.perf_counter()
+    recorder = Recorder(measure_from=start + args.warmup)
+    deadline = start + args.warmup + args.duration
+    runner = run_open_loop if args.mode == "open" else run_closed_loop
+    await runner(args, host, port, endpoints, weights, sampler, recorder, deadline)
+    # In-flight requests finish after the deadline, so the measured window
+    # runs until the last one returns, not just for --duration
+    return build_report(args, recorder, time.perf_counter() - recorder.measure_from)
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Load test the geofence service")
+    parser.add_argument("--url", default="http://127.0.0.1:8501")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--connections", type=int, default=32, help="Pool size / virtual users")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Open-loop arrivals per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=share,...")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--weights", help="JSON file overriding ENUM_WEIGHTS")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spawn", action="store_true", help="Start a local server first")
+    parser.add_argument("--workers", type=int, help="With --spawn: use gunicorn with N workers")
+    parser.add_argument("--baseline", help="Previous report JSON to compare against")
+    parser.add_argument("--out", help="Write the report JSON here")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        port = urllib.parse.urlsplit(args.url).port or 8501
+        server = spawn_server(port, args.workers)
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.baseline:
+        report["vs_baseline_pct"] = compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n", encoding="utf-8")
+    print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
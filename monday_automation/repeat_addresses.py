@@ -0,0 +1,400 @@
+"""
+Repeat Problem Address Detection
+================================
+
+Finds addresses that show up in the weekly address issue pulls week after
+week, so they can be fixed once instead of re-reported.
+
+Works over the CSV files written by address_issues_to_excel.py:
+    1. Normalize CUST_RQ_ADDR_LINE_1_TXT / LINE_2 / CITY / POSTAL_CD
+    2. Collapse exact duplicates while streaming (memory ~ distinct addresses)
+    3. Block by ZIP, then index each address by (house number, trigram)
+    4. Fuzzy-match only candidates that share grams inside a block
+    5. Union matches into clusters with weekly counts
+
+A year of history is millions of rows but only a few hundred thousand
+distinct addresses, and each block is tiny, so this runs in minutes
+instead of the days a full pairwise comparison would take.
+
+Usage:
+    python repeat_addresses.py                      # all CSVs in output/
+    python repeat_addresses.py a.csv b.csv --min-weeks 3 --out repeats.csv
+    python repeat_addresses.py --zip-density zip_density.csv   # ZIP,population_per_km2
+
+Author: Code Puppy 🐶
+"""
+
+import argparse
+import csv
+import math
+import re
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+# Add parent directory to import geofence_model
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from geofence_model import (
+    DENSITY_CATEGORIES,
+    get_density_from_zip,
+    get_geofence_radius,
+    normalize_address,
+    normalize_input,
+)
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+OUTPUT_DIR = Path(__file__).parent / "output"
+
+# Trigram Jaccard similarity needed to call two addresses the same place
+DEFAULT_SIMILARITY = 0.75
+
+# Grams shared by more than this share of a block carry no signal
+MAX_GRAM_SHARE = 0.2
+
+# Round suggested overrides up to this many meters
+OVERRIDE_STEP_M = 5
+
+
+# =============================================================================
+# Normalization
+# =============================================================================
+
+def normalize_zip(postal_code: str) -> str:
+    """Return the 5-digit ZIP from a ZIP or ZIP+4 string ('' if missing)."""
+    digits = re.sub(r"\D", "", postal_code or "")
+    return digits[:5].zfill(5) if digits else ""
+
+
+def house_number(address: str) -> str:
+    """First numeric token of a normalized address ('' if none)."""
+    for token in address.split():
+        if token.isdigit():
+            return token
+    return ""
+
+
+def trigrams(address: str) -> set[str]:
+    """Character trigrams of a normalized address (padded at the ends)."""
+    padded = f"  {address} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# =============================================================================
+# Streaming Aggregation
+# =============================================================================
+
+class AddressStats:
+    """Everything we keep per distinct (ZIP, normalized address)."""
+
+    __slots__ = ("zip_code", "address", "weeks", "customers", "sources", "densities", "distances")
+
+    def __init__(self, zip_code: str, address: str):
+        self.zip_code = zip_code
+        self.address = address
+        self.weeks: Counter = Counter()
+        self.customers: set[str] = set()
+        self.sources: Counter = Counter()
+        self.densities: Counter = Counter()
+        self.distances: list[float] = []
+
+
+def iter_rows(paths: Iterable[Path]) -> Iterator[dict]:
+    """Stream rows from the weekly address issue CSVs."""
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def aggregate_rows(rows: Iterable[dict]) -> list[AddressStats]:
+    """
+    Collapse rows into one AddressStats per distinct normalized address.
+
+    Args:
+        rows: Dicts with the address issue query columns
+
+    Returns:
+        list[AddressStats]: One entry per (ZIP, normalized address)
+    """
+    stats: dict[tuple[str, str], AddressStats] = {}
+    for row in rows:
+        address = normalize_address(
+            row.get("CUST_RQ_ADDR_LINE_1_TXT", ""),
+            row.get("CUST_RQ_ADDR_LINE_2_TXT", ""),
+            row.get("CUST_RQ_CITY_NM", ""),
+        )
+        if not address:
+            continue
+        zip_code = normalize_zip(row.get("CUST_RQ_POSTAL_CD", ""))
+        key = (zip_code, address)
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = AddressStats(zip_code, address)
+
+        entry.weeks[row.get("WM_WK", "")] += 1
+        if row.get("cust_id"):
+            entry.customers.add(row["cust_id"])
+        if row.get("RECOMMENDEDLATLONGSOURCE"):
+            entry.sources[row["RECOMMENDEDLATLONGSOURCE"]] += 1
+        if row.get("density_category"):
+            entry.densities[normalize_input(row["density_category"], DENSITY_CATEGORIES, "SUBURBAN")] += 1
+        try:
+            entry.distances.append(float(row["Avg_dlvr_cust_dist"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return list(stats.values())
+
+
+# =============================================================================
+# Blocking + Fuzzy Matching
+# =============================================================================
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _match_block(
+    members: list[int],
+    entries: list[AddressStats],
+    uf: _UnionFind,
+    similarity: float,
+) -> None:
+    """Fuzzy-match the addresses of one ZIP block via an inverted gram index."""
+    grams = {i: trigrams(entries[i].address) for i in members}
+    index: dict[tuple[str, str], list[int]] = defaultdict(list)
+    for i in members:
+        number = house_number(entries[i].address)
+        for gram in grams[i]:
+            index[(number, gram)].append(i)
+
+    max_postings = max(8, int(len(members) * MAX_GRAM_SHARE))
+    for i in members:
+        number = house_number(entries[i].address)
+        shared: Counter = Counter()
+        for gram in grams[i]:
+            postings = index[(number, gram)]
+            if len(postings) > max_postings:
+                continue
+            for j in postings:
+                if j > i:
+                    shared[j] += 1
+        for j in shared:
+            overlap = len(grams[i] & grams[j])
+            jaccard = overlap / (len(grams[i]) + len(grams[j]) - overlap)
+            if jaccard >= similarity:
+                uf.union(i, j)
+
+
+def cluster_addresses(
+    entries: list[AddressStats],
+    similarity: float = DEFAULT_SIMILARITY,
+) -> list[list[int]]:
+    """
+    Group distinct addresses into clusters of the same physical place.
+
+    Two addresses join a cluster when they are in the same ZIP and
+    fuzzy-match (same house number, trigram Jaccard >= similarity). Sharing
+    a customer is not enough: one customer can order to several addresses.
+
+    Returns:
+        list[list[int]]: Indices into entries, one list per cluster
+    """
+    uf = _UnionFind(len(entries))
+    blocks: dict[str, list[int]] = defaultdict(list)
+    for i, entry in enumerate(entries):
+        blocks[entry.zip_code].append(i)
+
+    for members in blocks.values():
+        if len(members) > 1:
+            _match_block(members, entries, uf, similarity)
+
+    clusters: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(entries)):
+        clusters[uf.find(i)].append(i)
+    return list(clusters.values())
+
+
+# =============================================================================
+# Cluster Report
+# =============================================================================
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(pct * len(ordered))) - 1)]
+
+
+def cluster_density(
+    densities: Counter,
+    zip_code: str,
+    zip_density_map: Optional[dict[str, float]] = None,
+) -> str:
+    """
+    Density category for a cluster: the most common density reported on its
+    rows, else its ZIP's population density, else SUBURBAN.
+    """
+    if densities:
+        return densities.most_common(1)[0][0]
+    if zip_density_map and zip_code:
+        return get_density_from_zip(zip_code, zip_density_map)
+    return "SUBURBAN"
+
+
+def summarize_cluster(
+    members: list[AddressStats],
+    property_type: str = "HOUSE",
+    zip_density_map: Optional[dict[str, float]] = None,
+) -> dict:
+    """
+    Build the report row for one cluster.
+
+    The suggested override is the cluster's P95 delivery-to-customer distance
+    rounded up to OVERRIDE_STEP_M, and only when it exceeds the model radius
+    for the cluster's own density.
+    """
+    weeks: Counter = Counter()
+    sources: Counter = Counter()
+    densities: Counter = Counter()
+    customers: set[str] = set()
+    distances: list[float] = []
+    for entry in members:
+        weeks.update(entry.weeks)
+        sources.update(entry.sources)
+        densities.update(entry.densities)
+        customers |= entry.customers
+        distances.extend(entry.distances)
+
+    canonical = max(members, key=lambda e: sum(e.weeks.values()))
+    source = sources.most_common(1)[0][0] if sources else "AMS"
+    density = cluster_density(densities, canonical.zip_code, zip_density_map)
+    model_radius = get_geofence_radius(property_type, source, density)
+
+    suggested = None
+    p95 = None
+    if distances:
+        p95 = _percentile(distances, 0.95)
+        rounded = int(math.ceil(p95 / OVERRIDE_STEP_M) * OVERRIDE_STEP_M)
+        if rounded > model_radius:
+            suggested = rounded
+
+    return {
+        "zip_code": canonical.zip_code,
+        "address": canonical.address,
+        "variants": len(members),
+        "issues": sum(weeks.values()),
+        "weeks": len(weeks),
+        "weekly_counts": dict(sorted(weeks.items())),
+        "customers": len(customers),
+        "address_source": source,
+        "density_category": density,
+        "p95_dist_m": round(p95, 1) if p95 is not None else None,
+        "model_radius_m": model_radius,
+        "suggested_radius_m": suggested,
+    }
+
+
+def find_repeat_addresses(
+    rows: Iterable[dict],
+    min_weeks: int = 2,
+    similarity: float = DEFAULT_SIMILARITY,
+    zip_density_map: Optional[dict[str, float]] = None,
+) -> list[dict]:
+    """
+    Detect problem addresses that repeat across weeks.
+
+    Args:
+        rows: Address issue rows (any number of weeks)
+        min_weeks: Only report clusters seen in at least this many weeks
+        similarity: Trigram Jaccard threshold for fuzzy matches
+        zip_density_map: Optional ZIP -> population per km² for clusters
+                         whose rows carry no density_category
+
+    Returns:
+        list[dict]: Cluster rows, most weeks / most issues first
+    """
+    entries = aggregate_rows(rows)
+    report = []
+    for cluster in cluster_addresses(entries, similarity):
+        row = summarize_cluster([entries[i] for i in cluster], zip_density_map=zip_density_map)
+        if row["weeks"] >= min_weeks:
+            report.append(row)
+    report.sort(key=lambda r: (-r["weeks"], -r["issues"]))
+    return report
+
+
+def load_zip_density(path: Path) -> dict[str, float]:
+    """Read a ZIP,population_per_km2 CSV (header row optional)."""
+    density: dict[str, float] = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                density[normalize_zip(row[0])] = float(row[1])
+            except ValueError:
+                continue  # header
+    return density
+
+
+def write_report(report: list[dict], path: Path) -> None:
+    """Write the cluster report as CSV (weekly counts as WK:N pairs)."""
+    fields = list(report[0].keys()) if report else ["zip_code", "address"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in report:
+            weekly = " ".join(f"{wk}:{n}" for wk, n in row["weekly_counts"].items())
+            writer.writerow({**row, "weekly_counts": weekly})
+
+
+# =============================================================================
+# Main Execution
+# =============================================================================
+
+def main(argv: list[str] | None = None) -> list[dict]:
+    """Run repeat detection over weekly CSVs and write the cluster report."""
+    parser = argparse.ArgumentParser(description="Find repeat problem addresses across weeks")
+    parser.add_argument("files", nargs="*", type=Path, help="Weekly CSVs (default: output/*.csv)")
+    parser.add_argument("--min-weeks", type=int, default=2)
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY)
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR / "repeat_addresses.csv")
+    parser.add_argument("--zip-density", type=Path, help="CSV of ZIP,population_per_km2")
+    args = parser.parse_args(argv)
+
+    files = args.files or sorted(
+        p for p in OUTPUT_DIR.glob("address_issues_*.csv")
+    )
+    if not files:
+        print("⚠️ No address issue CSVs found")
+        return []
+
+    print(f"🔁 Scanning {len(files)} weekly file(s) for repeat addresses...")
+    zip_density_map = load_zip_density(args.zip_density) if args.zip_density else None
+    report = find_repeat_addresses(iter_rows(files), args.min_weeks, args.similarity, zip_density_map)
+    args.out.parent.mkdir(exist_ok=True)
+    write_report(report, args.out)
+
+    overrides = sum(1 for r in report if r["suggested_radius_m"])
+    print(f"✅ {len(report)} repeat clusters ({overrides} with a suggested radius override)")
+    print(f"📁 Saved to: {args.out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
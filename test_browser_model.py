@@ -0,0 +1,66 @@
+"""Browser model parity: generated JS must agree with Python on every combination"""
+import itertools
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from browser_model import OUTPUT_PATH, render_browser_model
+from geofence_model import (
+    ADDRESS_SOURCES, DENSITY_CATEGORIES, PERCENTILES, PROPERTY_TYPES, RADIUS_TABLE, TABLE_SHAPE,
+    get_arrival_radius, get_geofence_radius, lookup_radii, table_index,
+)
+
+# Every valid combination plus inputs that exercise normalization/fallbacks
+CASES = list(itertools.product(
+    PROPERTY_TYPES + ["apartment", " dorm ", "CASTLE"],
+    ADDRESS_SOURCES + ["google", "MANUAL_ADJ", "MELISSA"],
+    DENSITY_CATEGORIES + ["rural", "MOON"],
+    PERCENTILES + ["p99", "P50"],
+    [False, True],
+))
+
+NODE_RUNNER = """
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+eval(input.js + ';globalThis.M = {getGeofenceRadius, getArrivalRadius};');
+const cases = input.cases;
+console.log(JSON.stringify(cases.map(c => [M.getGeofenceRadius(...c), M.getArrivalRadius(...c)])));
+"""
+
+
+def test_checked_in_js_is_current():
+    assert OUTPUT_PATH.read_text(encoding="utf-8") == render_browser_model(), \
+        "docs/geofence-model.js is stale - run: python browser_model.py"
+
+
+def test_table_index_follows_table_shape():
+    # Row-major over TABLE_SHAPE, in the same order compile_radius_table fills
+    codes = itertools.product(*(range(size) for size in TABLE_SHAPE))
+    assert [table_index(*c) for c in codes] == list(range(len(RADIUS_TABLE)))
+    for case in CASES:
+        assert lookup_radii(*case) == (get_geofence_radius(*case), get_arrival_radius(*case))
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_js_matches_python_for_every_combination():
+    result = subprocess.run(
+        ["node", "-e", NODE_RUNNER],
+        input=json.dumps({"js": render_browser_model(), "cases": CASES}),
+        capture_output=True, text=True, check=True,
+    )
+    js_results = json.loads(result.stdout)
+
+    mismatches = []
+    for case, (js_delivery, js_arrival) in zip(CASES, js_results):
+        expected = (get_geofence_radius(*case), get_arrival_radius(*case))
+        if (js_delivery, js_arrival) != expected:
+            mismatches.append((case, (js_delivery, js_arrival), expected))
+
+    assert not mismatches, f"{len(mismatches)} mismatches, first: {mismatches[:3]}"
+
+
+if __name__ == "__main__":
+    test_checked_in_js_is_current()
+    test_js_matches_python_for_every_combination()
+    print(f"Tested {len(CASES)} combinations - browser model matches Python.")
@@ -0,0 +1,85 @@
+"""Cluster fences: overlap grouping and cluster-first ping containment"""
+import numpy as np
+
+from geofence_clusters import ClusterFences, synthetic_stops
+from geofence_model import get_arrival_radius
+
+
+def brute_force(fences, p_lat, p_lon):
+    """Nearest containing stop per ping, checking every stop."""
+    px, py = fences._proj.to_xy(p_lat, p_lon)
+    d2 = (px[:, None] - fences._x[None, :]) ** 2 + (py[:, None] - fences._y[None, :]) ** 2
+    d2 = np.where(d2 <= fences.radius[None, :] ** 2, d2, np.inf)
+    nearest = d2.argmin(axis=1)
+    return np.where(np.isinf(d2.min(axis=1)), -1, nearest)
+
+
+def test_overlapping_stops_share_a_cluster():
+    lat, lon, radius = synthetic_stops(1500, seed=3)
+    fences = ClusterFences(lat, lon, radius)
+    x, y = fences._x, fences._y
+    d2 = (x[:, None] - x[None, :]) ** 2 + (y[:, None] - y[None, :]) ** 2
+    overlap = d2 < (radius[:, None] + radius[None, :]) ** 2
+    i, j = np.nonzero(overlap)
+    assert (fences.labels[i] == fences.labels[j]).all()
+
+    # Every member circle lies inside its cluster fence
+    c = fences.labels
+    reach = np.hypot(x - fences._cx[c], y - fences._cy[c]) + radius
+    assert (reach <= fences.cluster_radius[c] + 1e-6).all()
+    # Clusters are exactly the connected components: no cluster splits into
+    # two groups without an overlapping pair between them
+    for cluster in range(fences.n_clusters):
+        members = fences.cluster_members(cluster)
+        seen, frontier = {members[0]}, [members[0]]
+        while frontier:
+            k = frontier.pop()
+            for other in np.flatnonzero(overlap[k]):
+                if other not in seen:
+                    seen.add(other)
+                    frontier.append(other)
+        assert seen == set(members.tolist())
+
+
+def test_separate_stops_stay_separate():
+    fences = ClusterFences([40.0, 40.0, 40.01], [-75.0, -75.0005, -75.0], [30, 30, 30])
+    assert fences.labels[0] == fences.labels[1] != fences.labels[2]
+    assert fences.n_clusters == 2
+    apart = ClusterFences([40.0, 40.0], [-75.0, -75.0005], [30, 30], min_overlap_m=30)
+    assert apart.n_clusters == 2
+
+
+def test_ping_containment_matches_brute_force():
+    lat, lon, radius = synthetic_stops(2000, seed=5)
+    fences = ClusterFences(lat, lon, radius)
+    rng = np.random.default_rng(9)
+    pick = rng.integers(0, len(lat), 5000)
+    p_lat = lat[pick] + rng.normal(0, 4e-4, 5000)
+    p_lon = lon[pick] + rng.normal(0, 5e-4, 5000)
+
+    stop, cluster, checks = fences.locate_many(p_lat, p_lon, return_checks=True)
+    expected = brute_force(fences, p_lat, p_lon)
+    assert (stop == expected).all()
+    assert (cluster[stop >= 0] == fences.labels[stop[stop >= 0]]).all()
+    assert (cluster[stop < 0] == -1).all()
+    assert checks < 0.05 * len(p_lat) * len(lat)
+
+    for i in range(0, 5000, 50):
+        hits = fences.locate(p_lat[i], p_lon[i])
+        assert (hits[0] if hits else -1) == expected[i]
+        assert fences.cluster_at(p_lat[i], p_lon[i]) >= 0 or not hits
+
+
+def test_from_stops_uses_model_radii():
+    stops = [
+        {"lat": 40.7500, "lon": -73.9900, "property_type": "APARTMENT", "address_source": "AMS",
+         "density_category": "URBAN_HIGH", "access_required": True},
+        {"lat": 40.7502, "lon": -73.9901, "property_type": "BUSINESS", "address_source": "GOOGLE",
+         "density_category": "URBAN_HIGH"},
+        {"lat": 40.7600, "lon": -73.9900, "property_type": "HOUSE", "address_source": "AMS",
+         "density_category": "URBAN_HIGH"},
+    ]
+    fences = ClusterFences.from_stops(stops, kind="arrival")
+    assert fences.radius[0] == get_arrival_radius("APARTMENT", "AMS", "URBAN_HIGH", access_required=True)
+    assert fences.n_clusters == 2
+    assert fences.to_json()["clusters"][fences.labels[0]]["members"] == [0, 1]
@@ -0,0 +1,113 @@
+"""Aggregate cube: sketch accuracy, roll-ups, incremental ingest, storage"""
+import csv
+import random
+
+import numpy as np
+import pytest
+
+from geofence_cube import RELATIVE_ACCURACY, AggregateCube, main, render_report
+
+
+def write_records(path, n=4000, seed=11):
+    rng = random.Random(seed)
+    distances = []
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["DELIVERY_DATE", "DENSITY_CATEGORY", "PROPERTY_TYPE", "ADDRESS_SOURCE",
+                         "ACCESS_REQUIRED", "DLVRD_DISTANCE", "ARRVL_DIST_METER"])
+        for i in range(n):
+            distance = round(rng.lognormvariate(3.3, 0.8), 1)
+            distances.append(distance)
+            writer.writerow([
+                f"2026-09-{1 + i % 28:02d}",
+                rng.choice(["URBAN_HIGH", "RURAL"]), rng.choice(["HOUSE", "DORM"]),
+                rng.choice(["AMS", "MELISSA"]), rng.choice(["YES", "NO"]),
+                distance, "" if i % 4 == 0 else round(distance * 1.5, 1),
+            ])
+    return np.array(distances)
+
+
+def test_quantiles_within_relative_accuracy(tmp_path):
+    path = str(tmp_path / "records.csv")
+    distances = write_records(path)
+    cube = AggregateCube()
+    assert cube.ingest(path) == 4000
+
+    (overall,) = cube.rollup()
+    assert overall["delivery_count"] == 4000
+    assert overall["arrival_count"] == 3000
+    for q in (50, 90, 95, 99):
+        exact = np.quantile(distances, q / 100, method="inverted_cdf")
+        assert abs(overall[f"delivery_p{q}_m"] - exact) <= RELATIVE_ACCURACY * exact + 0.1
+
+
+def test_rollups_are_consistent_and_survive_storage(tmp_path):
+    records = str(tmp_path / "records.csv")
+    write_records(records)
+    cube_path = str(tmp_path / "cube.npz")
+    cube = AggregateCube.load(cube_path)
+    cube.ingest(records)
+    cube.save(cube_path)
+
+    reloaded = AggregateCube.load(cube_path)
+    assert reloaded.ingest(records) == 0                 # already ingested
+    by_week = reloaded.rollup(by=("week",))
+    assert [row["week"] for row in by_week] == [202636, 202637, 202638, 202639, 202640]
+    assert sum(row["delivery_count"] for row in by_week) == 4000
+    assert reloaded.rollup(by=("property_type",)) == cube.rollup(by=("property_type",))
+
+    rural = reloaded.rollup(by=("address_source",), where={"density_category": "RURAL"})
+    assert {row["address_source"] for row in rural} == {"AMS", "MELISSA"}
+    assert sum(row["delivery_count"] for row in rural) < 4000
+
+    page = render_report(reloaded)
+    assert 'id="trendChart"' in page and "2026-W36" in page
+
+
+def test_appended_rows_are_added_once_and_bad_rows_skipped(tmp_path):
+    records = tmp_path / "records.csv"
+    write_records(str(records), n=1000)
+    cube_path = str(tmp_path / "cube.npz")
+    main(["--cube", cube_path, "ingest", str(records)])
+
+    with open(records, "a", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["2026-10-05", "RURAL", "HOUSE", "AMS", "NO", 12.5, 20.0])
+        writer.writerow(["", "RURAL", "HOUSE", "AMS", "NO", 12.5, 20.0])          # no date
+        writer.writerow(["2026-10-05", "RURAL", "HOUSE", "AMS", "NO", "n/a", ""])  # bad distance
+        writer.writerow(["2026-10-05", "RURAL"])                                   # truncated
+        writer.writerow(["2026-10-06", "RURAL", "CASTLE", "AMS", "NO", 30])        # short arrival: ok
+        f.write("2026-10-07,RURAL,HOUSE,AMS,NO,4")                                 # still being written
+
+    cube = AggregateCube.load(cube_path)
+    assert cube.ingest(str(records)) == 2
+    assert cube.skipped_rows == 3
+    assert cube.ingest(str(records)) == 0
+    (overall,) = cube.rollup()
+    assert overall["delivery_count"] == 1002 and overall["arrival_count"] == 751
+
+    with open(records, "a") as f:
+        f.write("1.5,\n")
+    assert cube.ingest(str(records)) == 1
+    cube.save(cube_path)
+    (entry,) = AggregateCube.load(cube_path).sources.values()
+    assert (entry["rows"], entry["skipped"]) == (1003, 3)
+
+    # A rebuild counts every row once, however often the file was ingested
+    main(["--cube", cube_path, "ingest", str(records), "--force"])
+    rebuilt = AggregateCube.load(cube_path)
+    assert rebuilt.rollup() == AggregateCube.rebuild([str(records)]).rollup()
+    assert rebuilt.rollup()[0]["delivery_count"] == 1003
+
+
+def test_rewritten_file_is_refused(tmp_path):
+    records = str(tmp_path / "records.csv")
+    write_records(records, n=200)
+    cube = AggregateCube()
+    cube.ingest(records)
+    write_records(records, n=300, seed=5)
+    with pytest.raises(ValueError, match="rewritten"):
+        cube.ingest(records)
+    write_records(records, n=100)
+    with pytest.raises(ValueError, match="rewritten"):
+        cube.ingest(records)
@@ -0,0 +1,93 @@
+"""Density resolution cache: bounds, TTL, counters, snapshots, batch integration"""
+from geofence_cache import DensityResolutionCache, cache_key
+from geofence_model import process_deliveries
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = DensityResolutionCache(max_entries=2, ttl_seconds=60, clock=clock)
+    cache.put("a", "RURAL")
+    cache.put("b", "SUBURBAN")
+    assert cache.get("a") == "RURAL"          # a is now most recent
+    cache.put("c", "URBAN_HIGH")              # evicts b
+    assert cache.get("b") is None
+    clock.now += 61
+    assert cache.get("a") is None             # expired
+    assert cache.stats() == {
+        "entries": 1, "hits": 1, "misses": 2, "hit_rate": 0.3333,
+        "evictions": 1, "expirations": 1,
+    }
+
+
+def test_snapshot_round_trip(tmp_path):
+    clock = FakeClock()
+    cache = DensityResolutionCache(ttl_seconds=60, clock=clock)
+    cache.put("old", "RURAL")
+    clock.now += 50
+    cache.put("new", "SUBURBAN")
+    path = str(tmp_path / "cache.json")
+    cache.save(path)
+
+    clock.now += 20                            # "old" is past its TTL now
+    warm = DensityResolutionCache.load(path, ttl_seconds=60, clock=clock)
+    assert len(warm) == 1 and warm.get("new") == "SUBURBAN"
+
+
+def test_resolver_runs_once_per_distinct_key():
+    calls = []
+
+    def resolve(delivery):
+        calls.append(delivery["address"])
+        return "URBAN_HIGH"
+
+    stops = [
+        {"property_type": "APARTMENT", "address": "1 Main St.", "customer_id": ""},
+        {"property_type": "APARTMENT", "address": "1 MAIN ST", "customer_id": None},
+        {"property_type": "HOUSE", "address": "9 Oak Ave", "customer_id": "C1"},
+        {"property_type": "HOUSE", "address": "9 Oak Avenue", "customer_id": "C1"},
+    ]
+    cache = DensityResolutionCache()
+    results = process_deliveries(stops, resolve_density=resolve, density_cache=cache)
+    assert len(calls) == 2
+    assert results[0]["recommended_radius_m"] == 45
+
+
+def test_key_is_normalized_address_then_customer():
+    assert cache_key("1 Main Street", "C1") == cache_key(" 1  main st. ", "C2") == "ADDR:1 MAIN ST"
+    assert cache_key("12 Oak Ave #4", zip_code="72712-1234") == "ADDR:12 OAK AVE APT 4|72712"
+    assert cache_key("", "C1") == cache_key(None, "C1") == "CUST:C1"
+    assert cache_key(" ,. ", "") is None
+
+
+def test_failed_resolution_is_cached_with_shorter_ttl(tmp_path):
+    clock = FakeClock()
+    cache = DensityResolutionCache(ttl_seconds=600, negative_ttl_seconds=60, clock=clock)
+    calls = []
+
+    def geocode():
+        calls.append(clock.now)
+        return None
+
+    assert cache.resolve("ADDR:NOWHERE", geocode) is None
+    assert cache.resolve("ADDR:NOWHERE", geocode) is None
+    assert len(calls) == 1
+    cache.put("ADDR:SOMEWHERE", "RURAL")
+
+    path = str(tmp_path / "cache.json")
+    cache.save(path)
+    warm = DensityResolutionCache.load(path, ttl_seconds=600, negative_ttl_seconds=60, clock=clock)
+    assert warm.resolve("ADDR:NOWHERE", geocode) is None and len(calls) == 1
+
+    clock.now += 61
+    assert cache.resolve("ADDR:NOWHERE", geocode) is None
+    assert len(calls) == 2
+    assert cache.get("ADDR:SOMEWHERE") == "RURAL"
+    assert DensityResolutionCache.load(path, ttl_seconds=600, negative_ttl_seconds=60, clock=clock).stats()["entries"] == 1
@@ -0,0 +1,124 @@
+"""GeoJSON map layers: circle templates, bbox filtering, quantization, streaming endpoint"""
+import json
+import math
+
+import geofence_model
+from geofence_model import circle_ring, get_arrival_radius, get_geofence_radius, iter_geojson
+
+STOPS = [
+    {"stop_id": "a", "lat": 40.7500, "lon": -73.9900, "property_type": "APARTMENT", "access_required": True,
+     "density_category": "URBAN_HIGH"},
+    {"stop_id": 7, "lat": 40.7600, "lon": -73.9800, "property_type": "BUSINESS", "address_source": "GOOGLE"},
+    {"stop_id": None, "lat": -33.8688, "lon": 151.2093, "density_category": "RURAL"},
+    {"lat": 0.0004, "lon": -0.0003, "arrival_radius_m": 80, "delivery_radius_m": 60},
+]
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6_371_000.0 * math.asin(math.sqrt(a))
+
+
+def collection(**kwargs):
+    return json.loads("".join(iter_geojson(STOPS, **kwargs)))
+
+
+def test_fences_are_closed_circles_of_model_radius():
+    features = collection(segments=24)["features"]
+    assert len(features) == 2 * len(STOPS)
+    first = features[0]
+    assert first["properties"] == {
+        "stop_id": "a", "fence": "arrival",
+        "radius_m": get_arrival_radius("APARTMENT", "AMS", "URBAN_HIGH", access_required=True),
+    }
+    assert features[1]["properties"]["radius_m"] == get_geofence_radius(
+        "APARTMENT", "AMS", "URBAN_HIGH", access_required=True
+    )
+    assert features[-1]["properties"]["radius_m"] == 60
+    for feature, stop in zip(features, [s for s in STOPS for _ in range(2)]):
+        ring = feature["geometry"]["coordinates"][0]
+        assert len(ring) == 25 and ring[0] == ring[-1]
+        for lon, lat in ring:
+            distance = haversine_m(stop["lat"], stop["lon"], lat, lon)
+            assert abs(distance - feature["properties"]["radius_m"]) < 0.01 * feature["properties"]["radius_m"]
+    ring = collection()["features"][0]["geometry"]["coordinates"][0]
+    assert [list(p) for p in circle_ring(40.75, -73.99, first["properties"]["radius_m"])] == ring
+
+
+def test_quantization_vectorized_and_pure_python_agree(monkeypatch):
+    exact = collection()["features"]
+    quantized = collection(precision=5, chunk_stops=3)["features"]
+    for a, b in zip(exact, quantized):
+        assert a["properties"] == b["properties"]
+        for (lon_a, lat_a), (lon_b, lat_b) in zip(a["geometry"]["coordinates"][0], b["geometry"]["coordinates"][0]):
+            assert abs(lon_a - lon_b) <= 5e-6 and abs(lat_a - lat_b) <= 5e-6
+            assert round(lon_b, 5) == lon_b and round(lat_b, 5) == lat_b
+
+    monkeypatch.setattr(geofence_model, "np", None)
+    assert collection(precision=5)["features"] == quantized
+    assert collection(precision=0)["features"][4]["geometry"]["coordinates"][0][0] == [151, -34]
+
+
+def test_bbox_keeps_only_fences_reaching_into_it():
+    around_a = collection(bbox=(-73.995, 40.745, -73.985, 40.755))["features"]
+    assert {f["properties"]["stop_id"] for f in around_a} == {"a"}
+    # A box just outside the stop still catches its fence
+    edge = collection(bbox=(-73.9895, 40.7495, -73.98, 40.7505))["features"]
+    assert {f["properties"]["stop_id"] for f in edge} == {"a"}
+    assert collection(bbox=(10.0, 10.0, 11.0, 11.0)) == {"type": "FeatureCollection", "features": []}
+
+
+def test_streaming_endpoint():
+    from fastapi.testclient import TestClient
+    from geofence_ui.app import app
+
+    client = TestClient(app)
+    stops = [{k: v for k, v in stop.items() if not k.endswith("_radius_m")} for stop in STOPS]
+    response = client.post("/api/geojson", json=stops,
+                           headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/geo+json"
+    assert response.headers["content-encoding"] == "gzip"
+    body = response.json()
+    assert len(body["features"]) == 8
+    assert body["features"][2]["properties"]["stop_id"] == 7
+
+    raw = client.post("/api/geojson", params={"bbox": "151,-34,152,-33"}, json=stops,
+                      headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert [f["properties"]["stop_id"] for f in raw.json()["features"]] == [None, None]
+    assert client.post("/api/geojson", params={"bbox": "1,2,3"}, json=stops).status_code == 422
+
+
+def test_fences_apply_overrides():
+    from fastapi.testclient import TestClient
+    from geofence_ui.app import app
+
+    dorm = geofence_model.PROPERTY_TYPES.index("DORM")
+    campus = (36.0680, -94.1740)
+    overrides = geofence_model.RadiusOverrides([
+        ("GEO", geofence_model.geo_cell(*campus), dorm, 500, 650),
+        ("ZIP", 72701, 7, 90, geofence_model.NO_OVERRIDE),      # delivery only, any property
+    ])
+    stops = [
+        {"lat": campus[0], "lon": campus[1], "property_type": "DORM", "market": None},
+        {"lat": 36.05, "lon": -94.16, "property_type": "HOUSE", "zip_code": "72701", "percentile": "P99"},
+        {"lat": 36.05, "lon": -94.16, "property_type": "APARTMENT", "access_required": True},
+    ]
+    geofence_model.set_radius_overrides(overrides)
+    try:
+        features = json.loads("".join(iter_geojson(stops)))["features"]
+        expected = []
+        for stop in stops:
+            kwargs = dict(zip_code=stop.get("zip_code"), lat=stop["lat"], lon=stop["lon"])
+            args = (stop["property_type"], "AMS", "SUBURBAN", stop.get("percentile", "P95"),
+                    stop.get("access_required", False))
+            expected += [get_arrival_radius(*args, **kwargs), get_geofence_radius(*args, **kwargs)]
+        assert [f["properties"]["radius_m"] for f in features] == expected
+        assert expected[:2] == [650, 500] and expected[3] == int(90 * 1.8)
+
+        body = TestClient(app).post("/api/geojson", json=stops, headers={"Accept-Encoding": "identity"}).json()
+        assert [f["properties"]["radius_m"] for f in body["features"]] == expected
+    finally:
+        geofence_model.set_radius_overrides(None)
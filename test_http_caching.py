@@ -0,0 +1,71 @@
+"""HTTP caching: per-encoding ETags, 304 revalidation, Cache-Control, compression"""
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+
+from geofence_ui.app import MODEL_STATE, PAGE_CACHE_CONTROL, PREDICT_CACHE_CONTROL, app, brotli
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+
+def get(client, path, encoding="identity", **headers):
+    return client.get(path, headers={"Accept-Encoding": encoding, **headers})
+
+
+def test_page_has_one_etag_per_encoding(client):
+    version = MODEL_STATE["version"]
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    etags = set()
+    for encoding in encodings:
+        response = get(client, "/", encoding)
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'"page-{version}-{encoding}"'
+        assert response.headers["cache-control"] == PAGE_CACHE_CONTROL
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers.get("content-encoding") == (None if encoding == "identity" else encoding)
+        etags.add(response.headers["etag"])
+    assert len(etags) == len(encodings)
+
+    # Same page underneath (the client transparently decodes gzip)
+    assert gzip.decompress(MODEL_STATE["page_variants"]["gzip"]) == get(client, "/").content \
+        == get(client, "/", "gzip").content
+
+
+def test_page_revalidation(client):
+    etag = get(client, "/", "gzip").headers["etag"]
+    cached = get(client, "/", "gzip", **{"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag and cached.headers["vary"] == "Accept-Encoding"
+    # Weak comparison (proxies add W/) and lists of tags
+    assert get(client, "/", "gzip", **{"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    # A gzip validator does not revalidate the identity representation
+    assert get(client, "/", "identity", **{"If-None-Match": etag}).status_code == 200
+
+
+def test_prediction_caching(client):
+    params = "?property_type=APARTMENT&address_source=GOOGLE&density_category=RURAL"
+    response = get(client, "/api/predict" + params)
+    etag = response.headers["etag"]
+    assert etag.startswith(f'"{MODEL_STATE["version"]}-')
+    assert response.headers["cache-control"] == PREDICT_CACHE_CONTROL
+    assert get(client, "/api/predict" + params, **{"If-None-Match": etag}).status_code == 304
+    assert get(client, "/predict" + params, **{"If-None-Match": etag}).status_code == 304
+    other = get(client, "/api/predict?property_type=HOUSE", **{"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["etag"] != etag
+
+
+def test_batch_compression_negotiation(client):
+    stops = [{"property_type": "DORM"}] * 200
+    compressed = client.post("/api/batch", json=stops, headers={"Accept-Encoding": "gzip;q=1, br;q=0"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["cache-control"] == "no-store"
+    assert len(compressed.json()["results"]) == 200
+
+    small = client.post("/api/batch", json=stops[:1], headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    plain = client.post("/api/batch", json=stops, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
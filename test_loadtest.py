@@ -0,0 +1,46 @@
+"""Load test reporting: nearest-rank percentiles and report assembly"""
+from argparse import Namespace
+
+import pytest
+
+from geofence_ui.loadtest import Recorder, build_report, compare, percentile
+
+
+@pytest.mark.parametrize("n, pct, expected", [
+    (100, 50, 50), (100, 95, 95), (100, 99, 99), (100, 100, 100),
+    (1000, 99.9, 999), (1000, 95, 950), (10, 25, 3), (1, 99.9, 1),
+])
+def test_nearest_rank_percentile(n, pct, expected):
+    assert percentile([float(v) for v in range(1, n + 1)], pct) == expected
+
+
+def test_percentile_edges():
+    assert percentile([], 99) == 0.0
+    assert percentile([4.0, 7.0], 0) == 4.0
+    # 2.5 and 0.5 round to even; ceil must not
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0], 5) == 1.0
+
+
+def test_report_uses_measured_seconds():
+    recorder = Recorder(measure_from=0.0)
+    recorder.latencies = {"predict": [0.001 * v for v in range(1, 101)], "health": [0.002, 0.004]}
+    recorder.errors = {"batch": 3}
+    args = Namespace(url="http://127.0.0.1:8501", mode="closed", connections=8, rate=0.0,
+                     duration=10.0, warmup=1.0, mix="predict=1", batch_size=50)
+
+    report = build_report(args, recorder, 12.5)
+    assert report["config"]["duration_s"] == 10.0 and report["config"]["elapsed_s"] == 12.5
+    assert report["config"]["rate"] is None
+    overall = report["overall"]
+    assert overall["requests"] == 102 and overall["errors"] == 3
+    assert overall["rps"] == round(102 / 12.5, 1)
+    assert set(report["endpoints"]) == {"batch", "health", "predict"}
+    predict = report["endpoints"]["predict"]
+    assert (predict["p95_ms"], predict["p99_ms"], predict["max_ms"]) == (95.0, 99.0, 100.0)
+    assert predict["rps"] == 8.0
+    assert report["endpoints"]["batch"] == {
+        "requests": 0, "errors": 3, "rps": 0.0, "mean_ms": 0.0, "p50_ms": 0.0,
+        "p95_ms": 0.0, "p99_ms": 0.0, "p999_ms": 0.0, "max_ms": 0.0,
+    }
+    assert compare(report, {"overall": {"requests": 51, "errors": 0}}) == {"requests": 100.0}
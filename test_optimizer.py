@@ -0,0 +1,55 @@
+"""Radius optimizer: global target at minimum area, arrival >= delivery"""
+import numpy as np
+
+import geofence_optimizer as opt
+from geofence_model import load_config, tables_from_config
+
+
+def synthetic_histograms(seed=3):
+    rng = np.random.default_rng(seed)
+    shape = (len(opt.TABLE_CELLS), opt.MAX_RADIUS_M + 2)
+    histograms = {}
+    scales = rng.uniform(10, 120, len(opt.TABLE_CELLS))
+    sizes = rng.integers(0, 3000, len(opt.TABLE_CELLS))
+    for kind, stretch in (("delivery", 1.0), ("arrival", 1.6)):
+        counts = np.zeros(shape, np.int64)
+        for cell, (scale, size) in enumerate(zip(scales, sizes)):
+            distances = rng.exponential(scale * stretch, size)
+            bins = np.clip(np.ceil(distances), 0, opt.MAX_RADIUS_M + 1).astype(int)
+            counts[cell] = np.bincount(bins, minlength=shape[1])
+        histograms[kind] = counts
+    return histograms
+
+
+def test_meets_target_with_less_area_than_per_cell_quantiles():
+    counts = synthetic_histograms()["delivery"]
+    baseline = np.full(len(opt.TABLE_CELLS), 50)
+    radii, stats = opt.optimize_radii(counts, 0.95, baseline, min_records=0)
+    assert stats["capture"] >= 0.95
+
+    # Same-P95-everywhere table: the smallest radius capturing 95% per cell
+    captured = np.cumsum(counts[:, :-1], axis=1)
+    n = counts.sum(axis=1)
+    quantile = np.array([
+        max(opt.MIN_RADIUS_M, int(np.searchsorted(row, 0.95 * total))) for row, total in zip(captured, n)
+    ])
+    per_cell = opt.evaluate(counts, quantile)
+    assert per_cell["capture"] >= 0.95
+    assert stats["area_km2"] < per_cell["area_km2"]
+
+
+def test_config_respects_arrival_invariant(tmp_path):
+    path = str(tmp_path / "histograms.npz")
+    opt.save_histograms(synthetic_histograms(), path)
+    config, report = opt.optimize_tables(opt.load_histograms(path), 0.9, 0.9)
+
+    assert report["delivery"]["optimized"]["capture"] >= 0.9
+    assert report["arrival"]["optimized"]["capture"] >= 0.9
+    delivery, arrival = tables_from_config(config)
+    assert all(arrival[key] >= radius for key, radius in delivery.items() if key in arrival)
+
+    # A complete config: sections the optimizer doesn't touch come from the shipped file
+    shipped = load_config()
+    assert set(shipped) <= set(config)
+    assert config["density_thresholds"] == shipped["density_thresholds"]
+    assert config["metadata"]["generated_by"] == "geofence_optimizer.py"
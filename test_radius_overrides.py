@@ -0,0 +1,90 @@
+"""Radius overrides resolve geo-cell -> ZIP -> density table -> property default"""
+import pytest
+
+import geofence_model as gm
+from geofence_model import (
+    NO_OVERRIDE, RadiusOverrides, geo_cell, get_arrival_radius, get_geofence_radius,
+    set_radius_overrides,
+)
+
+CAMPUS = (36.0680, -94.1740)
+DORM = gm.PROPERTY_TYPES.index("DORM")
+ANY = 7
+
+OVERRIDES = RadiusOverrides([
+    ("ZIP", 72701, DORM, 300, 400),
+    ("ZIP", 72701, ANY, 60, NO_OVERRIDE),          # delivery-only, every property
+    ("GEO", geo_cell(*CAMPUS), DORM, 500, 650),
+])
+
+
+def setup_function():
+    set_radius_overrides(OVERRIDES)
+
+
+def teardown_function():
+    set_radius_overrides(None)
+
+
+def test_resolution_order():
+    base = get_geofence_radius("DORM", "AMS", "SUBURBAN")
+    assert get_geofence_radius("DORM", "AMS", "SUBURBAN", zip_code="72701", lat=CAMPUS[0], lon=CAMPUS[1]) == 500
+    assert get_geofence_radius("DORM", "AMS", "SUBURBAN", zip_code="72701-1234") == 300
+    assert get_geofence_radius("HOUSE", "AMS", "SUBURBAN", zip_code="72701") == 60
+    assert get_geofence_radius("DORM", "AMS", "SUBURBAN", zip_code="90210") == base
+    # Non-finite coordinates skip the geo cell and fall through to ZIP
+    assert get_geofence_radius("DORM", "AMS", "SUBURBAN", zip_code="72701", lat=float("nan"), lon=CAMPUS[1]) == 300
+
+
+def test_partial_override_falls_through_per_kind():
+    # HOUSE has a delivery-only ZIP override: arrival comes from the table
+    expected = max(gm.ARRIVAL_GEOFENCE_LOOKUP[("SUBURBAN", "HOUSE", "AMS")], 60)
+    assert get_arrival_radius("HOUSE", "AMS", "SUBURBAN", zip_code="72701") == expected
+
+
+def test_multipliers_apply_on_top():
+    assert get_geofence_radius("DORM", "AMS", "RURAL", "P99", True, zip_code="72701") == int(300 * 1.10 * 1.8)
+
+
+def test_resolve_many_matches_scalar():
+    props = ["DORM", "DORM", "HOUSE", "APARTMENT", "DORM"]
+    zips = ["72701", "72701", "72701", "10001", "bad"]
+    lats = [CAMPUS[0], 0.0, float("nan"), 40.0, CAMPUS[0]]
+    lons = [CAMPUS[1], 0.0, float("nan"), -73.0, CAMPUS[1]]
+    for kind in (0, 1):
+        expected = [
+            r if r is not None else NO_OVERRIDE
+            for r in (
+                OVERRIDES.resolve(p, z, la, lo, kind)
+                for p, z, la, lo in zip(props, zips, lats, lons)
+            )
+        ]
+        assert OVERRIDES.resolve_many(props, zips, lats, lons, kind) == expected
+
+
+def test_packed_size():
+    assert len(OVERRIDES) == 3
+    assert OVERRIDES.nbytes == 3 * 12
+
+
+def test_load_rejects_bad_rows(tmp_path):
+    path = tmp_path / "overrides.csv"
+    header = "level,zip_code,lat,lon,property_type,delivery_m,arrival_m\n"
+    path.write_text(header + "zip,72701,,,DORM,300,400\nGEO,,36.068,-94.174,,500,\n", encoding="utf-8")
+    loaded = RadiusOverrides.load(str(path))
+    assert len(loaded) == 2 and loaded.resolve("DORM", "72701") == 300
+
+    path.write_text(header + "ZIP,72701,,,DORM,300,400\nCELL,,36.068,-94.174,,500,\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"line 3: .*unknown level 'CELL'"):
+        RadiusOverrides.load(str(path))
+    path.write_text(header + "ZIP,,,,DORM,300,400\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="line 2"):
+        RadiusOverrides.load(str(path))
+    path.write_text(header + "ZIP,72701,,,DORM,300,400\nZIP,72701,,,APARTMNT,300,400\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"line 3: .*unknown property_type 'APARTMNT'"):
+        RadiusOverrides.load(str(path))
+    path.write_text(header + "ZIP,72701,,,DORM,40000,400\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=r"line 2: .*outside 0\.\.32767"):
+        RadiusOverrides.load(str(path))
+    with pytest.raises(ValueError, match="unknown override level"):
+        RadiusOverrides([("CELL", 1, DORM, 10, 10)])
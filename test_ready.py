@@ -0,0 +1,42 @@
+"""Readiness: /ready reports 503 until the background warm-up has finished"""
+import time
+
+from fastapi.testclient import TestClient
+
+from geofence_ui import app as app_module
+
+
+def test_ready_reports_warm_up(monkeypatch):
+    monkeypatch.setitem(app_module.MODEL_STATE, "ready", False)
+    touched = []
+    original = app_module.geofence_model.get_arrival_radius
+
+    def recording(*args, **kwargs):
+        touched.append(args[4])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app_module.geofence_model, "get_arrival_radius", recording)
+
+    client = TestClient(app_module.app)               # no lifespan: nothing warms up
+    response = client.get("/ready")
+    assert response.status_code == 503 and response.json() == {"status": "warming_up"}
+    assert response.headers["cache-control"] == "no-store"
+    assert client.get("/api/predict").status_code == 200   # serving while warming
+
+    with TestClient(app_module.app) as warming:        # startup kicks off the warm-up
+        deadline = time.monotonic() + 10
+        while warming.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert warming.get("/ready").json()["model_version"] == app_module.MODEL_STATE["version"]
+    assert set(touched) == {False, True}              # both access values
+
+
+def test_forked_worker_skips_warm_up(monkeypatch):
+    # Gunicorn's master warmed up in when_ready; workers inherit ready=True
+    monkeypatch.setitem(app_module.MODEL_STATE, "ready", True)
+    calls = []
+    monkeypatch.setattr(app_module, "warm_up", lambda: calls.append(1))
+    with TestClient(app_module.app) as client:
+        assert client.get("/ready").status_code == 200
+    assert calls == []
@@ -0,0 +1,120 @@
+"""Model registry: interned storage, routing, scalar/batch/HTTP wiring"""
+import itertools
+import json
+
+from geofence_model import (
+    ADDRESS_SOURCES,
+    ARRIVAL_GEOFENCE_LOOKUP,
+    DENSITY_CATEGORIES,
+    GEOFENCE_LOOKUP,
+    PERCENTILES,
+    PROPERTY_TYPES,
+    RADIUS_TABLE,
+    get_arrival_radius,
+    get_geofence_radius,
+    iter_geojson,
+    lookup_radii,
+    process_deliveries,
+    tables_to_config,
+)
+from geofence_clusters import ClusterFences
+from geofence_registry import ModelRegistry, set_registry
+
+
+def wider_houses(extra):
+    delivery = dict(GEOFENCE_LOOKUP)
+    delivery[("SUBURBAN", "HOUSE", "AMS")] += extra
+    return delivery
+
+
+def test_current_version_matches_live_model():
+    version = ModelRegistry().resolve()
+    assert version.table() == RADIUS_TABLE
+    for combo in itertools.product(PROPERTY_TYPES, ADDRESS_SOURCES, DENSITY_CATEGORIES, PERCENTILES, (False, True)):
+        assert version.lookup(*combo) == lookup_radii(*combo)
+
+
+def test_hundred_versions_share_storage():
+    registry = ModelRegistry()
+    for i in range(100):
+        registry.add_lookups(f"v{i}", wider_houses(i % 50), ARRIVAL_GEOFENCE_LOOKUP)
+    stats = registry.stats()
+    assert stats["versions"] == 101
+    assert stats["distinct_versions"] == 50           # v0 == current, v50 == v0, ...
+    assert stats["bytes"] < stats["bytes_if_copied"] / 10
+    assert registry.resolve("v7").lookup("HOUSE", "AMS", "SUBURBAN") == (37, 38)
+    assert registry.resolve("v7").lookup("APARTMENT", "AMS", "SUBURBAN") == lookup_radii("APARTMENT", "AMS", "SUBURBAN")
+
+
+def test_routing_and_entry_points(tmp_path):
+    config = tmp_path / "wide.json"
+    config.write_text(json.dumps(tables_to_config(wider_houses(20), ARRIVAL_GEOFENCE_LOOKUP)))
+    manifest = tmp_path / "registry.json"
+    manifest.write_text(json.dumps({
+        "versions": {"wide": "wide.json"},
+        "markets": {"dfw": "wide"},
+        "experiments": {"house_ab": {"current": 70, "wide": 30}},
+    }))
+    registry = ModelRegistry.from_manifest(manifest)
+
+    assert registry.resolve("DFW").name == "wide"
+    assert registry.resolve("nowhere").name == "current"
+    assert registry.resolve("house_ab").name == "current"           # control without a unit
+    arms = [registry.resolve("house_ab", unit_id=f"driver-{i}").name for i in range(2000)]
+    assert 500 < arms.count("wide") < 700
+    assert arms == [registry.resolve("house_ab", unit_id=f"driver-{i}").name for i in range(2000)]
+
+    set_registry(registry)
+    try:
+        assert get_geofence_radius("HOUSE", "AMS", "SUBURBAN", model_key="DFW") == 50
+        assert get_arrival_radius("HOUSE", "AMS", "SUBURBAN", model_key="DFW") == 50
+        assert get_geofence_radius("HOUSE", "AMS", "SUBURBAN") == 30
+        stops = [{"property_type": "HOUSE", "address_source": "AMS", "density_category": "SUBURBAN"},
+                 {"property_type": "HOUSE", "address_source": "AMS", "density_category": "SUBURBAN",
+                  "market": "OTHER"},
+                 {"property_type": "HOUSE", "address_source": "AMS", "density_category": "SUBURBAN",
+                  "market": None}]
+        assert [r["recommended_radius_m"] for r in process_deliveries(stops, model_key="dfw")] == [50, 30, 50]
+        located = [{**stop, "lat": 32.78 + i, "lon": -96.8} for i, stop in enumerate(stops)]
+        assert ClusterFences.from_stops(located, "delivery", model_key="dfw").radius.tolist() == [50, 30, 50]
+        features = json.loads("".join(iter_geojson(located, model_key="dfw")))["features"]
+        assert [f["properties"]["radius_m"] for f in features[1::2]] == [50, 30, 50]
+
+        from fastapi.testclient import TestClient
+        from geofence_ui.app import app
+        client = TestClient(app)
+        body = client.get("/api/predict", params={"market": "DFW"}).json()
+        assert (body["delivery_radius_m"], body["model"]) == (50, "wide")
+        mixed = client.post("/api/batch", params={"market": "DFW"}, json=[{}, {"market": "ATL"}])
+        batch = mixed.json()["results"]
+        assert [r["delivery_radius_m"] for r in batch] == [50, 30]
+        wide, current = registry.resolve("DFW").digest, registry.resolve().digest
+        assert [r["model_version"] for r in batch] == [wide, current]
+        assert mixed.json()["model_version"] is None and "x-model-version" not in mixed.headers
+        single = client.post("/api/batch", params={"market": "DFW"}, json=[{}, {"market": "dfw"}])
+        assert single.json()["model_version"] == single.headers["x-model-version"] == wide
+
+        fences = [{"lat": 32.78, "lon": -96.8}, {"lat": 32.79, "lon": -96.8, "market": "ATL"}]
+        assert client.post("/api/geojson", params={"market": "DFW"}, json=fences[:1]).headers["x-model-version"] == wide
+        assert "x-model-version" not in client.post("/api/geojson", params={"market": "DFW"}, json=fences).headers
+    finally:
+        set_registry(None)
+
+
+def test_prediction_etag_names_the_version():
+    # v0 has the same tables (and digest) as current but a different body
+    registry = ModelRegistry()
+    registry.add_lookups("v0", GEOFENCE_LOOKUP, ARRIVAL_GEOFENCE_LOOKUP)
+    assert registry.resolve("v0").digest == registry.resolve().digest
+    set_registry(registry)
+    try:
+        from fastapi.testclient import TestClient
+        from geofence_ui.app import app
+        client = TestClient(app)
+        current, v0 = client.get("/api/predict"), client.get("/api/predict", params={"market": "v0"})
+        assert (current.json()["model"], v0.json()["model"]) == ("current", "v0")
+        assert current.headers["etag"] != v0.headers["etag"]
+        revalidated = client.get("/predict", params={"market": "v0"}, headers={"If-None-Match": current.headers["etag"]})
+        assert revalidated.status_code == 200
+    finally:
+        set_registry(None)
@@ -0,0 +1,72 @@
+"""Repeat problem addresses: normalization, clustering, override suggestions"""
+from monday_automation.repeat_addresses import (
+    aggregate_rows,
+    cluster_addresses,
+    find_repeat_addresses,
+    normalize_address,
+    normalize_zip,
+)
+from geofence_model import get_geofence_radius
+
+
+def row(line_1, week, zip_code="72712", cust="c1", dist="10", **extra):
+    return {
+        "CUST_RQ_ADDR_LINE_1_TXT": line_1, "CUST_RQ_CITY_NM": "Bentonville",
+        "CUST_RQ_POSTAL_CD": zip_code, "WM_WK": week, "cust_id": cust,
+        "RECOMMENDEDLATLONGSOURCE": "AMS", "Avg_dlvr_cust_dist": dist, **extra,
+    }
+
+
+def test_normalization():
+    assert normalize_address("123 Main Street #4", "", "Bentonville") == "123 MAIN ST APT 4 BENTONVILLE"
+    assert normalize_address("123 main st., apt 4", city="BENTONVILLE") == "123 MAIN ST APT 4 BENTONVILLE"
+    assert normalize_address("9 North Oak Boulevard") == "9 N OAK BLVD"
+    assert normalize_address("1 Elm St Apt #4") == normalize_address("1 Elm St #4") == normalize_address("1 Elm St Apt 4")
+    assert normalize_address("1 Elm St Suite #200") == "1 ELM ST STE 200"
+    assert normalize_zip("72712-1234") == "72712"
+    assert normalize_zip("2134") == "02134"
+    assert normalize_zip(None) == ""
+
+
+def test_clustering_by_address_not_customer():
+    entries = aggregate_rows([
+        row("123 Main Street", "202601"),
+        row("123 MAIN ST.", "202602"),
+        row("123 Mainn St", "202603"),                # typo, same place
+        row("125 Main St", "202603"),                 # neighbour: different house number
+        row("77 Elm Avenue", "202604"),               # same customer, different address
+        row("123 Main St", "202605", zip_code="10001"),
+    ])
+    assert len(entries) == 5                          # exact duplicates collapsed
+    clusters = sorted(sorted(entries[i].address for i in c) for c in cluster_addresses(entries))
+    assert clusters == [
+        ["123 MAIN ST BENTONVILLE"],
+        ["123 MAIN ST BENTONVILLE", "123 MAINN ST BENTONVILLE"],
+        ["125 MAIN ST BENTONVILLE"],
+        ["77 ELM AVE BENTONVILLE"],
+    ]
+
+
+def test_override_uses_cluster_density():
+    # 29 m rounds up to 30 m: too wide for URBAN_HIGH houses (28 m), fine for SUBURBAN (30 m)
+    suburban = [row("5 Oak Ct", f"2026{w:02d}", dist="29") for w in range(1, 4)]
+    rural = [row("9 Farm Rd", f"2026{w:02d}", zip_code="72000", dist="29") for w in range(1, 4)]
+    urban = [row("1 Tower Pl", f"2026{w:02d}", zip_code="10001", dist="29",
+                 density_category="urban_high") for w in range(1, 4)]
+    varied = [row("7 Pine Ln", f"2026{w:02d}", dist=str(40 + w)) for w in range(1, 21)]
+    report = {r["address"].split()[1]: r for r in find_repeat_addresses(
+        suburban + rural + urban + varied, min_weeks=3, zip_density_map={"72000": 50.0},
+    )}
+
+    for name, density, suggested in (
+        ("OAK", "SUBURBAN", None),
+        ("FARM", "RURAL", None),
+        ("TOWER", "URBAN_HIGH", 30),
+    ):
+        assert report[name]["density_category"] == density
+        assert report[name]["model_radius_m"] == get_geofence_radius("HOUSE", "AMS", density)
+        assert report[name]["suggested_radius_m"] == suggested
+
+    pine = report["PINE"]
+    assert pine["weeks"] == 20 and pine["p95_dist_m"] == 59.0
+    assert pine["suggested_radius_m"] == 60           # P95 rounded up to 5 m
@@ -0,0 +1,81 @@
+"""Schema-driven model: parity with the live tables, fallbacks, extra dimensions"""
+import itertools
+
+import numpy as np
+import pytest
+
+from geofence_model import (
+    ADDRESS_SOURCES,
+    DENSITY_CATEGORIES,
+    PERCENTILES,
+    PROPERTY_TYPES,
+    lookup_radii,
+)
+from geofence_schema import ModelSchema, default_schema
+
+
+def test_default_schema_matches_live_model():
+    model = default_schema().compile()
+    for prop, source, density, percentile, access in itertools.product(
+        PROPERTY_TYPES, ADDRESS_SOURCES, DENSITY_CATEGORIES, PERCENTILES, (False, True)
+    ):
+        got = model.lookup(
+            percentile, access,
+            property_type=prop, address_source=source, density_category=density,
+        )
+        assert got == lookup_radii(prop, source, density, percentile, access), (prop, source, density)
+
+
+def test_new_sources_use_own_column_or_default_column():
+    model = default_schema().compile()
+    stop = {"property_type": "HOUSE", "density_category": "URBAN_HIGH"}
+    # MELISSA has its own config column; MANUAL_ADJ has none -> DEFAULT column
+    assert model.lookup(address_source="MELISSA", **stop)[0] == 75
+    assert model.lookup(address_source="MANUAL_ADJ", **stop)[0] == 35
+    # Unknown sources still normalize to AMS
+    assert model.lookup(address_source="bogus", **stop) == lookup_radii("HOUSE", "AMS", "URBAN_HIGH")
+
+
+def test_extra_dimension_and_batch_lookup():
+    schema = ModelSchema.from_dict({
+        "dimensions": [
+            {"name": "vehicle_type", "values": ["CAR", "VAN", "BIKE"], "default": "CAR"},
+            {"name": "property_type", "values": ["HOUSE", "APARTMENT"], "default": "HOUSE"},
+        ],
+        "fallbacks": [["vehicle_type", "property_type"], ["property_type"]],
+        "rules": [
+            {"property_type": "HOUSE", "delivery": 30, "arrival": 40},
+            {"property_type": "APARTMENT", "delivery": 60, "arrival": 50},
+            {"vehicle_type": "VAN", "property_type": "HOUSE", "delivery": 45},
+        ],
+        "access_multipliers": {"APARTMENT": 1.5},
+    })
+    model = schema.compile()
+    assert model.lookup(vehicle_type="VAN", property_type="HOUSE") == (45, 45)   # arrival >= delivery
+    assert model.lookup(vehicle_type="BIKE", property_type="HOUSE") == (30, 40)  # property fallback
+    assert model.lookup(property_type="APARTMENT", access_required=True) == (90, 90)
+    assert model.lookup("P99", property_type="HOUSE") == (54, 72)
+
+    rng = np.random.default_rng(3)
+    vehicles = rng.choice(["CAR", "VAN", "BIKE", "TRUCK"], 500)
+    props = rng.choice(["HOUSE", "APARTMENT", None], 500)
+    access = rng.random(500) < 0.5
+    delivery, arrival = model.lookup_many(
+        {"vehicle_type": vehicles, "property_type": props}, percentile="P90", access_required=access
+    )
+    for i in range(500):
+        expected = model.lookup("P90", bool(access[i]), vehicle_type=vehicles[i], property_type=props[i])
+        assert (delivery[i], arrival[i]) == expected
+
+
+def test_rule_outside_lattice_is_rejected():
+    schema = ModelSchema.from_dict({
+        "dimensions": [
+            {"name": "vehicle_type", "values": ["CAR", "VAN"], "default": "CAR"},
+            {"name": "property_type", "values": ["HOUSE"], "default": "HOUSE"},
+        ],
+        "fallbacks": [["vehicle_type", "property_type"]],
+        "rules": [{"vehicle_type": "VAN", "delivery": 40}],
+    })
+    with pytest.raises(ValueError):
+        schema.compile()
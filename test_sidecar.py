@@ -0,0 +1,72 @@
+"""Binary sidecar: parity with the compiled table and pipelined framing"""
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import threading
+
+import pytest
+
+import geofence_sidecar
+from geofence_model import ADDRESS_SOURCES, DENSITY_CATEGORIES, PERCENTILES, PROPERTY_TYPES, lookup_radii
+from geofence_sidecar import SidecarClient, _handle_connection, lookup_frame, pack_stops, unpack_radii
+
+COMBOS = list(itertools.product(PROPERTY_TYPES, ADDRESS_SOURCES, DENSITY_CATEGORIES, PERCENTILES, (False, True)))
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_lookup_frame_matches_lookup_radii(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(geofence_sidecar, "np", None)
+    radii = unpack_radii(lookup_frame(pack_stops(COMBOS)))
+    assert radii == [lookup_radii(*combo) for combo in COMBOS]
+
+    # Unknown names and out-of-range codes fall back like get_geofence_radius
+    assert unpack_radii(lookup_frame(pack_stops([("CASTLE", None, "LUNAR", "P50", 0)]))) == [
+        lookup_radii("HOUSE", "AMS", "SUBURBAN", "P95", False)
+    ]
+    assert unpack_radii(lookup_frame(bytes((200, 9, 4, 3, 7)))) == [
+        lookup_radii("HOUSE", "AMS", "SUBURBAN", "P95", True)
+    ]
+    with pytest.raises(ValueError):
+        lookup_frame(b"\x00" * 7)
+
+
+@pytest.fixture
+def unix_path():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    path = os.path.join(tempfile.mkdtemp(), "geofence.sock")
+    server = asyncio.run_coroutine_threadsafe(asyncio.start_unix_server(_handle_connection, path=path), loop).result()
+    yield path
+
+    async def shutdown():
+        server.close()
+        # Connection handlers return once their client has disconnected
+        handlers = asyncio.all_tasks() - {asyncio.current_task()}
+        await asyncio.gather(*handlers)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def test_pipelined_frames_round_trip_in_order(unix_path):
+    rng = random.Random(7)
+    # Large frames at full depth: far more bytes in flight than the socket
+    # buffers hold, which deadlocked a send-only client
+    payloads = [pack_stops(rng.choices(COMBOS, k=rng.randrange(1, 40_000))) for _ in range(48)]
+    payloads.append(b"")
+    client = SidecarClient(unix_path)
+    try:
+        client.sock.settimeout(30)
+        responses = client.lookup_pipelined(payloads, depth=len(payloads))
+        assert responses == [lookup_frame(payload) for payload in payloads]
+        assert client.lookup(payloads[0]) == responses[0]
+        assert client.lookup_pipelined(payloads[:5], depth=2) == responses[:5]
+        assert client.sock.gettimeout() == 30  # caller's timeout restored
+    finally:
+        client.close()
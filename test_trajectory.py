@@ -0,0 +1,75 @@
+"""Trajectory processor: dwell detection, delivery matching, record output"""
+import csv
+
+import numpy as np
+
+import geofence_trajectory as gt
+from geofence_backtest import resolve_columns
+
+
+def test_every_stop_becomes_one_dwell():
+    pings, deliveries = gt.synthetic_route(6000, drivers=4)
+    dwells = gt.detect_dwells(pings["driver"], pings["ts"], pings["lat"], pings["lon"])
+    # 150 s cycle: 60 s driving then 90 s parked, per driver
+    assert len(dwells["start"]) == 4 * (1500 * 5 // 150)
+    assert np.all((dwells["end"] - dwells["start"] >= 75) & (dwells["end"] - dwells["start"] <= 95))
+
+
+def test_matching_is_chunk_independent_and_close_to_the_stop():
+    pings, deliveries = gt.synthetic_route(60_000, drivers=12)
+    whole = gt.process(pings, deliveries)
+    chunked = gt.process(pings, deliveries, chunk_pings=3000)
+    for key in whole:
+        assert np.array_equal(whole[key], chunked[key], equal_nan=True)
+    assert not np.isnan(whole["arrival_m"]).any()
+    assert np.median(whole["arrival_m"]) < 40          # stops are ~20 m off the dwell
+    assert np.median(whole["delivery_m"]) < 40
+
+
+def test_records_feed_the_backtest(tmp_path):
+    pings = np.array([(7, 100.0 + 5 * i, 40.0, -75.0) for i in range(20)], dtype=gt.PING_DTYPE)
+    deliveries = {
+        "driver": np.array([7], dtype=np.uint32), "ts": np.array([150.0]),
+        "stop_lat": np.array([40.0003]), "stop_lon": np.array([-75.0]),
+        "dlvrd_lat": np.array([np.nan]), "dlvrd_lon": np.array([np.nan]),
+    }
+    result = gt.process(pings, deliveries)
+    rows = [{"stop_id": "S1", "density_category": "SUBURBAN", "property_type": "HOUSE",
+             "address_source": "AMS", "access_required": "NO"}]
+    out = tmp_path / "records.csv"
+    assert gt.write_records(str(out), rows, result) == 1
+
+    with open(out) as f:
+        header, record = list(csv.reader(f))
+    assert set(resolve_columns(header)) >= {"density", "delivery", "arrival"}
+    assert abs(float(record[header.index("arrvl_dist_meter")]) - 33.4) < 0.5
+
+
+def test_alphanumeric_driver_ids_round_trip(tmp_path):
+    pings_csv = tmp_path / "pings.csv"
+    with open(pings_csv, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["driver_id", "ts", "lat", "lon"])
+        # Two drivers parked at different spots, rows interleaved
+        for i in range(20):
+            writer.writerow(["DRV-B7", 100 + 5 * i, 41.0, -75.0])
+            writer.writerow(["A12", 100 + 5 * i, 40.0, -75.0])
+    deliveries_csv = tmp_path / "deliveries.csv"
+    with open(deliveries_csv, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["stop_id", "driver_id", "delivered_at", "stop_lat", "stop_lon"])
+        writer.writerow(["S1", "DRV-B7", 150, 41.0003, -75.0])
+        writer.writerow(["S2", "A12", 150, 40.0003, -75.0])
+        writer.writerow(["S3", "NO-PINGS", 150, 40.0003, -75.0])
+
+    npy = str(tmp_path / "pings.npy")
+    gt.main(["convert", str(pings_csv), "--out", npy])
+    assert np.unique(np.load(npy)["driver"]).tolist() == [0, 1]
+    out = tmp_path / "records.csv"
+    gt.main(["process", npy, str(deliveries_csv), "--out", str(out)])
+
+    with open(out) as f:
+        records = {row["stop_id"]: row for row in csv.DictReader(f)}
+    for stop in ("S1", "S2"):
+        assert abs(float(records[stop]["arrvl_dist_meter"]) - 33.4) < 0.5
+    assert records["S3"]["arrvl_dist_meter"] == ""